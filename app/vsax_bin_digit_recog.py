@@ -31,101 +31,120 @@ sys.path.append(lib_path)
 # Importing VSAX libraries
 import vsax  # noqa: E402
 import vsax_models  # noqa: E402
+import vsax_profile  # noqa: E402
 import vsax_util  # noqa: E402
 
-(
-    save_mode,
-    load_mode,
-    disable_tqdm,
-) = vsax_models.vsax_general_parser()
-model_file = model_name + f"_d{HV_SIZE}.npz"
-model_dir = model_path + f"/{model_file}"
-
-
-# Download pre-trained model
-if load_mode:
-    vsax_util.download_file(
-        url=f"{vsax_util.git_trained_models_url}/{model_file}",
-        out_dir=model_path,
-        filename=model_file,
-    )
-
-# Downloading and extracting the MNIST dataset
-vsax_util.download_and_extract(
-    url=vsax_util.vsax_data_url_bin_mnist,
-    out_dir=data_path,
-    delete_archive=True,
-)
-
-# Read data
-X_data = vsax_util.read_data(CLASS_LIST, dataset_path, disable_tqdm=disable_tqdm)
-
-# Train and test split
-train_test_split = 0.6
-train_valid_split = 0.75
-
-X_train_set, X_valid_set, X_test_set = vsax_util.split_train_valid_test_set(
-    X_data=X_data,
-    class_list=CLASS_LIST,
-    train_test_split=train_test_split,
-    train_valid_split=train_valid_split,
-    disable_tqdm=disable_tqdm,
-)
-
 
 # Make class for digit model
 class digitVSA(vsax_models.vsaModel):
     def encode(self, item_data):
+        # One sample is a batch of one, which gathers the
+        # original or permuted ID HVs of all pixels at once
+        return self.encode_batch([item_data])[0]
+
+    def encode_batch(self, X):
         # Feature length
-        item_len = len(item_data)
+        item_len = len(X[0])
         # Threshold for binarization
         threshold = item_len // 2
-        # Encode hypervector
-        encoded_vec = vsax.hv_gen_empty(self.hv_size)
-        for i in range(item_len):
-            if item_data[i] == 0:
-                encoded_vec += self.ortho_im[i]
-            else:
-                encoded_vec += vsax.hv_circ_perm(self.ortho_im[i], 1)
+        # Black pixels select the original and white pixels the permuted iMs
+        encoded_vecs = vsax.hv_encode_perm_id_batch(self.ortho_im, X)
         # Binarization
         if self.binarize_encode:
-            encoded_vec = vsax.hv_binarize(encoded_vec, threshold, self.hv_type)
-        return encoded_vec
-
-
-# Make digit class
-digit_model = digitVSA(
-    model_name=model_name,
-    hv_size=HV_SIZE,
-    class_list=CLASS_LIST,
-    gen_type=GEN_TYPE,
-)
-
-# Disabling TQDM debug progress bars
-digit_model.tqdm_train_disable = disable_tqdm
-digit_model.tqdm_retrain_disable = disable_tqdm
-digit_model.tqdm_test_disable = disable_tqdm
-
-if load_mode:
-    # Load an existing trained model
-    digit_model.load_model(model_dir)
-else:
-    # Train the model
-    digit_model.train_model(X_train_set)
-
-    # Retrain the model
-    digit_model.retrain_model(X_valid_set)
-
-# Test the model
-digit_model.test_model(X_test_set)
-
-# Print some statistics
-digit_model.print_model_stats()
-
-# Checker if accuracy is expected
-assert digit_model.model_accuracy > 0.8, "Test accuracy is lower than expected."
-print("✓ Test accuracy passed.")
-
-# Save model
-if save_mode:
-    digit_model.save_model(model_dir)
+            encoded_vecs = vsax.hv_binarize(encoded_vecs, threshold, self.hv_type)
+        return encoded_vecs
+
+
+if __name__ == "__main__":
+    (
+        save_mode,
+        load_mode,
+        disable_tqdm,
+        n_jobs,
+        profile_mode,
+    ) = vsax_models.vsax_general_parser()
+    model_file = model_name + f"_d{HV_SIZE}.npz"
+    model_dir = model_path + f"/{model_file}"
+
+    # Stage timers of the run, disabled unless --profile
+    profiler = vsax_profile.vsaProfiler(enabled=profile_mode)
+
+    # Download pre-trained model
+    if load_mode:
+        vsax_util.download_file(
+            url=f"{vsax_util.git_trained_models_url}/{model_file}",
+            out_dir=model_path,
+            filename=model_file,
+        )
+
+    # Downloading and extracting the MNIST dataset
+    vsax_util.download_and_extract(
+        url=vsax_util.vsax_data_url_bin_mnist,
+        out_dir=data_path,
+        delete_archive=True,
+    )
+
+    # Read data
+    with profiler.stage("read_data"):
+        X_data = vsax_util.read_data(
+            CLASS_LIST, dataset_path, disable_tqdm=disable_tqdm
+        )
+
+        # Train and test split
+        train_test_split = 0.6
+        train_valid_split = 0.75
+
+        X_train_set, X_valid_set, X_test_set = vsax_util.split_train_valid_test_set(
+            X_data=X_data,
+            class_list=CLASS_LIST,
+            train_test_split=train_test_split,
+            train_valid_split=train_valid_split,
+            disable_tqdm=disable_tqdm,
+        )
+
+    # Make digit class
+    digit_model = digitVSA(
+        model_name=model_name,
+        hv_size=HV_SIZE,
+        class_list=CLASS_LIST,
+        gen_type=GEN_TYPE,
+    )
+
+    # Disabling TQDM debug progress bars
+    digit_model.tqdm_train_disable = disable_tqdm
+    digit_model.tqdm_retrain_disable = disable_tqdm
+    digit_model.tqdm_test_disable = disable_tqdm
+
+    # Number of worker processes
+    digit_model.n_jobs = n_jobs
+
+    # Profiler of the run
+    digit_model.profiler = profiler
+
+    if load_mode:
+        # Load an existing trained model
+        digit_model.load_model(model_dir)
+    else:
+        # Train the model
+        digit_model.train_model(X_train_set)
+
+        # Retrain the model
+        digit_model.retrain_model(X_valid_set)
+
+    # Test the model
+    digit_model.test_model(X_test_set)
+
+    # Print some statistics
+    digit_model.print_model_stats()
+
+    # Save the profile of the run
+    if profile_mode:
+        profiler.save_json(f"{model_name}_profile.json")
+
+    # Checker if accuracy is expected
+    assert digit_model.model_accuracy > 0.8, "Test accuracy is lower than expected."
+    print("✓ Test accuracy passed.")
+
+    # Save model
+    if save_mode:
+        digit_model.save_model(model_dir)
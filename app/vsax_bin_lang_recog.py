@@ -13,6 +13,7 @@ from pathlib import Path
 # Global parameters
 HV_SIZE = 512
 GEN_TYPE = "lfsr"
+NGRAM_LEN = 4
 
 CLASS_LIST = list(range(21))
 
@@ -30,114 +31,129 @@ sys.path.append(lib_path)
 # Importing VSAX libraries
 import vsax  # noqa: E402
 import vsax_models  # noqa: E402
+import vsax_profile  # noqa: E402
 import vsax_util  # noqa: E402
 
-(
-    save_mode,
-    load_mode,
-    disable_tqdm,
-) = vsax_models.vsax_general_parser()
-model_file = model_name + f"_d{HV_SIZE}.npz"
-model_dir = model_path + f"/{model_file}"
-
-
-# Download pre-trained model
-if load_mode:
-    vsax_util.download_file(
-        url=f"{vsax_util.git_trained_models_url}/{model_file}",
-        out_dir=model_path,
-        filename=model_file,
-    )
-
-# Downloading and extracting the Language dataset
-vsax_util.download_and_extract(
-    url=vsax_util.vsax_data_url_bin_lang,
-    out_dir=data_path,
-    delete_archive=True,
-)
-
-
-# Read data
-X_data = vsax_util.read_data(CLASS_LIST, dataset_path, disable_tqdm=disable_tqdm)
-
-# Train and test split
-train_test_split = 0.6
-train_valid_split = 0.75
-
-X_train_set, X_valid_set, X_test_set = vsax_util.split_train_valid_test_set(
-    X_data=X_data,
-    class_list=CLASS_LIST,
-    train_test_split=train_test_split,
-    train_valid_split=train_valid_split,
-    disable_tqdm=disable_tqdm,
-)
-
 
 # Make class for Language model
 class langVSA(vsax_models.vsaModel):
     def encode(self, item_data):
-        # Let's set ngram length in here
-        ngram_len = 4
-        # Feature length
-        item_len = len(item_data)
-        # Initialize encoded vector
-        encoded_vec = vsax.hv_gen_empty(self.hv_size)
-        # Iterate through different item
-        for i in range(item_len - ngram_len):
-            # Iterate the ngrams
-            ngram_vec = vsax.hv_gen_empty(self.hv_size)
-            for j in range(ngram_len):
-                if j == 0:
-                    ngram_vec = self.ortho_im[item_data[i + j]]
-                else:
-                    perm_vec = vsax.hv_circ_perm(self.ortho_im[item_data[i + j]], j)
-                    ngram_vec = vsax.hv_bind(ngram_vec, perm_vec, hv_type=self.hv_type)
-            encoded_vec += ngram_vec
+        # One sample is a batch of one, which gathers all
+        # n-gram windows at once instead of looping over them
+        return self.encode_batch([item_data])[0]
 
+    def encode_batch(self, X):
+        # Feature length
+        item_len = len(X[0])
+        # Same windows as encode, i.e., item_len - NGRAM_LEN ngrams
+        encoded_vecs = vsax.hv_encode_ngram_batch(
+            self.ortho_im,
+            X,
+            NGRAM_LEN,
+            hv_type=self.hv_type,
+            num_windows=item_len - NGRAM_LEN,
+        )
         # Threshold for binarization
-        threshold = (item_len - ngram_len) // 2
+        threshold = (item_len - NGRAM_LEN) // 2
         # Binarization
         if self.binarize_encode:
-            encoded_vec = vsax.hv_binarize(encoded_vec, threshold, self.hv_type)
-        return encoded_vec
+            encoded_vecs = vsax.hv_binarize(encoded_vecs, threshold, self.hv_type)
+        return encoded_vecs
+
+
+if __name__ == "__main__":
+    (
+        save_mode,
+        load_mode,
+        disable_tqdm,
+        n_jobs,
+        profile_mode,
+    ) = vsax_models.vsax_general_parser()
+    model_file = model_name + f"_d{HV_SIZE}.npz"
+    model_dir = model_path + f"/{model_file}"
+
+    # Stage timers of the run, disabled unless --profile
+    profiler = vsax_profile.vsaProfiler(enabled=profile_mode)
+
+    # Download pre-trained model
+    if load_mode:
+        vsax_util.download_file(
+            url=f"{vsax_util.git_trained_models_url}/{model_file}",
+            out_dir=model_path,
+            filename=model_file,
+        )
+
+    # Downloading and extracting the Language dataset
+    vsax_util.download_and_extract(
+        url=vsax_util.vsax_data_url_bin_lang,
+        out_dir=data_path,
+        delete_archive=True,
+    )
+
+    # Read data
+    with profiler.stage("read_data"):
+        X_data = vsax_util.read_data(
+            CLASS_LIST, dataset_path, disable_tqdm=disable_tqdm
+        )
+
+        # Train and test split
+        train_test_split = 0.6
+        train_valid_split = 0.75
+
+        X_train_set, X_valid_set, X_test_set = vsax_util.split_train_valid_test_set(
+            X_data=X_data,
+            class_list=CLASS_LIST,
+            train_test_split=train_test_split,
+            train_valid_split=train_valid_split,
+            disable_tqdm=disable_tqdm,
+        )
+
+    # Make Language class
+    lang_model = langVSA(
+        model_name=model_name,
+        hv_size=HV_SIZE,
+        class_list=CLASS_LIST,
+        gen_type=GEN_TYPE,
+    )
+
+    # Binarize AM
+    lang_model.binarize_am = True
 
+    # Disabling TQDM debug progress bars
+    lang_model.tqdm_train_disable = disable_tqdm
+    lang_model.tqdm_retrain_disable = disable_tqdm
+    lang_model.tqdm_test_disable = disable_tqdm
 
-# Make Language class
-lang_model = langVSA(
-    model_name=model_name,
-    hv_size=HV_SIZE,
-    class_list=CLASS_LIST,
-    gen_type=GEN_TYPE,
-)
+    # Number of worker processes
+    lang_model.n_jobs = n_jobs
 
-# Binarize AM
-lang_model.binarize_am = True
+    # Profiler of the run
+    lang_model.profiler = profiler
 
-# Disabling TQDM debug progress bars
-lang_model.tqdm_train_disable = disable_tqdm
-lang_model.tqdm_retrain_disable = disable_tqdm
-lang_model.tqdm_test_disable = disable_tqdm
+    if load_mode:
+        # Load an existing trained model
+        lang_model.load_model(model_dir)
+    else:
+        # Train the model
+        lang_model.train_model(X_train_set)
 
-if load_mode:
-    # Load an existing trained model
-    lang_model.load_model(model_dir)
-else:
-    # Train the model
-    lang_model.train_model(X_train_set)
+        # Retrain the model
+        lang_model.retrain_model(X_valid_set)
 
-    # Retrain the model
-    lang_model.retrain_model(X_valid_set)
+    # Test the model
+    lang_model.test_model(X_test_set)
 
-# Test the model
-lang_model.test_model(X_test_set)
+    # Print some statistics
+    lang_model.print_model_stats()
 
-# Print some statistics
-lang_model.print_model_stats()
+    # Save the profile of the run
+    if profile_mode:
+        profiler.save_json(f"{model_name}_profile.json")
 
-# Checker if accuracy is expected
-assert lang_model.model_accuracy > 0.60, "Test accuracy is lower than expected."
-print("✓ Test accuracy passed.")
+    # Checker if accuracy is expected
+    assert lang_model.model_accuracy > 0.60, "Test accuracy is lower than expected."
+    print("✓ Test accuracy passed.")
 
-# Save model
-if save_mode:
-    lang_model.save_model(model_dir)
+    # Save model
+    if save_mode:
+        lang_model.save_model(model_dir)
@@ -0,0 +1,73 @@
+"""
+LFSR Item Memory Generation Benchmark
+
+This script times the generation of LFSR item memories
+with the vectorized hv_gen_lfsr_im against the per-bit
+reference hv_gen_lfsr for several hypervector dimensions.
+"""
+
+# Parameters
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Global parameters
+NUM_ITEMS = 1024
+HV_DIM_LIST = [512, 2048, 8192]
+BASE_SEED = 42
+
+# Path directories
+curr_dir = os.path.dirname(os.path.abspath(__file__))
+lib_path = curr_dir + "/../lib"
+
+# Appending other paths for libraries
+sys.path.append(lib_path)
+
+import vsax  # noqa: E402
+
+
+# Time the best of a few runs of a function
+def best_time(func, num_runs):
+    times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description="LFSR item memory benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per case")
+    parser.add_argument(
+        "--ref",
+        action="store_true",
+        help="Also time the per-bit reference loop (slow)",
+    )
+    args = parser.parse_args()
+
+    print("======== LFSR IM Generation ========")
+    print(f"Number of items: {NUM_ITEMS}")
+    for hv_dim in HV_DIM_LIST:
+        idx = np.arange(NUM_ITEMS)
+        vec_time = best_time(
+            lambda: vsax.hv_gen_lfsr_im(BASE_SEED, idx, hv_dim), args.runs
+        )
+        packed_time = best_time(
+            lambda: vsax.hv_gen_lfsr_im(BASE_SEED, idx, hv_dim, packed=True),
+            args.runs,
+        )
+        result = f"D={hv_dim:<5d} vectorized: {vec_time:.4f} s"
+        result += f"  packed: {packed_time:.4f} s"
+
+        if args.ref:
+            ref_time = best_time(
+                lambda: [vsax.hv_gen_lfsr(BASE_SEED, item, hv_dim) for item in idx],
+                1,
+            )
+            result += f"  reference: {ref_time:.4f} s"
+            result += f"  speedup: {ref_time / vec_time:.1f}x"
+        print(result)
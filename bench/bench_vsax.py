@@ -0,0 +1,539 @@
+"""
+VSAX Benchmark Suite
+
+This script times the VSAX primitives and the stages of every
+application on synthetic data, so it runs offline:
+- IM generation with the ri, lfsr and ca90 generators
+- bind, permute and bundle, unpacked and bit-packed
+- AM search for binary and bipolar HVs over several C and D
+- encode, train, retrain and test of each app/ model
+- save and load of a model file, full and inference-only
+
+The app models are taken from the app/ scripts themselves, so the
+benchmark times the same encoders. The results are written as JSON
+and can be compared against a stored baseline of an earlier run,
+which fails with exit code 1 when a case got slower than allowed.
+
+Typical use, pixi run bench-vsax-record and bench-vsax-check:
+    python bench/bench_vsax.py --output bench_baseline.json
+    python bench/bench_vsax.py --baseline bench_baseline.json
+"""
+
+# Parameters
+import sys
+import os
+import io
+import json
+import time
+import platform
+import argparse
+import importlib.util
+import tempfile
+import contextlib
+import subprocess
+import numpy as np
+from datetime import datetime, timezone
+
+# Global parameters
+SEED = 42
+GEN_TYPE_LIST = ["ri", "lfsr", "ca90"]
+HV_TYPE_LIST = ["binary", "bipolar"]
+DEFAULT_TOLERANCE = 0.25  # allowed slowdown before a case is a regression
+DEFAULT_MIN_DELTA = 5e-3  # seconds, smaller slowdowns are timer noise
+
+# Full and quick (--quick) problem sizes
+SIZES = {
+    "full": {
+        "num_items": 1024,
+        "hv_dim_list": [512, 2048, 8192],
+        "num_hvs": 1024,
+        "num_queries": 1024,
+        "num_classes_list": [10, 26, 100],
+        "samples_per_class": 60,
+    },
+    "quick": {
+        "num_items": 256,
+        "hv_dim_list": [512, 2048],
+        "num_hvs": 256,
+        "num_queries": 256,
+        "num_classes_list": [10, 26],
+        "samples_per_class": 12,
+    },
+}
+
+# App scripts with their model class, synthetic sample format (features
+# per sample and the number of distinct feature values) and binarize_am
+APP_LIST = {
+    "bin_digit": ("vsax_bin_digit_recog.py", "digitVSA", 784, 2, False),
+    "bin_idlvl_digit": ("vsax_bin_idlvl_digit_recog.py", "digitVSA", 784, 2, False),
+    "digit": ("vsax_digit_recog.py", "digitVSA", 784, 256, False),
+    "bin_dna": ("vsax_bin_dna_recog.py", "dnaVSA", 60, 4, True),
+    "bin_lang": ("vsax_bin_lang_recog.py", "langVSA", 128, 27, True),
+    "bin_isolet": ("vsax_bin_isolet_recog.py", "isoletVSA", 617, 21, True),
+}
+
+# Path directories
+curr_dir = os.path.dirname(os.path.abspath(__file__))
+lib_path = curr_dir + "/../lib"
+app_path = curr_dir + "/../app"
+
+# Appending other paths for libraries
+sys.path.append(lib_path)
+
+import vsax  # noqa: E402
+import vsax_infer  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Timing and reporting
+# ---------------------------------------------------------------------------
+
+
+# Time a function over a few runs
+def time_case(name, func, num_runs, setup=None, **params):
+    """
+    Time func() num_runs times. If given, setup() runs untimed before
+    every run and its result is passed to func.
+
+    Returns:
+        dict: The case name, its parameters and the timing statistics.
+    """
+    times = []
+    for _ in range(num_runs):
+        if setup is None:
+            start = time.perf_counter()
+            func()
+        else:
+            state = setup()
+            start = time.perf_counter()
+            func(state)
+        times.append(time.perf_counter() - start)
+    result = {
+        "name": name,
+        "params": params,
+        "runs": num_runs,
+        "best_s": min(times),
+        "median_s": float(np.median(times)),
+    }
+    print(f"{name:<48s} best: {result['best_s']:.5f} s")
+    return result
+
+
+# Metadata of the machine and tree the results come from
+def run_metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=curr_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "sizes": "quick" if args.quick else "full",
+        "runs": args.runs,
+    }
+
+
+# Compare results against a baseline run
+def compare_baseline(results, baseline, tolerance, min_delta):
+    """
+    Compare the best times of the cases both runs have.
+
+    A case regresses if it is more than tolerance slower than the
+    baseline, relative, and more than min_delta seconds slower, absolute.
+
+    Returns:
+        list: The names of the regressed cases.
+    """
+    baseline_times = {case["name"]: case["best_s"] for case in baseline["results"]}
+    if baseline["meta"].get("sizes") != results["meta"]["sizes"]:
+        print("Warning: the baseline was run with other problem sizes")
+
+    print("======== Baseline Comparison ========")
+    regressions = []
+    for case in results["results"]:
+        name = case["name"]
+        if name not in baseline_times:
+            continue
+        base_time = baseline_times[name]
+        ratio = case["best_s"] / base_time if base_time > 0 else float("inf")
+        regressed = (ratio > 1 + tolerance) and (case["best_s"] - base_time > min_delta)
+        status = "REGRESSION" if regressed else "ok"
+        print(f"{name:<48s} {ratio:6.2f}x  {status}")
+        if regressed:
+            regressions.append(name)
+
+    missing = set(baseline_times) - {case["name"] for case in results["results"]}
+    if missing:
+        print(f"Cases not in this run: {len(missing)}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Primitive benchmarks
+# ---------------------------------------------------------------------------
+
+
+# IM generation with each generator
+def bench_im_gen(sizes, num_runs):
+    results = []
+    for gen_type in GEN_TYPE_LIST:
+        for hv_dim in sizes["hv_dim_list"]:
+            results.append(
+                time_case(
+                    f"im_gen/{gen_type}/D={hv_dim}",
+                    lambda: vsax.hv_gen_orthogonal_im(
+                        sizes["num_items"], hv_dim, "binary", gen_type
+                    ),
+                    num_runs,
+                    gen_type=gen_type,
+                    hv_dim=hv_dim,
+                    num_items=sizes["num_items"],
+                )
+            )
+    return results
+
+
+# Bind, permute and bundle of a set of HVs
+def bench_ops(sizes, num_runs):
+    results = []
+    num_hvs = sizes["num_hvs"]
+    for hv_dim in sizes["hv_dim_list"]:
+        for hv_type in HV_TYPE_LIST:
+            hv_set = vsax.hv_gen_orthogonal_im(num_hvs, hv_dim, hv_type, "lfsr")
+            kernels = vsax.hv_get_kernels(hv_type)
+            params = dict(hv_type=hv_type, hv_dim=hv_dim, num_hvs=num_hvs)
+            results.append(
+                time_case(
+                    f"bind/{hv_type}/D={hv_dim}",
+                    lambda: kernels.bind(hv_set[:-1], hv_set[1:]),
+                    num_runs,
+                    **params,
+                )
+            )
+            results.append(
+                time_case(
+                    f"permute/{hv_type}/D={hv_dim}",
+                    lambda: vsax.hv_circ_perm(hv_set, 1),
+                    num_runs,
+                    **params,
+                )
+            )
+            results.append(
+                time_case(
+                    f"bundle/{hv_type}/D={hv_dim}",
+                    lambda: vsax.hv_bundle_sum(
+                        hv_set, vsax.hv_count_dtype(len(hv_set))
+                    ),
+                    num_runs,
+                    **params,
+                )
+            )
+
+        # Bit-packed binary HVs
+        packed_set = vsax.hv_pack(
+            vsax.hv_gen_orthogonal_im(num_hvs, hv_dim, "binary", "lfsr")
+        )
+        params = dict(hv_type="binary", hv_dim=hv_dim, num_hvs=num_hvs, packed=True)
+        results.append(
+            time_case(
+                f"bind/packed/D={hv_dim}",
+                lambda: vsax.hv_bind_packed(packed_set[:-1], packed_set[1:]),
+                num_runs,
+                **params,
+            )
+        )
+        results.append(
+            time_case(
+                f"permute/packed/D={hv_dim}",
+                lambda: vsax.hv_circ_perm_packed(packed_set, 1),
+                num_runs,
+                **params,
+            )
+        )
+    return results
+
+
+# AM search over several numbers of classes and dimensions
+def bench_am_search(sizes, num_runs):
+    results = []
+    num_queries = sizes["num_queries"]
+    for hv_dim in sizes["hv_dim_list"]:
+        for num_classes in sizes["num_classes_list"]:
+            for hv_type, packed in (
+                ("binary", False),
+                ("binary", True),
+                ("bipolar", False),
+            ):
+                hv_set = vsax.hv_gen_orthogonal_im(
+                    num_classes + num_queries,
+                    hv_dim,
+                    hv_type,
+                    "lfsr",
+                    packed=packed,
+                )
+                class_am, queries = hv_set[:num_classes], hv_set[num_classes:]
+                kernels = vsax.hv_get_kernels(hv_type, packed)
+                class_am_norm = kernels.am_norms(class_am)
+                layout = "packed" if packed else hv_type
+                results.append(
+                    time_case(
+                        f"am_search/{layout}/C={num_classes}/D={hv_dim}",
+                        lambda: kernels.am_search(
+                            class_am, queries, class_am_norm=class_am_norm
+                        ),
+                        num_runs,
+                        hv_type=hv_type,
+                        packed=packed,
+                        hv_dim=hv_dim,
+                        num_classes=num_classes,
+                        num_queries=num_queries,
+                        backend=kernels.backend,
+                    )
+                )
+    return results
+
+
+# ---------------------------------------------------------------------------
+# App benchmarks
+# ---------------------------------------------------------------------------
+
+
+# Model class of an app script, the scripts only run under __main__
+def load_app_class(app_file, class_name):
+    """
+    Import an app script for its model class and its upper-case
+    global parameters.
+
+    Returns:
+        tuple: The model class and the global parameters of the script.
+    """
+    spec = importlib.util.spec_from_file_location(
+        os.path.splitext(app_file)[0], os.path.join(app_path, app_file)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, class_name), vars(module)
+
+
+# Synthetic per-class samples of an app
+def gen_app_data(rng, num_classes, samples_per_class, num_features, num_values):
+    # Each class has a prototype sample and its samples are noisy copies,
+    # so training and retraining see a learnable problem
+    X_data = []
+    for _ in range(num_classes):
+        prototype = rng.integers(0, num_values, num_features)
+        samples = np.repeat(prototype[None, :], samples_per_class, axis=0)
+        noise = rng.random(samples.shape) < 0.2
+        samples[noise] = rng.integers(0, num_values, np.count_nonzero(noise))
+        X_data.append(samples)
+    return X_data
+
+
+# Encode, train, retrain, test and load of every app
+def bench_apps(sizes, num_runs, app_names):
+    results = []
+    rng = np.random.default_rng(SEED)
+    for app_name in app_names:
+        app_file, class_name, num_features, num_values, binarize_am = APP_LIST[app_name]
+        model_class, app_globals = load_app_class(app_file, class_name)
+        class_list = app_globals["CLASS_LIST"]
+        hv_size = app_globals["HV_SIZE"]
+        model_kwargs = dict(
+            model_name=f"bench_{app_name}",
+            hv_size=hv_size,
+            class_list=class_list,
+        )
+        if "GEN_TYPE" in app_globals:
+            model_kwargs["gen_type"] = app_globals["GEN_TYPE"]
+        if "NUM_CIM" in app_globals:
+            model_kwargs["num_cim"] = app_globals["NUM_CIM"]
+
+        X_train = gen_app_data(
+            rng,
+            len(class_list),
+            sizes["samples_per_class"],
+            num_features,
+            num_values,
+        )
+        X_test = gen_app_data(
+            rng,
+            len(class_list),
+            sizes["samples_per_class"] // 2,
+            num_features,
+            num_values,
+        )
+        X_batch = np.concatenate(X_test)
+        params = dict(
+            app=app_file,
+            hv_size=hv_size,
+            num_classes=len(class_list),
+            samples_per_class=sizes["samples_per_class"],
+        )
+
+        def new_model():
+            model = model_class(**model_kwargs)
+            model.binarize_am = binarize_am
+            model.tqdm_train_disable = True
+            model.tqdm_retrain_disable = True
+            model.tqdm_test_disable = True
+            return model
+
+        def trained_model():
+            model = new_model()
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.train_model(X_train)
+            return model
+
+        # The stages print their progress, which is not timed
+        def quiet(func):
+            def run(model):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func(model)
+
+            return run
+
+        model = trained_model()
+        results.append(
+            time_case(
+                f"app/{app_name}/encode",
+                lambda: model.encode_batch(X_batch),
+                num_runs,
+                num_samples=len(X_batch),
+                **params,
+            )
+        )
+        results.append(
+            time_case(
+                f"app/{app_name}/train",
+                quiet(lambda model: model.train_model(X_train)),
+                num_runs,
+                setup=new_model,
+                **params,
+            )
+        )
+        results.append(
+            time_case(
+                f"app/{app_name}/retrain",
+                quiet(lambda model: model.retrain_model(X_train)),
+                num_runs,
+                setup=trained_model,
+                **params,
+            )
+        )
+        results.append(
+            time_case(
+                f"app/{app_name}/test",
+                quiet(lambda model: model.test_model(X_test)),
+                num_runs,
+                setup=lambda: model,
+                **params,
+            )
+        )
+
+        # Model files of the trained model
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_file = os.path.join(tmp_dir, f"{app_name}.npz")
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.save_model(model_file)
+            results.append(
+                time_case(
+                    f"app/{app_name}/load",
+                    quiet(lambda model: model.load_model(model_file)),
+                    num_runs,
+                    setup=new_model,
+                    **params,
+                )
+            )
+            results.append(
+                time_case(
+                    f"app/{app_name}/load_infer",
+                    lambda: vsax_infer.vsaInferModel.load(model_file, model_class),
+                    num_runs,
+                    **params,
+                )
+            )
+    return results
+
+
+BENCH_GROUPS = {
+    "im_gen": bench_im_gen,
+    "ops": bench_ops,
+    "am_search": bench_am_search,
+    "apps": bench_apps,
+}
+
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description="VSAX benchmark suite")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per case")
+    parser.add_argument(
+        "--quick", action="store_true", help="Smaller problem sizes, for a quick check"
+    )
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        choices=list(BENCH_GROUPS),
+        default=list(BENCH_GROUPS),
+        help="Benchmark groups to run",
+    )
+    parser.add_argument(
+        "--apps",
+        nargs="+",
+        choices=list(APP_LIST),
+        default=list(APP_LIST),
+        help="Apps of the apps group",
+    )
+    parser.add_argument("--output", type=str, help="Write the results to this JSON")
+    parser.add_argument("--baseline", type=str, help="Baseline JSON to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Relative slowdown allowed against the baseline",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=DEFAULT_MIN_DELTA,
+        help="Absolute slowdown in seconds below which cases never regress",
+    )
+    args = parser.parse_args()
+    # Fail before the run rather than after it
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} not found, record one with --output")
+
+    sizes = SIZES["quick" if args.quick else "full"]
+    results = {"meta": run_metadata(args), "results": []}
+    for group in args.groups:
+        print(f"======== {group} ========")
+        if group == "apps":
+            results["results"] += bench_apps(sizes, args.runs, args.apps)
+        else:
+            results["results"] += BENCH_GROUPS[group](sizes, args.runs)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(
+            results, baseline, args.tolerance, args.min_delta
+        )
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}")
+            sys.exit(1)
+        print("No regressions against the baseline")
@@ -1,7 +1,120 @@
 import numpy as np
 
+# Exponent bits, mantissa bits, max normal and min normal of each format,
+# NaN code of the formats that have one
+FP_FORMATS = {
+    "E4M3": (4, 3, 448.0, 2**-6, 0b01111111),
+    "E5M2": (5, 2, 57344.0, 2**-14, 0b01111101),
+    "E2M3": (2, 3, 7.5, 1.0, None),
+    "E3M2": (3, 2, 28.0, 0.25, None),
+    "E2M1": (2, 1, 6.0, 1.0, None),
+}
+
+# Float32 magnitudes are looked up by their top bits (exponent and the
+# first mantissa bits). Rounding boundaries of all formats are more than
+# one bucket apart, so each bucket holds at most one boundary.
+FP_BUCKET_SHIFT = 16
+
+# Code tables of each format, see fp_code_table
+fp_table_cache = dict()
+
+
+# Code tables of a format:
+# - table: magnitudes of all non-negative finite codes, a code is its index
+# - signed_table: values of all codes, including the sign bit
+# - bucket_code: code of the smallest magnitude of each bucket
+# - bucket_bound: bits of the boundary to the next code within each bucket
+def fp_code_table(mode="E4M3"):
+    if mode not in FP_FORMATS:
+        raise ValueError(f"mode must be one of {list(FP_FORMATS)}")
+    if mode not in fp_table_cache:
+        exp_bits, man_bits, max_norm, min_norm, _ = FP_FORMATS[mode]
+        num_codes = 1 << (exp_bits + man_bits)
+        codes = np.arange(num_codes)
+        E = codes >> man_bits
+        M = (codes & ((1 << man_bits) - 1)) / (1 << man_bits)
+        # Subnormals have E = 0, the normal exponents start at min_norm
+        table = np.where(E == 0, M * min_norm, (1 + M) * min_norm * 2.0 ** (E - 1))
+        # Codes above max_norm are Inf or NaN
+        table = table[table <= max_norm].astype(np.float32)
+        signed_table = np.full(2 * num_codes, np.nan, dtype=np.float32)
+        signed_table[: len(table)] = table
+        signed_table[num_codes : num_codes + len(table)] = -table
+
+        # Midpoints round to the even code, like round-to-nearest-even,
+        # so a boundary moves up by one ulp when the lower code is even
+        bounds = (table[:-1] + table[1:]) / 2
+        bounds[0::2] = np.nextafter(bounds[0::2], np.float32(np.inf))
+        # Values below the smallest subnormal flush to zero
+        bounds[0] = table[1]
+        bound_bits = bounds.view(np.uint32)
+        if np.any(np.diff(bound_bits >> FP_BUCKET_SHIFT) == 0):
+            raise ValueError(f"Two {mode} boundaries share a bucket")
+
+        # Number of boundaries below each bucket, and the one inside it
+        bucket_start = np.arange(1 << (31 - FP_BUCKET_SHIFT), dtype=np.uint32)
+        bucket_start <<= FP_BUCKET_SHIFT
+        bucket_code = np.searchsorted(bound_bits, bucket_start)
+        next_bits = np.append(bound_bits, np.uint32(0xFFFFFFFF))[bucket_code]
+        in_bucket = (next_bits >> FP_BUCKET_SHIFT) == (bucket_start >> FP_BUCKET_SHIFT)
+        bucket_bound = np.where(in_bucket, next_bits, np.uint32(0xFFFFFFFF))
+
+        fp_table_cache[mode] = (
+            table,
+            signed_table,
+            bucket_code.astype(np.uint8),
+            bucket_bound.astype(np.uint32),
+        )
+        for array in fp_table_cache[mode]:
+            array.flags.writeable = False
+    return fp_table_cache[mode]
+
+
+# Round to a FP8/FP6/FP4 format through its code tables
+def fp864_quantize(x, mode="E4M3", overflow="SAT", return_codes=False):
+    _, signed_table, bucket_code, bucket_bound = fp_code_table(mode)
+    exp_bits, man_bits, max_norm, _, nan_code = FP_FORMATS[mode]
+    x = np.asarray(x, dtype=np.float32)
+    shape = x.shape
+    x = x.reshape(-1)
+    abs_x = np.abs(x)
+
+    # The code is the number of boundaries at or below the magnitude,
+    # which saturates at max_norm
+    abs_bits = abs_x.view(np.uint32)
+    bucket = abs_bits >> FP_BUCKET_SHIFT
+    codes = bucket_code[bucket]
+    codes += abs_bits >= bucket_bound[bucket]
+    codes |= (x < 0).view(np.uint8) << np.uint8(exp_bits + man_bits)
+    q = signed_table[codes]
+
+    isnan = np.isnan(x)
+    if overflow.upper() == "SAT":
+        # Only the FP8 formats have NaN, the others return zero
+        if isnan.any():
+            q[isnan] = np.nan if nan_code is not None else 0.0
+            if nan_code is None:
+                codes[isnan] = 0
+    else:  # OVF
+        q[isnan | (abs_x > max_norm)] = np.nan
+        if nan_code is None:
+            q[isnan] = 0.0
+    if not return_codes:
+        return q.reshape(shape)
 
-def fp864_quantize(x, mode="E4M3", overflow="SAT"):
+    if nan_code is not None:
+        codes[np.isnan(q)] = nan_code
+    return q.reshape(shape), codes.reshape(shape)
+
+
+# Values of the codes of a format, e.g. of a stored quantized AM
+def fp864_decode(codes, mode="E4M3"):
+    _, signed_table, _, _ = fp_code_table(mode)
+    return signed_table[np.asarray(codes, dtype=np.uint8)]
+
+
+# Per-element reference of fp864_quantize
+def fp864_quantize_ref(x, mode="E4M3", overflow="SAT"):
     x = np.asarray(x, dtype=np.float32)
     sign_bit = (x < 0).astype(np.uint8)
     abs_x = np.abs(x)
@@ -107,3 +220,28 @@ def fp864_quantize(x, mode="E4M3", overflow="SAT"):
             encoded[over_mask] = nan_code
 
     return q.astype(np.float32)  # , encoded
+
+
+if __name__ == "__main__":
+    # The table-driven quantizer must match the reference on a grid of
+    # all magnitudes, their midpoints and neighbours, and random values
+    rng = np.random.default_rng(0)
+    for mode in FP_FORMATS:
+        table = fp_code_table(mode)[0]
+        points = np.concatenate([table, (table[:-1] + table[1:]) / 2, table / 2])
+        grid = np.concatenate(
+            [
+                points,
+                np.nextafter(points, np.float32(np.inf)),
+                np.nextafter(points, np.float32(-np.inf)),
+                np.linspace(0, 1.5 * table[-1], 100001, dtype=np.float32),
+                2.0 ** rng.uniform(-20, np.log2(table[-1]) + 2, 100000),
+                [np.inf, 1e30, 1e-30],
+            ]
+        ).astype(np.float32)
+        grid = np.concatenate([grid, -grid])
+        q_ref = fp864_quantize_ref(grid, mode)
+        q, codes = fp864_quantize(grid, mode, return_codes=True)
+        assert np.array_equal(q.view(np.uint32), q_ref.view(np.uint32)), mode
+        assert np.array_equal(fp864_decode(codes, mode), q), mode
+        print(f"Pass! {mode} table quantizer check")
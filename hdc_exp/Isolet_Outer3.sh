@@ -1,7 +1,6 @@
 conda activate hypercorex
 
-for i in {1..5}; do
-    echo "Run $i"
-    python hdc_exp/Isolet_Outer3.py "$i" &
-done
-disown
\ No newline at end of file
+# Runs every point of the grid for 5 seeds in a process pool,
+# rerun it to resume a sweep that stopped
+python hdc_exp/Isolet_Outer3.py --seeds 1 2 3 4 5 &
+disown
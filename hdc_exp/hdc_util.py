@@ -17,7 +17,9 @@ import tarfile
 import io
 import copy
 import math
-from FP_quantize_util import fp864_quantize
+import hashlib
+import functools
+from FP_quantize_util import fp864_quantize, fp_code_table
 
 
 """
@@ -124,12 +126,18 @@ def uint_convert_level(in_data, dst_levels, scale=1):
 
 
 # Convert levels of a dataset
+# All samples of a class are converted at once,
+# ragged samples are converted one by one
 def convert_levels(dataset, val_levels, scale=1):
     for key in dataset:
+        if len(set(len(sample) for sample in dataset[key])) == 1:
+            samples = np.asarray(dataset[key])
+            dataset[key] = uint_convert_level(samples, val_levels, scale).tolist()
+            continue
         for j in range(len(dataset[key])):
-            dataset[key][j] = [
-                uint_convert_level(x, val_levels, scale) for x in dataset[key][j]
-            ]
+            dataset[key][j] = uint_convert_level(
+                np.asarray(dataset[key][j]), val_levels, scale
+            ).tolist()
     return dataset
 
 
@@ -220,19 +228,138 @@ def reshape_hv_list(hv_list, sub_elem_size):
             - hv_type: element hv_type, if bipolar we do haddamard multiplcation
             - density: hv_type of density binding
     
+    get_kernels:
+        - the bind, binarize and norm_dist functions of a
+          (hv_type, quant_type), resolved once and cached like
+          get_quantizer, so hot loops call them without dispatching
+          on hv_type strings; bind_hv, binarize_hv and norm_dist_hv
+          call these kernels
+        - arguments:
+            - hv_type: element hv_type
+            - quant_type: one of QUANT_SPECS, or None
+
     circ_perm_hv:
         - for circular permutations
         - arguments:
             - hv_a: hypervector to permute
             - permute_amt: number of circular permutes
+
+    encode_ngram_hv:
+        - for bundling all n-grams of a symbol sequence at once
+        - a permuted IM is made per n-gram position, the windows
+          are gathered as rows and bound in place
+        - arguments:
+            - symbols: IM index per position, negative indices
+                       are skipped symbols that bind as the identity
+            - ortho_im: item memory, one HV per symbol
+            - ngram_len: number of symbols per n-gram
+            - perm_shifts: permutation per n-gram position, default j
+            - num_windows: number of n-grams, default all windows
+            - hv_type: element hv_type
     
+    encode_record_hv:
+        - for bundling the ID-level bound HVs of all features of a sample
+        - the bound HVs of every feature and level are precomputed
+          once per (ortho_im, cim) pair into a table when it fits in
+          BOUND_TABLE_BYTES, otherwise they are bound per sample
+        - arguments:
+            - sample: level index per feature
+            - ortho_im: item memory, one ID HV per feature
+            - cim: continuous item memory, one HV per level
+            - hv_type: element hv_type
+
     binarize_hv:
         - for binarizing summed hypervectors
         - arguments:
             - hv_a: hypervecetor to binarize
             - threshold: threshold to set 1s for binary hv_type
             - hv_type: hv_type of hypervector, if bipolar we threshold at 0
-            
+
+    quantize_hv:
+        - for quantizing summed hypervectors to INT, FP or level types
+        - the quantizer of each (hv_type, quant_type) is built once
+          by get_quantizer with its level table from QUANT_SPECS,
+          the *_alt types pick the nearest level with np.searchsorted
+        - arguments:
+            - encoded_line: one HV or an (N, D) batch of HVs
+            - threshold: half the bundle size, or one per HV of a batch
+            - hv_type: hv_type of hypervector
+            - quant_type: one of QUANT_SPECS
+            - class_hv: if True, the threshold is scaled for class HVs
+            - return_codes: if True, returns the integer codes and
+                            one scale per HV instead of the values
+
+    get_code_table:
+        - the code bits, the value of each code and the code_step
+          of a quant_type, values are 16-bit integers times code_step,
+          except for FP8 whose codes keep their float values
+        - int codes are two's complement, fp codes are sign-magnitude
+          and *_alt codes are level indices
+        - arguments:
+            - quant_type: one of QUANT_SPECS
+
+    pack_codes, unpack_codes:
+        - codes of up to 4 bits are stored two per byte
+        - arguments:
+            - codes, packed_codes: codes of one HV or an (N, D) batch
+            - code_bits: bits per code
+            - hv_dim: dimension of the unpacked HVs
+
+    dequantize_hv:
+        - values of quantize_hv from its codes and scales
+        - arguments:
+            - codes: codes of one HV or an (N, D) batch
+            - scale: scale per HV
+            - quant_type: one of QUANT_SPECS
+
+    quantize_am:
+        - quantizes the class HVs of the integer AM into a dict of
+          packed codes and one scale per class, same as train_model
+        - arguments:
+            - class_am_int: non-binarized AM of train_model
+            - class_am_elem_count: bundled HVs per class
+            - hv_type: hv_type of hypervector
+            - quant_type: one of QUANT_SPECS
+
+    quant_am_bytes:
+        - bytes of a quantized AM as stored, and of a hardware AM
+          with code_bits per element and an FP32 scale per class
+        - arguments:
+            - quant_am: quantized AM of quantize_am
+
+    postprocess_hv:
+        - binarize_hv, or quantize_hv if quant_type is set
+        - arguments:
+            - encoded_hvs: one HV or an (N, D) batch of HVs
+            - threshold: threshold of the HV, or one per HV of a batch
+            - hv_type: hv_type of hypervector
+            - quant_type: one of QUANT_SPECS, or None to binarize
+            - return_codes: see quantize_hv
+
+    encode_dataset_cached:
+        - the raw (not binarized) encodings of the first num_samples
+          samples of each class, as an (N, D) matrix and the
+          N thresholds, these are the same for every quant_type
+        - the cache is keyed by a hash of the encoder, the IMs and
+          the samples, only the last encoded dataset is kept
+        - arguments:
+            - dataset: dict of class to samples
+            - num_samples: number of samples per class
+            - ortho_im, cim: item memories of the encoder
+            - encode_raw_function: returns the raw HV and
+                                   threshold of a sample
+
+    postprocess_dataset:
+        - postprocess_hv of every class of encode_dataset_cached,
+          one class at a time and kept compact: binarized HVs as
+          int8, quantized HVs as (codes, scale) per sample
+        - train_model and test_model take the result as dataset with
+          postprocessed_encode_function(quant_type) as encode function,
+          or with encoded_identity for the codes of quant_prediction_set
+        - arguments:
+            - encoded_dataset: result of encode_dataset_cached
+            - hv_type, quant_type: see postprocess_hv
+
     norm_dist_hv:
         - for calculating the normalized distances
         - arguments:
@@ -292,14 +419,68 @@ def rand_flip_hv(hv, start_flips, end_flips, hv_type="binary"):
     return hv
 
 
+# Kernels of each (hv_type, quant_type), see make_kernels
+kernel_cache = dict()
+
+
+# Binarize into 0/1, with one int64 output and no np.where temporaries
+def binarize_binary(hv_a, threshold):
+    hv_a = np.asarray(hv_a)
+    binarized = np.empty(np.broadcast(hv_a, threshold).shape, dtype=np.int64)
+    return np.greater_equal(hv_a, threshold, out=binarized)
+
+
+# Binarize into -1/+1 at 0, the threshold is not used
+def binarize_bipolar(hv_a, threshold):
+    binarized = binarize_binary(hv_a, 0)
+    binarized <<= 1
+    binarized -= 1
+    return binarized
+
+
+# Hamming similarity of two 0/1 HVs
+def norm_dist_hamming(hv_a, hv_b):
+    ham_dist = np.sum(np.bitwise_xor(hv_a, hv_b))
+    return 1 - (ham_dist / hv_a.size)
+
+
+# Cosine similarity of bipolar or quantized HVs
+def norm_dist_cosine(hv_a, hv_b):
+    hv_dot = np.dot(hv_a, hv_b)
+    norm_a = np.linalg.norm(hv_a)
+    norm_b = np.linalg.norm(hv_b)
+    if (norm_a == 0) or (norm_b == 0):
+        norm_factor = 1
+    else:
+        norm_factor = norm_a * norm_b
+    return hv_dot / norm_factor
+
+
+# The bind, binarize and norm_dist functions of a (hv_type, quant_type),
+# bipolar HVs multiply and binary HVs XOR, and quantized or bipolar HVs
+# are compared by cosine similarity instead of the hamming distance
+def make_kernels(hv_type="binary", quant_type=None):
+    bipolar = hv_type == "bipolar"
+    return {
+        "bind": np.multiply if bipolar else np.bitwise_xor,
+        "binarize": binarize_bipolar if bipolar else binarize_binary,
+        "norm_dist": (
+            norm_dist_cosine if bipolar or quant_type is not None else norm_dist_hamming
+        ),
+    }
+
+
+# Cached kernels of a (hv_type, quant_type)
+def get_kernels(hv_type="binary", quant_type=None):
+    key = (hv_type, quant_type)
+    if key not in kernel_cache:
+        kernel_cache[key] = make_kernels(hv_type, quant_type)
+    return kernel_cache[key]
+
+
 # Binding dense functions
 def bind_hv(hv_a, hv_b, hv_type="binary"):
-    # If bipolar we do multiplication
-    # otherwise we do bit-wise XOR
-    if hv_type == "bipolar":
-        return np.multiply(hv_a, hv_b)
-    else:
-        return np.bitwise_xor(hv_a, hv_b)
+    return get_kernels(hv_type)["bind"](hv_a, hv_b)
 
 
 # Circular permutations
@@ -307,187 +488,462 @@ def circ_perm_hv(hv_a, permute_amt):
     return np.roll(hv_a, permute_amt)
 
 
+# Bundle of all n-grams of a sequence of IM indices
+def encode_ngram_hv(
+    symbols, ortho_im, ngram_len, perm_shifts=None, num_windows=None, hv_type="binary"
+):
+    if perm_shifts is None:
+        perm_shifts = range(ngram_len)
+    if num_windows is None:
+        num_windows = len(symbols) - ngram_len + 1
+
+    encoded_hv = gen_empty_hv(len(ortho_im[0]))
+    if num_windows <= 0:
+        return encoded_hv
+
+    # Only the used rows, plus an identity row for skipped symbols
+    symbols = np.asarray(symbols)
+    item_im = np.asarray(ortho_im[: max(int(symbols.max()) + 1, 1)])
+    identity = 1 if hv_type == "bipolar" else 0
+    identity_row = np.full((1, item_im.shape[1]), identity, dtype=item_im.dtype)
+    item_im = np.concatenate((item_im, identity_row))
+    symbols = np.where(symbols < 0, len(item_im) - 1, symbols)
+
+    # Bind the permuted symbols of all windows, one n-gram position at a time
+    ngram_hvs = None
+    for ngram, shift in enumerate(perm_shifts):
+        perm_im = np.roll(item_im, shift, axis=1)
+        char_hvs = perm_im[symbols[ngram : ngram + num_windows]]
+        if ngram_hvs is None:
+            ngram_hvs = char_hvs
+        elif hv_type == "bipolar":
+            np.multiply(ngram_hvs, char_hvs, out=ngram_hvs)
+        else:
+            np.bitwise_xor(ngram_hvs, char_hvs, out=ngram_hvs)
+
+    encoded_hv += ngram_hvs.sum(axis=0)
+    return encoded_hv
+
+
+# Max bytes of the bound table of encode_record_hv
+BOUND_TABLE_BYTES = 1 << 28
+
+# Bound table of encode_record_hv, only the last one is kept
+bound_table_cache = dict()
+
+
+# Table of all ID-level bound HVs, or None if too large
+def get_bound_table(ortho_im, cim, num_features, hv_type="binary"):
+    key = (id(ortho_im), id(cim), num_features, hv_type)
+    if key not in bound_table_cache:
+        bound_table = None
+        id_hvs = np.asarray(ortho_im[:num_features])
+        level_hvs = np.asarray(cim)
+        # Binary and bipolar elements fit in 8 bits,
+        # so they are bound in 8 bits too
+        small_id_hvs = id_hvs.astype(np.int8)
+        small_level_hvs = level_hvs.astype(np.int8)
+        table_bytes = small_id_hvs.itemsize * num_features * level_hvs.size
+        if (
+            table_bytes <= BOUND_TABLE_BYTES
+            and np.array_equal(small_id_hvs, id_hvs)
+            and np.array_equal(small_level_hvs, level_hvs)
+        ):
+            bound_table = bind_hv(
+                small_id_hvs[:, None], small_level_hvs[None, :], hv_type=hv_type
+            )
+        # The IMs are kept with the table so their ids stay unique
+        bound_table_cache.clear()
+        bound_table_cache[key] = (ortho_im, cim, bound_table)
+    return bound_table_cache[key][2]
+
+
+# Bundle of ID-level bound HVs
+def encode_record_hv(sample, ortho_im, cim, hv_type="binary"):
+    sample = np.asarray(sample)
+    num_features = len(sample)
+    encoded_sample = gen_empty_hv(len(ortho_im[0]))
+
+    bound_table = get_bound_table(ortho_im, cim, num_features, hv_type)
+    if bound_table is not None:
+        bound_hvs = bound_table[np.arange(num_features), sample]
+    else:
+        bound_hvs = bind_hv(
+            np.asarray(ortho_im[:num_features]),
+            np.asarray(cim)[sample],
+            hv_type=hv_type,
+        )
+    # 32-bit counters are plenty and faster to add than 64-bit ones
+    encoded_sample += bound_hvs.sum(axis=0, dtype=np.int32)
+    return encoded_sample
+
+
 # Binarize hypervector
 def binarize_hv(hv_a, threshold, hv_type="binary"):
-    # Binarize depending on hv_type
-    # If it's binary use a threshold for this
-    if hv_type == "bipolar":
-        hv_a = np.where(hv_a >= 0, 1, -1)
-    else:
-        hv_a = np.where(hv_a >= threshold, 1, 0)
+    return get_kernels(hv_type)["binarize"](hv_a, threshold)
+
+
+# Max quantized magnitude, kind and parameter of each quant_type:
+# "int" rounds to integers, "fp" rounds to an FP8/FP6/FP4 format,
+# "levels" picks the nearest level of a sorted level table
+QUANT_SPECS = {
+    "INT8": (127.0, "int", None),
+    "INT4": (7.0, "int", None),
+    "INT2": (1.0, "int", None),
+    "FP8_E4M3": (448.0, "fp", "E4M3"),
+    "FP8_E5M2": (57344.0, "fp", "E5M2"),
+    "FP6_E2M3": (7.5, "fp", "E2M3"),
+    "FP6_E3M2": (28.0, "fp", "E3M2"),
+    "FP4_E2M1": (6.0, "fp", "E2M1"),
+    "INT8_alt": (127.5, "levels", np.arange(-127.5, 128.0, 1.0)),
+    "INT4_alt": (7.5, "levels", np.arange(-7.5, 8.0, 1.0)),
+    "INT2_alt": (1.5, "levels", np.array([-1.5, -0.5, 0.5, 1.5])),
+    # no zero point
+    "FP4_E2M1_alt": (
+        6.0,
+        "levels",
+        np.array(
+            [-6.0, -4.0, -3.0, -2.0, -1.5, -1.0, -0.5]
+            + [0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0]
+        ),
+    ),
+}
+
+# Quantizers of quantize_hv, one per (hv_type, quant_type)
+quantizer_cache = dict()
+
+
+# Index of the nearest level of a sorted level table, the lower one on ties
+def nearest_level_idx(x, levels):
+    # Only the two levels around the insertion point can be the
+    # nearest, this avoids a (..., num_levels) distance matrix
+    hi = np.searchsorted(levels, x).clip(1, len(levels) - 1)
+    lo = hi - 1
+    lo += np.abs(x - levels[hi]) < np.abs(x - levels[lo])
+    return lo
+
+
+# Nearest level of a sorted level table, the lower one on ties
+def nearest_level(x, levels):
+    return levels[nearest_level_idx(x, levels)]
+
+
+# Build the quantize function of a (hv_type, quant_type)
+def make_quantizer(hv_type="binary", quant_type="INT8"):
+    if quant_type not in QUANT_SPECS:
+        raise ValueError(f"Unsupported quant_type: {quant_type}")
+    max_q_val, quant_kind, quant_param = QUANT_SPECS[quant_type]
+
+    def quantize(encoded_hvs, threshold, class_hv=False, return_codes=False):
+        encoded_hvs = np.asarray(encoded_hvs)
+        # A threshold per HV of an (N, D) batch applies to its row
+        threshold = np.asarray(threshold, dtype=np.float64)
+        if threshold.ndim > 0:
+            threshold = threshold[..., None]
+
+        if class_hv:
+            threshold = threshold * max_q_val
+        elif hv_type == "binary":
+            # to use symmetric quantization, shifts
+            # range from [0,2*threshold] to [-threshold,threshold]
+            encoded_hvs = encoded_hvs - threshold
+
+        # The range is [-threshold, threshold] for binary,
+        # and [-2*threshold, 2*threshold] for bipolar
+        if hv_type == "binary":
+            scale = np.abs(threshold) / max_q_val
+        else:
+            scale = np.abs(2 * threshold) / max_q_val
+        scale = np.where(scale == 0, 1.0, scale)
+
+        if quant_kind == "int":
+            quantized_vals = (
+                np.round(encoded_hvs / scale)
+                .clip(-max_q_val, max_q_val)
+                .astype(np.int64)
+            )
+        elif quant_kind == "fp":
+            quantized_vals, codes = fp864_quantize(
+                encoded_hvs / scale, mode=quant_param, return_codes=True
+            )
+        else:
+            # The FP4 levels are matched before scaling, as they always were
+            if quant_type == "FP4_E2M1_alt":
+                codes = nearest_level_idx(encoded_hvs, quant_param)
+            else:
+                codes = nearest_level_idx(encoded_hvs / scale, quant_param)
+            quantized_vals = quant_param[codes]
+
+        if return_codes:
+            if quant_kind == "int":
+                # Two's complement codes of code_bits bits
+                codes = quantized_vals & ((1 << get_code_table(quant_type)[0]) - 1)
+            # One scale per HV, the value of a code is
+            # code_vals[code] * code_step * scale
+            hv_scale = np.broadcast_to(scale, encoded_hvs.shape[:-1] + (1,))
+            return codes.astype(np.uint8), hv_scale[..., 0].astype(np.float64)
+        return quantized_vals.astype(np.float64) * scale
+
+    return quantize
 
-    return hv_a
 
+# Cached quantizer of a (hv_type, quant_type)
+def get_quantizer(hv_type="binary", quant_type="INT8"):
+    key = (hv_type, quant_type)
+    if key not in quantizer_cache:
+        quantizer_cache[key] = make_quantizer(hv_type, quant_type)
+    return quantizer_cache[key]
 
+
+# Quantize one HV or an (N, D) batch of HVs
 def quantize_hv(
-    encoded_line, threshold, hv_type="binary", quant_type="INT8", class_hv=False
+    encoded_line,
+    threshold,
+    hv_type="binary",
+    quant_type="INT8",
+    class_hv=False,
+    return_codes=False,
 ):
-    if class_hv:
-        match quant_type:
-            case "INT8":
-                max_q_val = 127.0
-            case "INT4":
-                max_q_val = 7.0
-            case "INT2":
-                max_q_val = 1.0
-            case "FP8_E4M3":
-                max_q_val = 448.0
-            case "FP8_E5M2":
-                max_q_val = 57344.0
-            case "FP6_E2M3":
-                max_q_val = 7.5
-            case "FP6_E3M2":
-                max_q_val = 28.0
-            case "FP4_E2M1":
-                max_q_val = 6.0
-            case "FP4_E2M1_alt":
-                max_q_val = 6.0
-            case "INT2_alt":
-                max_q_val = 1.5
-            case "INT4_alt":
-                max_q_val = 7.5
-            case "INT8_alt":
-                max_q_val = 127.5
-        threshold = threshold * max_q_val
+    quantize = get_quantizer(hv_type, quant_type)
+    return quantize(
+        encoded_line, threshold, class_hv=class_hv, return_codes=return_codes
+    )
+
+
+# Integer code tables of each quant_type, see make_code_table
+code_table_cache = dict()
+
+
+# Bits, value table and step of the codes of a quant_type
+def make_code_table(quant_type="INT8"):
+    if quant_type not in QUANT_SPECS:
+        raise ValueError(f"Unsupported quant_type: {quant_type}")
+    max_q_val, quant_kind, quant_param = QUANT_SPECS[quant_type]
+
+    if quant_kind == "int":
+        # Two's complement, e.g. 8 bits for INT8 and 2 bits for INT2
+        code_bits = int(max_q_val).bit_length() + 1
+        code_vals = np.arange(1 << code_bits, dtype=np.float64)
+        code_vals[code_vals >= (1 << (code_bits - 1))] -= 1 << code_bits
+    elif quant_kind == "fp":
+        # Sign-magnitude codes of the FP format
+        code_vals = fp_code_table(quant_param)[1].astype(np.float64)
+        code_bits = len(code_vals).bit_length() - 1
     else:
-        # to use symmetric quantization, shifts
-        # range from [0,2*threshold] to [-threshold,threshold]
-        if hv_type == "binary":
-            encoded_line -= threshold
-
-    if hv_type == "binary":
-        min_val = -threshold
-        max_val = threshold
-        # min_val = 0 #T3
-        # max_val = 2*threshold #T3
-    else:  # bipolar
-        min_val = -2 * threshold
-        max_val = 2 * threshold
-
-    if quant_type == "INT8":
-        scale = max(abs(min_val), abs(max_val)) / 127.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = np.round(encoded_line / scale).clip(-127, 127).astype(np.int64)
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "INT4":
-        scale = max(abs(min_val), abs(max_val)) / 7.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = np.round(encoded_line / scale).clip(-7.0, 7.0).astype(np.int64)
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "INT2":
-        scale = max(abs(min_val), abs(max_val)) / 1.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = np.round(encoded_line / scale).clip(-1.0, 1.0).astype(np.int64)
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP8_E4M3":
-        scale = max(abs(min_val), abs(max_val)) / 448.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = fp864_quantize(encoded_line / scale, mode="E4M3")
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP8_E5M2":
-        scale = max(abs(min_val), abs(max_val)) / 57344.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = fp864_quantize(encoded_line / scale, mode="E5M2")
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP6_E2M3":
-        scale = max(abs(min_val), abs(max_val)) / 7.5
-        if scale == 0:
-            scale = 1
-        quantized_vals = fp864_quantize(encoded_line / scale, mode="E2M3")
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP6_E3M2":
-        scale = max(abs(min_val), abs(max_val)) / 28.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = fp864_quantize(encoded_line / scale, mode="E3M2")
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP4_E2M1":
-        scale = max(abs(min_val), abs(max_val)) / 6.0
-        if scale == 0:
-            scale = 1
-        quantized_vals = fp864_quantize(encoded_line / scale, mode="E2M1")
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "INT8_alt":
-        scale = max(abs(min_val), abs(max_val)) / 127.5
-        if scale == 0:
-            scale = 1
-        levels = np.arange(-127.5, 128.0, 1.0)
-        quantized_vals = levels[
-            np.argmin(np.abs(encoded_line[..., None] / scale - levels), axis=-1)
-        ]
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "INT4_alt":
-        scale = max(abs(min_val), abs(max_val)) / 7.5
-        if scale == 0:
-            scale = 1
-        levels = np.arange(-7.5, 8.0, 1.0)
-        quantized_vals = levels[
-            np.argmin(np.abs(encoded_line[..., None] / scale - levels), axis=-1)
-        ]
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "INT2_alt":
-        scale = max(abs(min_val), abs(max_val)) / 1.5
-        if scale == 0:
-            scale = 1
-        levels = np.array([-1.5, -0.5, 0.5, 1.5])
-        quantized_vals = levels[
-            np.argmin(np.abs(encoded_line[..., None] / scale - levels), axis=-1)
-        ]
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    elif quant_type == "FP4_E2M1_alt":
-        scale = max(abs(min_val), abs(max_val)) / 6.0
-        if scale == 0:
-            scale = 1
-        levels = np.array(
-            [
-                -6.0,
-                -4.0,
-                -3.0,
-                -2.0,
-                -1.5,
-                -1.0,
-                -0.5,
-                0.5,
-                1.0,
-                1.5,
-                2.0,
-                3.0,
-                4.0,
-                6.0,
+        # Index of the level, unused codes are zero
+        code_bits = (len(quant_param) - 1).bit_length()
+        code_vals = np.zeros(1 << code_bits)
+        code_vals[: len(quant_param)] = quant_param
+
+    # The values times the smallest power of two that makes them
+    # integers of 16 bits, formats without these (FP8) keep floats
+    code_step = 1.0
+    for shift in range(16):
+        int_vals = code_vals * 2.0**shift
+        if np.all(int_vals == np.round(int_vals)) and np.all(
+            np.abs(int_vals) < (1 << 15)
+        ):
+            code_vals = int_vals.astype(np.int16)
+            code_step = 2.0**-shift
+            break
+
+    code_vals.flags.writeable = False
+    return code_bits, code_vals, code_step
+
+
+# Cached code table of a quant_type
+def get_code_table(quant_type="INT8"):
+    if quant_type not in code_table_cache:
+        code_table_cache[quant_type] = make_code_table(quant_type)
+    return code_table_cache[quant_type]
+
+
+# Pack codes of up to 4 bits two per byte, the first in the low nibble
+def pack_codes(codes, code_bits):
+    codes = np.asarray(codes, dtype=np.uint8)
+    if code_bits > 4:
+        return codes
+    if codes.shape[-1] % 2:
+        codes = np.concatenate(
+            [codes, np.zeros(codes.shape[:-1] + (1,), dtype=np.uint8)], axis=-1
+        )
+    return codes[..., 0::2] | (codes[..., 1::2] << 4)
+
+
+# Unpack the codes of pack_codes
+def unpack_codes(packed_codes, code_bits, hv_dim):
+    if code_bits > 4:
+        return packed_codes
+    codes = np.empty(packed_codes.shape[:-1] + (2 * packed_codes.shape[-1],), np.uint8)
+    codes[..., 0::2] = packed_codes & 0xF
+    codes[..., 1::2] = packed_codes >> 4
+    return codes[..., :hv_dim]
+
+
+# Values of codes in units of the code_step of a quant_type
+def code_values(codes, quant_type="INT8", dtype=np.float64):
+    code_bits, code_vals, _ = get_code_table(quant_type)
+    if QUANT_SPECS[quant_type][1] == "int":
+        # Sign-extending the two's complement codes beats a table lookup
+        shift = np.int8(8 - code_bits)
+        codes = np.ascontiguousarray(codes, dtype=np.uint8).view(np.int8)
+        return ((codes << shift) >> shift).astype(dtype)
+    return code_vals.astype(dtype)[codes]
+
+
+# Values of quantize_hv from its codes and scales
+def dequantize_hv(codes, scale, quant_type="INT8"):
+    code_step = get_code_table(quant_type)[2]
+    scale = np.asarray(scale, dtype=np.float64)[..., None]
+    return (code_values(codes, quant_type) * code_step) * scale
+
+
+# Quantize the class HVs of an AM into codes and a scale per class
+def quantize_am(class_am_int, class_am_elem_count, hv_type="binary", quant_type="INT8"):
+    am_mat = am_to_mat(class_am_int)
+    # Same threshold per class as train_model and retrain_model
+    threshold = np.array([class_am_elem_count[i] for i in range(len(am_mat))]) / 2
+    codes, scale = quantize_hv(
+        am_mat, threshold, hv_type, quant_type, class_hv=True, return_codes=True
+    )
+    code_bits = get_code_table(quant_type)[0]
+    return {
+        "quant_type": quant_type,
+        "code_bits": code_bits,
+        "hv_dim": am_mat.shape[-1],
+        "codes": pack_codes(codes, code_bits),
+        "scale": scale,
+    }
+
+
+# Stored bytes of a quantized AM, and the bytes of a hardware AM
+# that holds code_bits per element and an FP32 scale per class
+def quant_am_bytes(quant_am):
+    num_classes = len(quant_am["scale"])
+    stored_bytes = quant_am["codes"].nbytes + quant_am["scale"].nbytes
+    code_bits = num_classes * quant_am["hv_dim"] * quant_am["code_bits"]
+    return stored_bytes, -(-code_bits // 8) + 4 * num_classes
+
+
+# Binarize, or quantize if quant_type is set, one HV or an (N, D) batch
+def postprocess_hv(
+    encoded_hvs, threshold, hv_type="binary", quant_type=None, return_codes=False
+):
+    if quant_type is not None:
+        return quantize_hv(
+            encoded_hvs,
+            threshold,
+            hv_type=hv_type,
+            quant_type=quant_type,
+            return_codes=return_codes,
+        )
+    # A threshold per HV of an (N, D) batch applies to its row
+    threshold = np.asarray(threshold)
+    if threshold.ndim > 0:
+        threshold = threshold[..., None]
+    return get_kernels(hv_type)["binarize"](encoded_hvs, threshold)
+
+
+# Raw encodings of encode_dataset_cached, only the last one is kept
+encoded_cache = dict()
+
+
+# Content key of the raw encodings of a dataset
+def encoded_cache_key(dataset, num_samples, ortho_im, cim, encode_raw_function):
+    key_hash = hashlib.sha256()
+
+    # The encoder and its fixed arguments, e.g. the hv_type
+    encoder = encode_raw_function
+    encoder_args = dict()
+    if isinstance(encoder, functools.partial):
+        encoder_args = encoder.keywords
+        encoder = encoder.func
+    encoder_name = f"{encoder.__module__}.{encoder.__qualname__}"
+    key_hash.update(f"{encoder_name} {sorted(encoder_args.items())}".encode())
+
+    # The IMs, which covers their seed, hv_type and hv_dim
+    for im in (ortho_im, cim):
+        if im is not None:
+            im = np.ascontiguousarray(im)
+            key_hash.update(f"{im.shape} {im.dtype}".encode())
+            key_hash.update(im)
+
+    # The samples that are encoded
+    for label in dataset:
+        for sample in dataset[label][:num_samples]:
+            sample = np.ascontiguousarray(sample)
+            key_hash.update(f"{label} {sample.shape} {sample.dtype}".encode())
+            key_hash.update(sample)
+
+    return key_hash.hexdigest()
+
+
+# Raw encodings of the first num_samples samples of each class
+def encode_dataset_cached(dataset, num_samples, ortho_im, cim, encode_raw_function):
+    key = encoded_cache_key(dataset, num_samples, ortho_im, cim, encode_raw_function)
+    if key not in encoded_cache:
+        encoded_dataset = dict()
+        for label in dataset:
+            encoded_set = [
+                encode_raw_function(sample, ortho_im, cim)
+                for sample in dataset[label][:num_samples]
             ]
-        )  # no zero point
-        quantized_vals = levels[
-            np.argmin(np.abs(encoded_line[..., None] - levels), axis=-1)
-        ]
-        quant_encoded_line = quantized_vals.astype(np.float64) * scale
-    return quant_encoded_line
+            encoded_hvs = np.array([encoded_hv for encoded_hv, _ in encoded_set])
+            thresholds = np.array(
+                [threshold for _, threshold in encoded_set], dtype=np.float64
+            )
+            # Bundled counts fit in 16 bits, a quarter of the memory
+            small_hvs = encoded_hvs.astype(np.int16)
+            if np.array_equal(small_hvs, encoded_hvs):
+                encoded_hvs = small_hvs
+            encoded_dataset[label] = (encoded_hvs, thresholds)
+        encoded_cache.clear()
+        encoded_cache[key] = encoded_dataset
+    return encoded_cache[key]
+
+
+# postprocess_hv of every class of encode_dataset_cached, kept as
+# int8 HVs, or as a list of (codes, scale) per class if quantized,
+# so a sweep point holds no full-width copy of the dataset
+def postprocess_dataset(encoded_dataset, hv_type="binary", quant_type=None):
+    postprocessed = dict()
+    for label, (encoded_hvs, thresholds) in encoded_dataset.items():
+        if quant_type is None:
+            encoded_hvs = postprocess_hv(encoded_hvs, thresholds, hv_type)
+            postprocessed[label] = encoded_hvs.astype(np.int8)
+        else:
+            codes, scale = postprocess_hv(
+                encoded_hvs, thresholds, hv_type, quant_type, return_codes=True
+            )
+            postprocessed[label] = list(zip(codes, scale))
+    return postprocessed
+
+
+# Encode function of postprocess_dataset, which decodes one
+# sample at a time back to the values of postprocess_hv
+def postprocessed_encode_function(quant_type=None):
+    if quant_type is None:
+        return encoded_identity
+    return functools.partial(encoded_dequantize, quant_type=quant_type)
+
+
+# Values of one (codes, scale) sample of postprocess_dataset
+def encoded_dequantize(encoded_hv, ortho_im, cim, quant_type="INT8"):
+    codes, scale = encoded_hv
+    return dequantize_hv(codes, scale, quant_type)
+
+
+# Encode function of datasets whose samples are already encoded,
+# e.g. by postprocess_dataset
+def encoded_identity(encoded_hv, ortho_im, cim):
+    return encoded_hv
 
 
 # Normalized distance calculation
 # the output range is from 0 to 1
 # where 1 is the highest similarity
 def norm_dist_hv(hv_a, hv_b, hv_type="binary", quant_type=None):
-    # If binary we do hamming distance,
-    # else we do cosine similarity
-    if (hv_type == "bipolar") or (quant_type is not None):
-        hv_dot = np.dot(hv_a, hv_b)
-        norm_a = np.linalg.norm(hv_a)
-        norm_b = np.linalg.norm(hv_b)
-        if (norm_a == 0) or (norm_b == 0):
-            norm_factor = 1
-        else:
-            norm_factor = norm_a * norm_b
-        dist = hv_dot / (norm_factor)
-    else:
-        ham_dist = np.sum(np.bitwise_xor(hv_a, hv_b))
-        dist = 1 - (ham_dist / hv_a.size)
-
-    return dist
+    return get_kernels(hv_type, quant_type)["norm_dist"](hv_a, hv_b)
 
 
 # Calculatiing confusion matrix
@@ -496,9 +952,10 @@ def gen_conf_mat(num_levels, hv_list):
     conf_mat = np.zeros((num_levels, num_levels))
 
     # Iterate through different levels
+    norm_dist = get_kernels()["norm_dist"]
     for i in tqdm(range(num_levels), desc="Generating confusion matrix"):
         for j in range(num_levels):
-            conf_mat[i][j] = norm_dist_hv(hv_list[i], hv_list[j])
+            conf_mat[i][j] = norm_dist(hv_list[i], hv_list[j])
 
     return conf_mat
 
@@ -899,6 +1356,7 @@ def train_model(
     num_classes = len(train_dataset)
     hv_dim = len(ortho_im[0])
     train_threshold = num_train / 2
+    binarize = get_kernels(hv_type)["binarize"]
 
     # Initialize associative memory
     class_am = dict()
@@ -931,7 +1389,7 @@ def train_model(
                 class_hv, train_threshold, hv_type, quant_type=quant_type, class_hv=True
             )
         else:
-            class_hv = binarize_hv(class_hv, train_threshold, hv_type)
+            class_hv = binarize(class_hv, train_threshold)
         class_am[num_class] = class_hv
 
         # Save threshold list
@@ -953,6 +1411,7 @@ def test_model(
     print_mode=0,
     hv_type="binary",
     quant_type=None,
+    quant_am=None,
 ):
     # Logging modes
     disable_per_class_accuracy = False
@@ -978,6 +1437,11 @@ def test_model(
     # Extract parameters
     num_classes = len(test_dataset)
 
+    # The AM does not change so we cache it for all searches
+    if quant_am is None:
+        class_am_mat = am_to_mat(class_am)
+        class_am_norm = am_norms(class_am_mat, hv_type=hv_type, quant_type=quant_type)
+
     counts = []
     scores = []
     accuracies = []
@@ -986,25 +1450,33 @@ def test_model(
     for num_class in tqdm(
         range(num_classes), disable=disable_test_bar, desc="Testing progress"
     ):
-        total_count = 0
-        total_score = 0
-
-        # Make predictions
-        for i in tqdm(
-            range(num_test), disable=disable_per_class_bar, desc=f"Testing: {num_class}"
-        ):
-            # Encode value
-            qhv = encode_function(
+        # Encode values
+        qhv_set = [
+            encode_function(
                 test_dataset[num_class][starting_num_test + i], ortho_im, cim
             )
-            # Get prediction
-            prediction = prediction_idx(
-                class_am, qhv, hv_type=hv_type, quant_type=quant_type
+            for i in tqdm(
+                range(num_test),
+                disable=disable_per_class_bar,
+                desc=f"Testing: {num_class}",
+            )
+        ]
+
+        # Get predictions
+        if quant_am is None:
+            predictions = prediction_set(
+                class_am_mat,
+                qhv_set,
+                hv_type=hv_type,
+                quant_type=quant_type,
+                am_norm=class_am_norm,
             )
-            # Update score
-            if prediction == num_class:
-                total_score += 1
-            total_count += 1
+        else:
+            predictions = quant_prediction_set(quant_am, qhv_set)
+
+        # Update score
+        total_score = int(np.sum(np.array(predictions) == num_class))
+        total_count = len(predictions)
 
         # Calculate accuracy
         accuracy = total_score / total_count if total_count > 0 else 0
@@ -1074,33 +1546,34 @@ def test_model_cuts_version(
     for num_class in tqdm(
         range(num_classes), disable=disable_test_bar, desc="Testing progress"
     ):
-        total_count = 0
-        total_score = 0
+        # Accumulated scores of all samples over all cuts
+        predict_score_data = np.zeros((num_test, num_classes))
 
-        # Make predictions
-        for i in tqdm(
-            range(num_test), disable=disable_per_class_bar, desc=f"Testing: {num_class}"
+        for set_num in tqdm(
+            range(num_cuts), disable=disable_per_class_bar, desc=f"Testing: {num_class}"
         ):
-            # Encode value
-            predict_score_data = np.zeros(num_classes).astype(int)
-
-            for set_num in range(num_cuts):
-                qhv = encode_function(
+            # Encode values
+            qhv_set = [
+                encode_function(
                     test_dataset[num_class][starting_num_test + i],
                     ortho_im[set_num],
                     cim,
                 )
-                # Get prediction
-                predict_score_data = predict_score_data + np.array(
-                    predict_score_list(class_am[set_num], qhv, hv_type="binary")
+                for i in range(num_test)
+            ]
+            # Get scores
+            if num_test > 0:
+                _, _, score_mat = am_search(
+                    class_am[set_num], qhv_set, hv_type="binary"
                 )
-            # Find maximum of the max predicted score_list
-            prediction = np.argmax(predict_score_data)
+                predict_score_data += score_mat
+
+        # Find maximum of the max predicted score_list
+        predictions = np.argmax(predict_score_data, axis=-1)
 
-            # Update score
-            if prediction == num_class:
-                total_score += 1
-            total_count += 1
+        # Update score
+        total_score = int(np.sum(predictions == num_class))
+        total_count = num_test
 
         # Calculate accuracy
         accuracy = total_score / total_count if total_count > 0 else 0
@@ -1157,20 +1630,29 @@ def retrain_model(
     class_am_int_copy = copy.deepcopy(class_am_int)
     class_am_elem_count_copy = copy.deepcopy(class_am_elem_count)
 
+    # The searched AM does not change so we cache it for all searches
+    class_am_mat = am_to_mat(class_am)
+    class_am_norm = am_norms(class_am_mat, hv_type=hv_type)
+
     for num_class in tqdm(
         range(num_classes), disable=disable_train_bar, desc="Training progress"
     ):
-        for i in tqdm(
-            range(num_retrain),
-            disable=disable_per_class_bar,
-            desc=f"Retraining: {num_class}",
-        ):
-            # Get encodede sample
-            encoded_line = encode_function(retrain_dataset[num_class][i], ortho_im, cim)
+        # Get encoded samples
+        encoded_set = [
+            encode_function(retrain_dataset[num_class][i], ortho_im, cim)
+            for i in tqdm(
+                range(num_retrain),
+                disable=disable_per_class_bar,
+                desc=f"Retraining: {num_class}",
+            )
+        ]
 
-            # Get prediction
-            prediction = prediction_idx(class_am, encoded_line, hv_type=hv_type)
+        # Get predictions
+        predictions = prediction_set(
+            class_am_mat, encoded_set, hv_type=hv_type, am_norm=class_am_norm
+        )
 
+        for encoded_line, prediction in zip(encoded_set, predictions):
             # Update AM for every incorrect prediction
             if prediction != num_class:
                 # Update the class AMs
@@ -1182,12 +1664,11 @@ def retrain_model(
                 class_am_elem_count_copy[num_class] += 1
 
     # After updating rebinarize the AM
+    binarize = get_kernels(hv_type)["binarize"]
     for num_class in range(num_classes):
         # Save binarized AM
         threshold = class_am_elem_count_copy[num_class] / 2
-        class_am_copy[num_class] = binarize_hv(
-            class_am_int_copy[num_class], threshold, hv_type
-        )
+        class_am_copy[num_class] = binarize(class_am_int_copy[num_class], threshold)
 
     # Print for newline
     print()
@@ -1275,6 +1756,27 @@ def predict_item(ortho_im, cim, class_am, sample, encode_function, hv_type="bina
 """
     Functions for testing purposes
     
+    am_search:
+        - batched search of Q query HVs against the C class HVs
+        - returns the predicted index per query, the top_k indices
+          per query, and the (Q, C) score matrix
+        - arguments:
+            - assoc_mem: the associative memory, dict or matrix
+            - query_hv_set: query hypervectors, one per row
+            - hv_type: is HV type to use
+            - quant_type: quantization type, uses cosine similarity if set
+            - am_norm: cached norms from am_norms
+            - top_k: number of best classes to return per query
+
+    quant_am_search:
+        - am_search of query codes against a quantized AM, the
+          dot products of the integer code values are accumulated
+          in int32 and normalized into cosine similarities
+        - arguments:
+            - quant_am: quantized AM of quantize_am
+            - query_codes: codes of quantize_hv, one HV per row
+            - top_k: number of best classes to return per query
+
     prediction_idx:
         - returns the predicted index from the associative memory
         - arguments:
@@ -1288,6 +1790,13 @@ def predict_item(ortho_im, cim, class_am, sample, encode_function, hv_type="bina
             - assoc_mem: associative memory model
             - query_hv_set: query hyper vectors set
             - hv_type: is HV type to use
+
+    quant_prediction_set:
+        - prediction_set of (codes, scale) query HVs
+          from quantize_hv with return_codes
+        - arguments:
+            - quant_am: quantized AM of quantize_am
+            - query_hv_set: query (codes, scale) set
             
     measure_acc:
         - measures the accuracy between a test set and the correct set
@@ -1299,42 +1808,150 @@ def predict_item(ortho_im, cim, class_am, sample, encode_function, hv_type="bina
 """
 
 
-# Returns the predicted index
-def prediction_idx(assoc_mem, query_hv, hv_type="binary", quant_type=None):
-    score_list = []
+# Stack an AM given as a dict of class HVs into a matrix
+def am_to_mat(assoc_mem):
+    if isinstance(assoc_mem, dict):
+        return np.array([assoc_mem[i] for i in range(len(assoc_mem))])
+    return np.asarray(assoc_mem)
 
-    for i in range(len(assoc_mem)):
-        score_list.append(
-            norm_dist_hv(assoc_mem[i], query_hv, hv_type=hv_type, quant_type=quant_type)
-        )
 
-    predict_idx = np.argmax(score_list)
+# Norm terms of the AM, cache these for repeated searches
+def am_norms(assoc_mem, hv_type="binary", quant_type=None):
+    am_mat = am_to_mat(assoc_mem)
+    if (hv_type == "bipolar") or (quant_type is not None):
+        return np.linalg.norm(am_mat, axis=-1)
+    return np.sum(am_mat, axis=-1)
+
+
+# Batched search of query HVs against the AM
+def am_search(
+    assoc_mem, query_hv_set, hv_type="binary", quant_type=None, am_norm=None, top_k=1
+):
+    am_mat = am_to_mat(assoc_mem)
+    query_mat = np.atleast_2d(np.asarray(query_hv_set))
+
+    if am_norm is None:
+        am_norm = am_norms(am_mat, hv_type=hv_type, quant_type=quant_type)
+
+    hv_dot = query_mat @ am_mat.T
+
+    # Cosine similarity, same as norm_dist_hv
+    # else hamming distance which for 0/1 elements is |a| + |b| - 2 a.b
+    if (hv_type == "bipolar") or (quant_type is not None):
+        norm_factor = np.outer(np.linalg.norm(query_mat, axis=-1), am_norm)
+        norm_factor[norm_factor == 0] = 1
+        score_mat = hv_dot / norm_factor
+    else:
+        query_norm = np.sum(query_mat, axis=-1)
+        ham_dist = query_norm[:, None] + am_norm[None, :] - 2 * hv_dot
+        score_mat = 1 - (ham_dist / query_mat.shape[-1])
+
+    predict_idx = np.argmax(score_mat, axis=-1)
+    # Stable sort keeps the lowest index first on ties, same as argmax
+    topk_idx = np.argsort(-score_mat, axis=-1, kind="stable")[:, :top_k]
+
+    return predict_idx, topk_idx, score_mat
+
 
-    return predict_idx
+# Largest integer up to which float32 sums are exact
+QUANT_F32_EXACT = 1 << 24
+
+
+# Batched search of query codes against a quantized AM
+def quant_am_search(quant_am, query_codes, top_k=1):
+    quant_type = quant_am["quant_type"]
+    hv_dim = quant_am["hv_dim"]
+    _, code_vals, _ = get_code_table(quant_type)
+    am_codes = unpack_codes(quant_am["codes"], quant_am["code_bits"], hv_dim)
+    query_codes = np.atleast_2d(np.asarray(query_codes, dtype=np.uint8))
+
+    if code_vals.dtype.kind == "f":
+        # FP8 codes have no small integer values, their dot products
+        # are taken on the decoded values like am_search does
+        chunk = 0
+        sum_dtype = np.float64
+    else:
+        # Float32 products of the integer values are summed exactly over
+        # chunks whose sums stay below QUANT_F32_EXACT, these are then
+        # accumulated in int32, or int64 if an int32 sum could overflow
+        max_sq = int(np.abs(code_vals).max()) ** 2
+        chunk = QUANT_F32_EXACT // max_sq
+        sum_dtype = np.int32 if max_sq * hv_dim < (1 << 31) else np.int64
+    if chunk < 256:
+        # Too many small chunks, float64 sums are exact up to 2**53
+        chunk = hv_dim
+        val_dtype = np.float64
+    else:
+        val_dtype = np.float32
+
+    am_vals = code_values(am_codes, quant_type, val_dtype)
+    query_vals = code_values(query_codes, quant_type, val_dtype)
+    hv_dot = np.zeros((len(query_vals), len(am_vals)), dtype=sum_dtype)
+    query_sq = np.zeros(len(query_vals), dtype=sum_dtype)
+    am_sq = np.zeros(len(am_vals), dtype=sum_dtype)
+    for start in range(0, hv_dim, chunk):
+        query_part = query_vals[:, start : start + chunk]
+        am_part = am_vals[:, start : start + chunk]
+        hv_dot += (query_part @ am_part.T).astype(sum_dtype)
+        query_sq += np.einsum("nd,nd->n", query_part, query_part).astype(sum_dtype)
+        am_sq += np.einsum("cd,cd->c", am_part, am_part).astype(sum_dtype)
+
+    # Cosine similarity, same as am_search with quant_type,
+    # the code_step and per-HV scales cancel out
+    norm_factor = np.outer(np.sqrt(query_sq), np.sqrt(am_sq))
+    norm_factor[norm_factor == 0] = 1
+    score_mat = hv_dot / norm_factor
+
+    predict_idx = np.argmax(score_mat, axis=-1)
+    topk_idx = np.argsort(-score_mat, axis=-1, kind="stable")[:, :top_k]
+
+    return predict_idx, topk_idx, score_mat
+
+
+# Returns the predicted index
+def prediction_idx(assoc_mem, query_hv, hv_type="binary", quant_type=None):
+    predict_idx, _, _ = am_search(
+        assoc_mem, query_hv, hv_type=hv_type, quant_type=quant_type
+    )
+    return predict_idx[0]
 
 
 # Return score list only
 def predict_score_list(assoc_mem, query_hv, hv_type="binary", quant_type=None):
-    score_list = []
-
-    for i in range(len(assoc_mem)):
-        score_list.append(
-            norm_dist_hv(assoc_mem[i], query_hv, hv_type=hv_type, quant_type=quant_type)
-        )
-    return score_list
+    _, _, score_mat = am_search(
+        assoc_mem, query_hv, hv_type=hv_type, quant_type=quant_type
+    )
+    return list(score_mat[0])
 
 
 # Get prediction set
-def prediction_set(assoc_mem, query_hv_set, hv_type="binary"):
-    # Initialize prediction set
-    predict_set = []
-    len_query_hv_set = len(query_hv_set)
+def prediction_set(
+    assoc_mem, query_hv_set, hv_type="binary", quant_type=None, am_norm=None
+):
+    # Nothing to predict
+    if len(query_hv_set) == 0:
+        return []
+
+    # Predict all test elements at once
+    predict_idx, _, _ = am_search(
+        assoc_mem,
+        query_hv_set,
+        hv_type=hv_type,
+        quant_type=quant_type,
+        am_norm=am_norm,
+    )
+    return list(predict_idx)
+
 
-    # Predict test element
-    for i in range(len_query_hv_set):
-        predict_set.append(prediction_idx(assoc_mem, query_hv_set[i], hv_type=hv_type))
+# Get prediction set of (codes, scale) query HVs from a quantized AM
+def quant_prediction_set(quant_am, query_hv_set):
+    # Nothing to predict
+    if len(query_hv_set) == 0:
+        return []
 
-    return predict_set
+    query_codes = [codes for codes, _ in query_hv_set]
+    predict_idx, _, _ = quant_am_search(quant_am, query_codes)
+    return list(predict_idx)
 
 
 # Measuring accuracy for the test set
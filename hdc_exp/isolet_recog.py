@@ -9,110 +9,143 @@ This program implements the ISOLET classification
 using Hyperdimensional Computing (HDC) techniques.
 """
 
+import functools
+import numpy as np
 from hdc_util import (
     extract_git_dataset,
     load_dataset,
     convert_levels,
     train_model,
     test_model,
-    gen_empty_hv,
     gen_orthogonal_im,
     expand_im,
     expand_cim,
-    bind_hv,
-    binarize_hv,
+    encode_record_hv,
     gen_ca90_im_set,
     gen_cim,
     gen_square_cim,
-    quantize_hv,
+    quantize_am,
+    quant_am_bytes,
+    postprocess_hv,
+    encode_dataset_cached,
+    postprocess_dataset,
+    postprocessed_encode_function,
+    encoded_identity,
 )
 
 DATA_URL = "https://github.com/KULeuven-MICAS/hypercorex/releases/download/ds_hdc_isolet_recog_v.0.01/isolet_recog.tar.gz"
 DATA_SET_DIR = "data_set"
 DATA_DIR = f"{DATA_SET_DIR}/isolet_recog"
 
-HV_TYPE = "bipolar"
-QUANT_TYPE = "FP8_E5M2"  # global definitions
+# Parameters shared by all runs, the per-run
+# parameters are in the config of make_config
+SEED_DIM = 32
+ENABLE_HV_EXPANSION = False
+HV_DIM_EXPANSION = 16
+NUM_TOT_IM = 1024
+NUM_PER_IM_BANK = 128
+# NGRAM = 4
+USE_CA90_IM = False
+USE_CA90_CIM = False
+EXTRACT_DATA = True
 
+VAL_LEVELS = 21
+NUM_CLASSES = 26
+NUM_TRAIN = 297
+# NUM_RETRAIN = NUM_TRAIN
+NUM_TEST = 100
 
-def encode_isolet(sample, ortho_im, cim):
+# NUM_FEATURES = 617
+
+CIM_BASE_SEED = 621635317
+BASE_SEEDS = [
+    1103779247,
+    2391206478,
+    3074675908,
+    2850820469,
+    811160829,
+    4032445525,
+    2525737372,
+    2535149661,
+]
+
+
+# Raw (not binarized) encoding and binarization threshold
+def encode_isolet_raw(sample, ortho_im, cim, hv_type="binary"):
     # Encode sample
-    hv_dim = len(ortho_im[0])
-    encoded_sample = gen_empty_hv(hv_dim)
     num_features = len(sample)
     threshold = num_features / 2
 
-    # Cycle through the entire line
-    for attribute_num in range(num_features):
-        # Get ID HV
-        attribute_id_hv = ortho_im[attribute_num]
-        # Get value HV at that ID
-        attribute_val_hv = cim[sample[attribute_num]]
-        # Bind ID and value HVs
-        attribute_val_loc_hv = bind_hv(
-            attribute_id_hv, attribute_val_hv, hv_type=HV_TYPE
-        )
-        # Accumulate through all samples
-        encoded_sample += attribute_val_loc_hv
+    # Gather the bound ID and value HVs of all features and bundle them
+    encoded_sample = encode_record_hv(sample, ortho_im, cim, hv_type=hv_type)
+    return encoded_sample, threshold
 
-    # Binarize the encoded sample
-    if QUANT_TYPE is not None:
-        encoded_sample = quantize_hv(
-            encoded_sample, threshold, hv_type=HV_TYPE, quant_type=QUANT_TYPE
-        )
-    else:
-        encoded_sample = binarize_hv(encoded_sample, threshold, hv_type=HV_TYPE)
-
-    return encoded_sample
-
-
-def main(hv_dim, hv_type, quant_type):
-    # Overwrite global parameters
-    global HV_DIM
-    HV_DIM = hv_dim
-    global HV_TYPE
-    HV_TYPE = hv_type
-    global QUANT_TYPE
-    QUANT_TYPE = quant_type
-
-    SEED_DIM = 32
-    ENABLE_HV_EXPANSION = False
-    HV_DIM_EXPANSION = 16
-    NUM_TOT_IM = 1024
-    NUM_PER_IM_BANK = 128
-    # NGRAM = 4
-    USE_CA90_IM = False
-    USE_CA90_CIM = False
-    EXTRACT_DATA = True
-
-    VAL_LEVELS = 21
-    NUM_CLASSES = 26
-    NUM_TRAIN = 297
-    # NUM_RETRAIN = NUM_TRAIN
-    NUM_TEST = 100
-
-    # NUM_FEATURES = 617
-
-    CIM_BASE_SEED = 621635317
-    BASE_SEEDS = [
-        1103779247,
-        2391206478,
-        3074675908,
-        2850820469,
-        811160829,
-        4032445525,
-        2525737372,
-        2535149661,
-    ]
 
+# Binarized, or quantized if quant_type is set, encoding of a sample
+def encode_isolet(
+    sample, ortho_im, cim, hv_type="binary", quant_type=None, return_codes=False
+):
+    encoded_sample, threshold = encode_isolet_raw(
+        sample, ortho_im, cim, hv_type=hv_type
+    )
+    return postprocess_hv(encoded_sample, threshold, hv_type, quant_type, return_codes)
+
+
+# The parameters of one run
+# seed seeds the random IMs, if None they are not seeded
+def make_config(hv_dim, hv_type, quant_type, int_am=False, seed=None):
+    return {
+        "hv_dim": hv_dim,
+        "hv_type": hv_type,
+        "quant_type": quant_type,
+        "int_am": int_am,
+        "seed": seed,
+    }
+
+
+# Download, read and convert the dataset
+def load_data():
     if EXTRACT_DATA:
         extract_git_dataset(DATA_URL, DATA_SET_DIR)
 
+    print("Extracting data...")
+    train_data = dict()
+    for num_class in range(NUM_CLASSES):
+        # Training dataset
+        read_file = f"{DATA_DIR}/uint8_isolet_{num_class}.txt"
+        train_data[num_class] = load_dataset(read_file)
+
+    # For simplicity use both train data
+    test_data = dict()
+    for num_class in range(NUM_CLASSES):
+        # Training dataset
+        read_file = f"{DATA_DIR}/uint8_isolet_{num_class}.txt"
+        test_data[num_class] = load_dataset(read_file)
+
+    print("Converting data...")
+    if USE_CA90_CIM:
+        train_data = convert_levels(train_data, VAL_LEVELS, VAL_LEVELS - 1)
+        test_data = convert_levels(test_data, VAL_LEVELS, VAL_LEVELS - 1)
+    else:
+        train_data = convert_levels(train_data, VAL_LEVELS)
+        test_data = convert_levels(test_data, VAL_LEVELS)
+
+    return train_data, test_data
+
+
+# The item memories of a config, these only
+# depend on its hv_dim, hv_type and seed
+def gen_item_memories(config):
+    hv_dim = config["hv_dim"]
+    hv_type = config["hv_type"]
+    if config["seed"] is not None:
+        np.random.seed(config["seed"])
+
     if USE_CA90_IM:
         # Get a CA90 seed that's working
         seed_list, ortho_im, conf_mat = gen_ca90_im_set(
             SEED_DIM,
-            HV_DIM,
+            hv_dim,
             NUM_TOT_IM,
             NUM_PER_IM_BANK,
             base_seeds=BASE_SEEDS,
@@ -125,17 +158,17 @@ def main(hv_dim, hv_type, quant_type):
         # Generate orthogonal samples using the specified parameters
         ortho_im = gen_orthogonal_im(
             num_hv=NUM_TOT_IM,
-            hv_dim=HV_DIM,
+            hv_dim=hv_dim,
             p_dense=0.5,
             hv_seed=0,
             permute_base=1,
-            hv_type=HV_TYPE,
+            hv_type=hv_type,
             im_type="random",
         )
 
     if USE_CA90_CIM:
         _, cim = gen_square_cim(
-            hv_dim=HV_DIM,
+            hv_dim=hv_dim,
             seed_size=32,
             base_seed=CIM_BASE_SEED,
             gen_seed=False,
@@ -144,14 +177,14 @@ def main(hv_dim, hv_type, quant_type):
         )
     else:
         cim = gen_cim(
-            hv_dim=HV_DIM,
+            hv_dim=hv_dim,
             seed_size=32,
             num_hv=VAL_LEVELS,
             base_seed=CIM_BASE_SEED,
             gen_seed=False,
             max_ortho=True,
             im_type="random",
-            hv_type=HV_TYPE,
+            hv_type=hv_type,
             debug_info=False,
         )
 
@@ -159,58 +192,74 @@ def main(hv_dim, hv_type, quant_type):
         ortho_im = expand_im(ortho_im, HV_DIM_EXPANSION)
         cim = expand_cim(cim, HV_DIM_EXPANSION)
 
-    print("Extracting data...")
-    train_data = dict()
-    for num_class in range(NUM_CLASSES):
-        # Training dataset
-        read_file = f"{DATA_DIR}/uint8_isolet_{num_class}.txt"
-        train_data[num_class] = load_dataset(read_file)
+    return ortho_im, cim
 
-    # For simplicity use both train data
-    test_data = dict()
-    for num_class in range(NUM_CLASSES):
-        # Training dataset
-        read_file = f"{DATA_DIR}/uint8_isolet_{num_class}.txt"
-        test_data[num_class] = load_dataset(read_file)
 
-    print("Converting data...")
-    if USE_CA90_CIM:
-        train_data = convert_levels(train_data, VAL_LEVELS, VAL_LEVELS - 1)
-        test_data = convert_levels(test_data, VAL_LEVELS, VAL_LEVELS - 1)
-    else:
-        train_data = convert_levels(train_data, VAL_LEVELS)
-        test_data = convert_levels(test_data, VAL_LEVELS)
+# Train and test one config on the data of load_data and
+# the item memories of gen_item_memories
+def run_config(config, data, item_memories):
+    hv_type = config["hv_type"]
+    quant_type = config["quant_type"]
+    train_data, _ = data
+    ortho_im, cim = item_memories
+
+    # The raw encodings are the same for every quant_type, so a sweep
+    # encodes them once per IM and only post-processes them per run
+    encoded_dataset = encode_dataset_cached(
+        train_data,
+        max(NUM_TRAIN, NUM_TEST),
+        ortho_im,
+        cim,
+        functools.partial(encode_isolet_raw, hv_type=hv_type),
+    )
+    encoded_data = postprocess_dataset(encoded_dataset, hv_type, quant_type)
+    encode_function = postprocessed_encode_function(quant_type)
 
     print("Training model...")
     class_am, class_am_int, class_am_elem_count = train_model(
-        train_dataset=train_data,
+        train_dataset=encoded_data,
         num_train=NUM_TRAIN,
         ortho_im=ortho_im,
         cim=cim,
-        encode_function=encode_isolet,
+        encode_function=encode_function,
         tqdm_mode=2,
-        hv_type=HV_TYPE,
-        quant_type=QUANT_TYPE,
+        hv_type=hv_type,
+        quant_type=quant_type,
     )
 
+    # Integer AM search on the codes of the quantized HVs
+    quant_am = None
+    if config["int_am"] and quant_type is not None:
+        quant_am = quantize_am(class_am_int, class_am_elem_count, hv_type, quant_type)
+        stored_bytes, hw_bytes = quant_am_bytes(quant_am)
+        print(f"Quantized AM: {stored_bytes} bytes, hardware AM: {hw_bytes} bytes")
+        # The queries are searched as their codes
+        encode_function = encoded_identity
+
     print("Testing model...")
     counts, scores, accuracies, overall_accuracy = test_model(
-        test_dataset=train_data,
+        test_dataset=encoded_data,
         ortho_im=ortho_im,
         cim=cim,
         class_am=class_am,
-        encode_function=encode_isolet,
+        encode_function=encode_function,
         starting_num_test=0,
         num_test=NUM_TEST,
         tqdm_mode=2,
         print_mode=1,
-        hv_type=HV_TYPE,
-        quant_type=QUANT_TYPE,
+        hv_type=hv_type,
+        quant_type=quant_type,
+        quant_am=quant_am,
     )
 
     return overall_accuracy
 
 
+def main(hv_dim, hv_type, quant_type, int_am=False):
+    config = make_config(hv_dim, hv_type, quant_type, int_am)
+    return run_config(config, load_data(), gen_item_memories(config))
+
+
 if __name__ == "__main__":
     main(hv_dim=512, hv_type="binary", quant_type=None)
 # main(hv_dim=512, hv_type='binary', quant_type=None)
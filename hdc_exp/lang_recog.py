@@ -9,18 +9,23 @@ This program implements the language recognition
 classification task using Hyperdimensional Computing (HDC).
 """
 
+import functools
+import numpy as np
 from hdc_util import (
     extract_git_dataset,
     train_model,
     test_model,
-    gen_empty_hv,
     gen_orthogonal_im,
     expand_im,
-    circ_perm_hv,
-    bind_hv,
-    binarize_hv,
+    encode_ngram_hv,
     gen_ca90_im_set,
-    quantize_hv,
+    quantize_am,
+    quant_am_bytes,
+    postprocess_hv,
+    encode_dataset_cached,
+    postprocess_dataset,
+    postprocessed_encode_function,
+    encoded_identity,
 )
 
 
@@ -84,9 +89,33 @@ CHAR_MAP = {
     " ": 26,  # Space character
 }
 
-# initialize global params
-HV_TYPE = None
-QUANT_TYPE = None
+# Parameters shared by all runs, the per-run
+# parameters are in the config of make_config
+SEED_DIM = 32
+# enabling this increases HV_dim by a ton, which gave the default high 90%
+# accuracy, similar to when increasing HV_DIM with that factor directly
+ENABLE_HV_EXPANSION = False
+HV_DIM_EXPANSION = 16
+NUM_TOT_IM = 1024
+NUM_PER_IM_BANK = 128
+# NGRAM = 4
+USE_CA90_IM = False
+EXTRACT_DATA = True
+
+NUM_TRAIN = 999
+# NUM_RETRAIN = NUM_TRAIN
+NUM_TEST = 999
+
+BASE_SEEDS = [
+    1103779247,
+    2391206478,
+    3074675908,
+    2850820469,
+    811160829,
+    4032445525,
+    2525737372,
+    2535149661,
+]
 
 # Baseline?  (https://dl.acm.org/doi/pdf/10.1145/3558000 survey from 2023)
 # 10.1109/AICAS48895.2020.9073871 -> 97.23% (10k dims, binary, hamming dist)
@@ -110,99 +139,82 @@ def extract_lang_dataset(read_file):
     return text_lines
 
 
-def encode_lang(line, ortho_im, cim):
+# Raw (not binarized) encoding and binarization threshold
+def encode_lang_raw(line, ortho_im, cim, hv_type="binary"):
     # Parameters
     ngram_count = 4
-    hv_dim = len(ortho_im[0])
-
-    # Initializers
-    encoded_line = gen_empty_hv(hv_dim)
-    threshold_counter = 0
-
-    # Cycle through the entire line
-    for char in range(len(line) - ngram_count):
-        # Initialize encoded ngram
-        encoded_ngram = gen_empty_hv(hv_dim)
-
-        # Grab the ngram
-        for ngram in range(ngram_count):
-            # Create n-gram by circularly permuting the character
-            get_char = line[char + ngram]
-            if get_char not in CHAR_MAP:
-                # If character is not in CHAR_MAP, skip it
-                continue
-            # Create character HV
-            char_hv = ortho_im[CHAR_MAP[line[char + ngram]]]
-            # Permute it
-            char_ngram = circ_perm_hv(char_hv, ngram)
-            # Bind it nicely
-            if ngram == 0:
-                encoded_ngram = char_ngram
-            else:
-                encoded_ngram = bind_hv(encoded_ngram, char_ngram, hv_type=HV_TYPE)
-
-        # Bundle the ngram
-        encoded_line += encoded_ngram
-        threshold_counter += 1
-
-    # Binarize the encoded line
-    threshold = threshold_counter / 2
-    if QUANT_TYPE is not None:
-        encoded_line = quantize_hv(
-            encoded_line, threshold, hv_type=HV_TYPE, quant_type=QUANT_TYPE
-        )
-    else:
-        encoded_line = binarize_hv(encoded_line, threshold, hv_type=HV_TYPE)
-
-    return encoded_line
-
-
-def main(hv_dim, hv_type, quant_type):
-    # Overwrite global parameters
-    global HV_DIM
-    HV_DIM = hv_dim
-    global HV_TYPE
-    HV_TYPE = hv_type
-    global QUANT_TYPE
-    QUANT_TYPE = quant_type
-
-    # Download and extract the training dataset
-    SEED_DIM = 32
-    # HV_DIM = 512*16
-    # enabling this increases HV_dim by a ton, which gave the default high 90%
-    # accuracy, similar to when increasing HV_DIM with that factor directly
-    ENABLE_HV_EXPANSION = False
-    HV_DIM_EXPANSION = 16
-    NUM_TOT_IM = 1024
-    NUM_PER_IM_BANK = 128
-    # NGRAM = 4
-    USE_CA90_IM = False
-    EXTRACT_DATA = True
-
-    NUM_TRAIN = 999
-    # NUM_RETRAIN = NUM_TRAIN
-    NUM_TEST = 999
-
-    BASE_SEEDS = [
-        1103779247,
-        2391206478,
-        3074675908,
-        2850820469,
-        811160829,
-        4032445525,
-        2525737372,
-        2535149661,
-    ]
 
+    # IM index per character, characters not in CHAR_MAP are skipped
+    char_idx = [CHAR_MAP.get(char, -1) for char in line]
+    num_ngrams = max(len(line) - ngram_count, 0)
+
+    # Bundle all n-grams of the line at once
+    encoded_line = encode_ngram_hv(
+        char_idx,
+        ortho_im,
+        ngram_count,
+        num_windows=num_ngrams,
+        hv_type=hv_type,
+    )
+    threshold = num_ngrams / 2
+    return encoded_line, threshold
+
+
+# Binarized, or quantized if quant_type is set, encoding of a sample
+def encode_lang(
+    line, ortho_im, cim, hv_type="binary", quant_type=None, return_codes=False
+):
+    encoded_line, threshold = encode_lang_raw(line, ortho_im, cim, hv_type=hv_type)
+    return postprocess_hv(encoded_line, threshold, hv_type, quant_type, return_codes)
+
+
+# The parameters of one run
+# seed seeds the random IMs, if None they are not seeded
+def make_config(hv_dim, hv_type, quant_type, int_am=False, seed=None):
+    return {
+        "hv_dim": hv_dim,
+        "hv_type": hv_type,
+        "quant_type": quant_type,
+        "int_am": int_am,
+        "seed": seed,
+    }
+
+
+# Download and read the training and testing texts
+def load_data():
     if EXTRACT_DATA:
         extract_git_dataset(TRAINING_URL, DATA_DIR)
         extract_git_dataset(TESTING_URL, DATA_DIR)
 
+    print("Extracting data...")
+    training_dir = f"{DATA_DIR}/{TRAINING_DIR}"
+    train_data = dict()
+
+    for lang in LANG_LIST:
+        read_file = training_dir + LANG_LIST[lang] + ".txt"
+        train_data[lang] = extract_lang_dataset(read_file)
+
+    testing_dir = f"{DATA_DIR}/{TESTING_DIR}"
+    test_data = dict()
+
+    for lang in LANG_LIST:
+        read_file = testing_dir + LANG_LIST[lang] + "_test.txt"
+        test_data[lang] = extract_lang_dataset(read_file)
+
+    return train_data, test_data
+
+
+# The item memories of a config, these only depend on
+# its hv_dim, hv_type and seed, the n-grams use no CiM
+def gen_item_memories(config):
+    if config["seed"] is not None:
+        np.random.seed(config["seed"])
+
     if USE_CA90_IM:
         # Get a CA90 seed that's working
         seed_list, ortho_im, conf_mat = gen_ca90_im_set(
             SEED_DIM,
-            HV_DIM,
+            config["hv_dim"],
             NUM_TOT_IM,
             NUM_PER_IM_BANK,
             base_seeds=BASE_SEEDS,
@@ -215,62 +227,85 @@ def main(hv_dim, hv_type, quant_type):
         # Generate orthogonal images using the specified parameters
         ortho_im = gen_orthogonal_im(
             num_hv=NUM_TOT_IM,
-            hv_dim=HV_DIM,
+            hv_dim=config["hv_dim"],
             p_dense=0.5,
             hv_seed=0,
             permute_base=1,
-            hv_type=HV_TYPE,
+            hv_type=config["hv_type"],
             im_type="random",
         )
 
     if ENABLE_HV_EXPANSION:
         ortho_im = expand_im(ortho_im, HV_DIM_EXPANSION)
 
-    print("Extracting data...")
-    training_dir = f"{DATA_DIR}/{TRAINING_DIR}"
-    train_data = dict()
-
-    for lang in LANG_LIST:
-        read_file = training_dir + LANG_LIST[lang] + ".txt"
-        train_data[lang] = extract_lang_dataset(read_file)
-
-    testing_dir = f"{DATA_DIR}/{TESTING_DIR}"
-    test_data = dict()
-
-    for lang in LANG_LIST:
-        read_file = testing_dir + LANG_LIST[lang] + "_test.txt"
-        test_data[lang] = extract_lang_dataset(read_file)
+    return ortho_im, None
+
+
+# Train and test one config on the data of load_data and
+# the item memories of gen_item_memories
+def run_config(config, data, item_memories):
+    hv_type = config["hv_type"]
+    quant_type = config["quant_type"]
+    train_data, _ = data
+    ortho_im, cim = item_memories
+
+    # The raw encodings are the same for every quant_type, so a sweep
+    # encodes them once per IM and only post-processes them per run
+    encoded_dataset = encode_dataset_cached(
+        train_data,
+        max(NUM_TRAIN, NUM_TEST),
+        ortho_im,
+        cim,
+        functools.partial(encode_lang_raw, hv_type=hv_type),
+    )
+    encoded_data = postprocess_dataset(encoded_dataset, hv_type, quant_type)
+    encode_function = postprocessed_encode_function(quant_type)
 
     print("Training model...")
     class_am, class_am_int, class_am_elem_count = train_model(
-        train_dataset=train_data,
+        train_dataset=encoded_data,
         num_train=NUM_TRAIN,
         ortho_im=ortho_im,
-        cim=None,
-        encode_function=encode_lang,
+        cim=cim,
+        encode_function=encode_function,
         tqdm_mode=2,
-        hv_type=HV_TYPE,
-        quant_type=QUANT_TYPE,
+        hv_type=hv_type,
+        quant_type=quant_type,
     )
 
+    # Integer AM search on the codes of the quantized HVs
+    quant_am = None
+    if config["int_am"] and quant_type is not None:
+        quant_am = quantize_am(class_am_int, class_am_elem_count, hv_type, quant_type)
+        stored_bytes, hw_bytes = quant_am_bytes(quant_am)
+        print(f"Quantized AM: {stored_bytes} bytes, hardware AM: {hw_bytes} bytes")
+        # The queries are searched as their codes
+        encode_function = encoded_identity
+
     print("Testing model...")
     counts, scores, accuracies, overall_accuracy = test_model(
-        test_dataset=train_data,
+        test_dataset=encoded_data,
         ortho_im=ortho_im,
-        cim=None,
+        cim=cim,
         class_am=class_am,
-        encode_function=encode_lang,
+        encode_function=encode_function,
         starting_num_test=0,
         num_test=NUM_TEST,
         tqdm_mode=2,
         print_mode=1,
-        hv_type=HV_TYPE,
-        quant_type=QUANT_TYPE,
+        hv_type=hv_type,
+        quant_type=quant_type,
+        quant_am=quant_am,
     )
 
     return overall_accuracy
 
 
+def main(hv_dim, hv_type, quant_type, int_am=False):
+    config = make_config(hv_dim, hv_type, quant_type, int_am)
+    return run_config(config, load_data(), gen_item_memories(config))
+
+
 if __name__ == "__main__":
     main(hv_dim=512, hv_type="bipolar", quant_type=None)
 
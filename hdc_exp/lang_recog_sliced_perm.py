@@ -15,10 +15,8 @@ from hdc_util import (
     extract_git_dataset,
     train_model,
     test_model_cuts_version,
-    gen_empty_hv,
     gen_orthogonal_im,
-    circ_perm_hv,
-    bind_hv,
+    encode_ngram_hv,
     binarize_hv,
     gen_ca90_im_set,
 )
@@ -99,37 +97,21 @@ def extract_lang_dataset(read_file):
 def encode_lang(line, ortho_im, cim):
     # Parameters
     ngram_count = 4
-    hv_dim = len(ortho_im[0])
-
-    # Initializers
-    encoded_line = gen_empty_hv(hv_dim)
-    threshold_counter = 0
-
-    # Cycle through the entire line
-    for char in range(len(line) - ngram_count):
-        # Initialize encoded ngram
-        encoded_ngram = gen_empty_hv(hv_dim)
-
-        # Grab the ngram
-        for ngram in range(ngram_count):
-            # Create n-gram by circularly permuting the character
-            get_char = line[char + ngram]
-            if get_char not in CHAR_MAP:
-                # If character is not in CHAR_MAP, skip it
-                continue
-            # Create character HV
-            char_hv = ortho_im[CHAR_MAP[line[char + ngram]]]
-            # Permute it
-            char_ngram = circ_perm_hv(char_hv, ngram)
-            # Bind it nicely
-            encoded_ngram = bind_hv(encoded_ngram, char_ngram)
-
-        # Bundle the ngram
-        encoded_line += encoded_ngram
-        threshold_counter += 1
+
+    # IM index per character, characters not in CHAR_MAP are skipped
+    char_idx = [CHAR_MAP.get(char, -1) for char in line]
+    num_ngrams = max(len(line) - ngram_count, 0)
+
+    # Bundle all n-grams of the line at once
+    encoded_line = encode_ngram_hv(
+        char_idx,
+        ortho_im,
+        ngram_count,
+        num_windows=num_ngrams,
+    )
 
     # Binarize the encoded line
-    threshold = threshold_counter / 2
+    threshold = num_ngrams / 2
     encoded_line = binarize_hv(encoded_line, threshold, "binary")
 
     return encoded_line
@@ -1,48 +1,50 @@
+import argparse
 import matplotlib.pyplot as plt
-import json
 import numpy as np
+from sweep_util import load_results
 
 
-av_data = np.zeros([4, 9])
-
-i = 0
-while i < 9:
-    with open(f"hdc_exp/result_lang_{i}.json", "r") as f:
-        result_dict = json.load(f)
+parser = argparse.ArgumentParser(description="Plot the lang_recog sweep")
+parser.add_argument(
+    "--input", default="result_lang.json", help="Result file of Outer3.py"
+)
+args = parser.parse_args()
 
-    # Group data
-    data = [[], [], [], []]
-    for key in result_dict.keys():
-        if key[0:4] == "2048":
-            if key[5:11] == "binary":
-                data[0].append(result_dict[key])
-            else:
-                data[1].append(result_dict[key])
-        elif key[0:4] == "8192":
-            if key[5:11] == "binary":
-                data[2].append(result_dict[key])
-            else:
-                data[3].append(result_dict[key])
+# Group the accuracies by hv_dim/hv_type and by quantization,
+# the repeats of a point only differ in their seed
+accuracies = dict()
+groups = []
+bars = []
+for row in load_results(args.input).values():
+    group = (int(row["hv_dim"]), row["hv_type"])
+    # None is null in a JSON file and empty in a CSV file
+    bar = (str(row["quant_type"] or None), str(row["int_am"]) == "True")
+    if group not in groups:
+        groups.append(group)
+    if bar not in bars:
+        bars.append(bar)
+    accuracies.setdefault((group, bar), []).append(float(row["accuracy"]))
 
-    data = np.array(data)
-    print(data)
-    av_data = av_data + data
-    i += 1
+groups.sort()
 
-av_data = av_data / i
+# Average over the seeds, points that were not run stay NaN
+av_data = np.full([len(groups), len(bars)], np.nan)
+for (group, bar), accuracy in accuracies.items():
+    av_data[groups.index(group), bars.index(bar)] = np.mean(accuracy)
+print(av_data)
 
 # Number of groups and bars per group
-n_groups = 4
-n_bars = 9
+n_groups = len(groups)
+n_bars = len(bars)
 
 # Bar positions
-bar_width = 0.1  # width of each bar
+bar_width = 0.8 / n_bars  # width of each bar
 x = np.arange(n_groups)
 
 # Create the plot
 fig, ax = plt.subplots(figsize=(10, 6))
 
-# Plot each of the 9 bars per group
+# Plot the bars of each quantization
 for i in range(n_bars):
     ax.bar(x + i * bar_width, av_data[:, i], width=bar_width, label=f"Bar {i + 1}")
 
@@ -53,26 +55,20 @@ ax.set_title("Language Recognition with Quantization")
 # X-axis tick labels
 ax.set_xticks(x + (n_bars / 2 - 0.5) * bar_width)
 ax.set_xticklabels(
-    ["D = 2048\nBinary", "D = 2048\nBipolar", "D = 8192\nBinary", "D = 8192\nBipolar"]
+    [f"D = {hv_dim}\n{hv_type.capitalize()}" for hv_dim, hv_type in groups]
 )
 
 # Add legend
 legend = [
-    "1-bit",
-    "INT8",
-    "INT4",
-    "INT2",
-    "FP8 E4M3",
-    "FP8_E5M2",
-    "FP6 E2M3",
-    "FP6 E3M2",
-    "FP4 E2M1",
+    ("1-bit" if quant_type == "None" else quant_type.replace("_", " "))
+    + (" int AM" if int_am else "")
+    for quant_type, int_am in bars
 ]
 ax.legend(legend, ncol=3, bbox_to_anchor=(1.05, 1), loc="upper left")
 
 ax.set_ylim(0.85, 1.0)
 
 plt.tight_layout()
-plt.show()
 plt.savefig("Barplot.png")
 plt.savefig("Barplot.pdf")
+plt.show()
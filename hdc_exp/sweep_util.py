@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright 2025 KU Leuven
+
+Description:
+Parallel parameter sweeps of the HDC experiments.
+
+An experiment module (e.g. lang_recog, isolet_recog) provides:
+    - make_config(**point): the config of one run
+    - load_data(): the dataset shared by all runs
+    - gen_item_memories(config): the IMs, that only depend on
+      the hv_dim, hv_type and seed of the config
+    - run_config(config, data, item_memories): the accuracy of one run
+
+The points that share their IMs (same hv_dim, hv_type and seed) run
+as one group in one worker process. The group generates its IMs once,
+and as run_config caches the raw encodings (see encode_dataset_cached),
+a group of quant_types costs one encode and one cheap pass per point.
+Every finished point is written to the result file right away, so a
+crashed sweep resumes where it stopped.
+"""
+
+import csv
+import json
+import os
+import time
+import queue
+import importlib
+import itertools
+import multiprocessing
+import concurrent.futures
+
+
+"""
+    Sweep functions
+
+    sweep_configs:
+        - all configs of a parameter grid, ordered by their IMs
+        - arguments:
+            - app: the experiment module
+            - grid: dict of parameter name to list of values
+
+    config_key:
+        - the key of a config in the result file
+        - arguments:
+            - config: the config of a run
+            - params: the parameter names of the grid
+
+    load_results, save_result:
+        - read and add to the result file, a JSON file holds
+          a dict of key to row and a CSV file holds one row per line
+        - arguments:
+            - result_path: .json or .csv file
+            - row: the config, key, accuracy and seconds of a run
+            - results: the results read so far
+
+    run_sweep:
+        - runs all points of the grid that are not in the result file,
+          one group of points that share their IMs per pool task
+        - arguments:
+            - app_name: name of the experiment module
+            - grid: dict of parameter name to list of values
+            - result_path: .json or .csv file
+            - num_workers: number of processes, 1 runs in this process
+"""
+
+# Per process state of the sweep workers
+worker_state = dict()
+
+
+# Configs of all points of a grid, runs that share IMs are adjacent
+def sweep_configs(app, grid):
+    params = list(grid)
+    configs = [
+        app.make_config(**dict(zip(params, values)))
+        for values in itertools.product(*grid.values())
+    ]
+    return sorted(configs, key=im_key)
+
+
+# The config fields that the IMs depend on
+def im_key(config):
+    return (config["hv_dim"], config["hv_type"], str(config["seed"]))
+
+
+# Key of a config in the result file
+def config_key(config, params):
+    return " ".join(f"{param}={config[param]}" for param in params)
+
+
+# Results by key of a JSON or CSV result file
+def load_results(result_path):
+    if not os.path.exists(result_path):
+        return dict()
+    if result_path.endswith(".csv"):
+        with open(result_path, "r", newline="") as f:
+            return {row["key"]: row for row in csv.DictReader(f)}
+    with open(result_path, "r") as f:
+        return json.load(f)
+
+
+# Add one row to the result file
+def save_result(result_path, row, results):
+    results[row["key"]] = row
+    if result_path.endswith(".csv"):
+        new_file = not os.path.exists(result_path)
+        with open(result_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+        return
+    # Write a copy and swap it in, a crash never leaves half a file
+    tmp_path = f"{result_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, result_path)
+
+
+# Set up a worker with the experiment module, its dataset
+# and the queue that its results are sent back on
+def init_sweep_worker(app_name, data, result_queue=None):
+    worker_state["app"] = importlib.import_module(app_name)
+    worker_state["data"] = data
+    worker_state["result_queue"] = result_queue
+
+
+# Run a group of configs that share their IMs
+def run_sweep_group(configs):
+    app = worker_state["app"]
+    item_memories = app.gen_item_memories(configs[0])
+    for config in configs:
+        start = time.perf_counter()
+        accuracy = app.run_config(config, worker_state["data"], item_memories)
+        yield config, accuracy, time.perf_counter() - start
+
+
+# Pool task of a group, each result is sent back as soon as it is done
+def sweep_worker(configs):
+    for result in run_sweep_group(configs):
+        worker_state["result_queue"].put(result)
+
+
+# Results of the pool workers in the order they finish, raises the
+# error of a failed worker, or BrokenProcessPool if a worker died
+def queued_results(result_queue, group_futures, num_results):
+    for _ in range(num_results):
+        result = None
+        while result is None:
+            try:
+                result = result_queue.get(timeout=1)
+            except queue.Empty:
+                for future in group_futures:
+                    if future.done():
+                        future.result()
+        yield result
+
+
+def run_sweep(app_name, grid, result_path, num_workers=None):
+    app = importlib.import_module(app_name)
+    params = list(grid)
+    results = load_results(result_path)
+
+    todo = [
+        config
+        for config in sweep_configs(app, grid)
+        if config_key(config, params) not in results
+    ]
+    print(f"Sweep: {len(results)} points done, {len(todo)} to run")
+    if not todo:
+        return results
+
+    # The dataset is read once and shared with the workers
+    data = app.load_data()
+
+    def save_finished(finished):
+        for count, (config, accuracy, seconds) in enumerate(finished, 1):
+            key = config_key(config, params)
+            row = {**config, "key": key, "accuracy": accuracy, "seconds": seconds}
+            save_result(result_path, row, results)
+            print(f"Sweep {count}/{len(todo)}: {key} accuracy {accuracy:.5f}")
+
+    groups = [list(group) for _, group in itertools.groupby(todo, key=im_key)]
+    if num_workers == 1:
+        init_sweep_worker(app_name, data)
+        save_finished(itertools.chain.from_iterable(map(run_sweep_group, groups)))
+    else:
+        result_queue = multiprocessing.Queue()
+        with concurrent.futures.ProcessPoolExecutor(
+            num_workers,
+            initializer=init_sweep_worker,
+            initargs=(app_name, data, result_queue),
+        ) as pool:
+            group_futures = [pool.submit(sweep_worker, group) for group in groups]
+            try:
+                save_finished(queued_results(result_queue, group_futures, len(todo)))
+            except BaseException:
+                # Drop the groups that did not start yet
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    return results
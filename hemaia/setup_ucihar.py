@@ -27,8 +27,7 @@ from hdc_util import (  # noqa: E402
     load_am_model,
     train_model,
     test_model,
-    gen_empty_hv,
-    bind_hv,
+    encode_record_hv,
     binarize_hv,
     gen_ca90_im_set,
     gen_square_cim,
@@ -48,23 +47,11 @@ DATA_TEST_DIR = f"{DATA_SET_DIR}/ucihar_recog/test"
 
 def encode_ucihar(sample, ortho_im, cim):
     # Encode sample
-    hv_dim = len(ortho_im[0])
-    encoded_sample = gen_empty_hv(hv_dim)
     num_features = len(sample)
     threshold = num_features / 2
 
-    # Cycle through the entire line
-    for attribute_num in range(num_features):
-        # Get ID HV
-        attribute_id_hv = ortho_im[attribute_num]
-        # Get value HV at that ID
-        attribute_val_hv = cim[sample[attribute_num]]
-        # Bind ID and value HVs
-        attribute_val_loc_hv = bind_hv(
-            attribute_id_hv, attribute_val_hv, hv_type="binary"
-        )
-        # Accumulate through all samples
-        encoded_sample += attribute_val_loc_hv
+    # Gather the bound ID and value HVs of all features and bundle them
+    encoded_sample = encode_record_hv(sample, ortho_im, cim, hv_type="binary")
 
     # Binarize the encoded sample
     encoded_sample = binarize_hv(encoded_sample, threshold, "binary")
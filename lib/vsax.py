@@ -13,8 +13,10 @@ We also include the item memory or hypervector generation in here.
 # Importing packages
 # ---------------------------------------------------------------------------
 import random
+import warnings
+import functools
 import numpy as np
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
 
 # ---------------------------------------------------------------------------
 # Fixed parameters
@@ -23,6 +25,13 @@ LFSR_MASK_32 = 0xFFFF_FFFF  # keep 32-bit arithmetic in Python ints
 LFSR_TAP_MASK = 0xB4BC_D35C  # primitive polynomial — maximal-length 32-bit LFSR
 LFSR_KNUTH_CONST = 0x9E37_79B9  # floor(2^32 / φ) — Knuth multiplicative hash
 LFSR_WARMUP_STEPS = 32  # warm-up iterations inside lfsr_item_seed
+LFSR_BLOCK_STEPS = 32  # LFSR steps per jump-ahead block in hv_gen_lfsr_im
+HV_WORD_BITS = 64  # bits per word of a bit-packed binary hypervector
+HV_ENCODE_CHUNK_ELEMS = 1 << 22  # max elements of a temporary in batch encoders
+HV_BOUND_TABLE_BYTES = 1 << 28  # default budget of a precomputed ID-level table
+
+# Popcount of every byte value, used when np.bitwise_count is not available
+POPCOUNT_LUT_8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
 
 
 # ---------------------------------------------------------------------------
@@ -65,13 +74,142 @@ def hv_prediction_idx(
     Returns:
         int: The index of the predicted class.
     """
-    score_list = []
-    for i in range(len(class_am)):
-        score_list.append(hv_norm_dist(class_am[i], encoded_hv, hv_type=hv_type))
+    predict_idx, _, _ = hv_am_search(class_am, encoded_hv, hv_type=hv_type)
+    return predict_idx[0]
+
+
+# Pre-computing the norms of an AM for repeated searches
+def hv_am_norms(
+    class_am: np.ndarray,
+    hv_type: str = "bipolar",
+    quant_type: Optional[str] = None,
+    packed: bool = False,
+) -> np.ndarray:
+    """
+    Compute the per-class norm terms used by hv_am_search.
+    For cosine similarity these are the L2 norms, for Hamming
+    distance these are the number of ones in each class HV.
+
+    Parameters:
+        class_am (np.ndarray): The class associative memory containing class HVs.
+        hv_type (str): The type of hypervector ("binary" or "bipolar").
+        quant_type (Optional[str]): The type of quantization used, if any.
+        packed (bool): If True, class_am is bit-packed (see hv_pack).
+    Returns:
+        np.ndarray: One norm term per class.
+    """
+    if packed:
+        return hv_popcount(class_am)
+    if (hv_type == "bipolar") or (quant_type is not None):
+        return np.linalg.norm(class_am, axis=-1)
+    return np.sum(class_am, axis=-1)
+
+
+# Similarity scores of a batch of queries against the whole AM
+def hv_am_scores(
+    class_am: np.ndarray,
+    query_hv: np.ndarray,
+    hv_type: str = "bipolar",
+    quant_type: Optional[str] = None,
+    packed: bool = False,
+    class_am_norm: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Calculate the normalized distance of Q query HVs against C class HVs.
+    Gives the same scores as hv_norm_dist on every pair, but in a single
+    matrix product for cosine similarity and for unpacked binary HVs,
+    and with a popcount kernel for packed binary HVs.
+
+    Parameters:
+        class_am (np.ndarray): The class associative memory of shape (C, D).
+        query_hv (np.ndarray): The query HVs of shape (Q, D) or a single (D,) HV.
+        hv_type (str): The type of hypervector ("binary" or "bipolar").
+        quant_type (Optional[str]): The type of quantization used, if any.
+        packed (bool): If True, class_am and query_hv are bit-packed.
+        class_am_norm (Optional[np.ndarray]): Cached result of hv_am_norms,
+                                              computed here if not given.
+    Returns:
+        np.ndarray: The score matrix of shape (Q, C), where 1 is the most similar.
+    """
+    query_hv = np.atleast_2d(query_hv)
+
+    if packed:
+        return hv_norm_dist_packed(class_am[None, :, :], query_hv[:, None, :])
+
+    if class_am_norm is None:
+        class_am_norm = hv_am_norms(class_am, hv_type, quant_type)
+
+    hv_dot = query_hv @ class_am.T
+
+    # Cosine similarity, with the same zero-norm guard as hv_norm_dist
+    if (hv_type == "bipolar") or (quant_type is not None):
+        query_norm = np.linalg.norm(query_hv, axis=-1)
+        norm_factor = np.outer(query_norm, class_am_norm)
+        norm_factor[norm_factor == 0] = 1
+        return hv_dot / norm_factor
+
+    # For 0/1 elements the Hamming distance is |a| + |b| - 2 a.b
+    query_norm = np.sum(query_hv, axis=-1)
+    ham_dist = query_norm[:, None] + class_am_norm[None, :] - 2 * hv_dot
+    return 1 - (ham_dist / query_hv.shape[-1])
+
+
+# Batched associative memory search
+def hv_am_search(
+    class_am: np.ndarray,
+    query_hv: np.ndarray,
+    hv_type: str = "bipolar",
+    quant_type: Optional[str] = None,
+    packed: bool = False,
+    class_am_norm: Optional[np.ndarray] = None,
+    top_k: int = 1,
+) -> tuple:
+    """
+    Search a batch of query HVs against the class associative memory.
+
+    Parameters:
+        class_am (np.ndarray): The class associative memory of shape (C, D).
+        query_hv (np.ndarray): The query HVs of shape (Q, D) or a single (D,) HV.
+        hv_type (str): The type of hypervector ("binary" or "bipolar").
+        quant_type (Optional[str]): The type of quantization used, if any.
+        packed (bool): If True, class_am and query_hv are bit-packed.
+        class_am_norm (Optional[np.ndarray]): Cached result of hv_am_norms.
+        top_k (int): The number of best classes to return per query.
+    Returns:
+        tuple: The predicted class per query of shape (Q,), the top_k
+        classes per query sorted from best to worst of shape (Q, top_k),
+        and the full score matrix of shape (Q, C).
+    """
+    scores = hv_am_scores(
+        class_am,
+        query_hv,
+        hv_type=hv_type,
+        quant_type=quant_type,
+        packed=packed,
+        class_am_norm=class_am_norm,
+    )
+    return hv_am_rank(scores, top_k)
+
+
+# Best classes of a score matrix
+def hv_am_rank(scores: np.ndarray, top_k: int = 1) -> tuple:
+    """
+    Rank the classes of a (Q, C) score matrix like hv_am_search.
+
+    Parameters:
+        scores (np.ndarray): The score matrix, where higher is more similar.
+        top_k (int): The number of best classes to return per query.
+    Returns:
+        tuple: The predicted class per query, the top_k classes per query
+        sorted from best to worst, and the score matrix.
+    """
+    predict_idx = np.argmax(scores, axis=-1)
 
-    predict_idx = np.argmax(score_list)
+    # Stable sort keeps the lowest index first on ties, same as argmax
+    top_k = min(top_k, scores.shape[-1])
+    topk_idx = np.argsort(-scores, axis=-1, kind="stable")[:, :top_k]
 
-    return predict_idx
+    return predict_idx, topk_idx, scores
 
 
 # ---------------------------------------------------------------------------
@@ -80,16 +218,17 @@ def hv_prediction_idx(
 
 
 # Generating empty hypervector (all zeros)
-def hv_gen_empty(hv_dim: int) -> np.ndarray:
+def hv_gen_empty(hv_dim: int, dtype=np.float64) -> np.ndarray:
     """
     Generate an empty hypervector of the specified dimension.
 
     Parameters:
         hv_dim (int): The dimension of the hypervector.
+        dtype: The element type, e.g. an integer type for bundling counters.
     Returns:
         np.ndarray: An empty hypervector of zeros.
     """
-    return np.zeros(hv_dim)
+    return np.zeros(hv_dim, dtype=dtype)
 
 
 # Generate using random indexing style
@@ -192,6 +331,158 @@ def hv_gen_lfsr(
     return bits
 
 
+# Vectorized LFSR step for many items at once
+def lfsr_next_vec(state: np.ndarray) -> np.ndarray:
+    """
+    One step of the 32-bit Galois LFSR for an array of states.
+    Same as lfsr_next applied to every element.
+
+    Parameters:
+        state (np.ndarray): The current states of the LFSRs in uint32.
+    Returns:
+        np.ndarray: The next states of the LFSRs in uint32.
+    """
+    return (state >> np.uint32(1)) ^ ((state & np.uint32(1)) * np.uint32(LFSR_TAP_MASK))
+
+
+# Vectorized seed generation for many items at once
+def lfsr_item_seed_vec(base_seed: int, idx: np.ndarray) -> np.ndarray:
+    """
+    Derive the starting states of many items at once.
+    Same as lfsr_item_seed applied to every index.
+
+    Parameters:
+        base_seed (int): The base seed for generating the item seeds.
+        idx (np.ndarray): The indices of the items.
+    Returns:
+        np.ndarray: The starting states of the items in uint32.
+    """
+    idx = np.asarray(idx, dtype=np.uint64) & np.uint64(LFSR_MASK_32)
+    state = (idx * np.uint64(LFSR_KNUTH_CONST)) & np.uint64(LFSR_MASK_32)
+    state = (state ^ np.uint64(base_seed & LFSR_MASK_32)).astype(np.uint32)
+    for _ in range(LFSR_WARMUP_STEPS):
+        state = lfsr_next_vec(state)
+    return state
+
+
+# Jump-ahead tables of the LFSR over one block of LFSR_BLOCK_STEPS steps
+@functools.lru_cache(maxsize=None)
+def lfsr_block_tables() -> tuple:
+    """
+    Build the jump-ahead tables that clock the LFSR LFSR_BLOCK_STEPS steps at once.
+
+    The Galois LFSR is linear over GF(2), so the output bits and the
+    next state after one block are the XOR of the contributions of each
+    set bit of the state. These are tabulated per byte of the state.
+    The output bit of step t is stored at bit (LFSR_BLOCK_STEPS - 1 - t).
+
+    Returns:
+        tuple: The output table and the next state table,
+        each of shape (4, 256) in uint32.
+    """
+    # Clock each basis state through one block
+    basis_out = []
+    basis_next = []
+    for j in range(32):
+        state = 1 << j
+        out_bits = 0
+        for t in range(LFSR_BLOCK_STEPS):
+            out_bits |= (state & 1) << (LFSR_BLOCK_STEPS - 1 - t)
+            state = lfsr_next(state)
+        basis_out.append(out_bits)
+        basis_next.append(state)
+
+    # Combine the basis contributions for every byte value
+    out_table = np.zeros((4, 256), dtype=np.uint32)
+    next_table = np.zeros((4, 256), dtype=np.uint32)
+    for byte_num in range(4):
+        for j in range(8):
+            has_bit = (np.arange(256) >> j) & 1 == 1
+            out_table[byte_num, has_bit] ^= np.uint32(basis_out[8 * byte_num + j])
+            next_table[byte_num, has_bit] ^= np.uint32(basis_next[8 * byte_num + j])
+    return out_table, next_table
+
+
+# Apply a byte-wise jump-ahead table to an array of states
+def lfsr_apply_table(table: np.ndarray, state: np.ndarray) -> np.ndarray:
+    """
+    Apply a GF(2)-linear map, tabulated per byte, to an array of LFSR states.
+
+    Parameters:
+        table (np.ndarray): The byte-wise table of shape (4, 256) in uint32.
+        state (np.ndarray): The LFSR states in uint32.
+    Returns:
+        np.ndarray: The mapped states in uint32.
+    """
+    state_bytes = state.astype("<u4").view(np.uint8).reshape(-1, 4)
+    return (
+        table[0][state_bytes[:, 0]]
+        ^ table[1][state_bytes[:, 1]]
+        ^ table[2][state_bytes[:, 2]]
+        ^ table[3][state_bytes[:, 3]]
+    )
+
+
+# For generating many LFSR hypervectors at once
+def hv_gen_lfsr_im(
+    base_seed: int,
+    idx: np.ndarray,
+    hv_dim: int,
+    hv_type: str = "binary",
+    packed: bool = False,
+) -> np.ndarray:
+    """
+    Generate the LFSR hypervectors of many items at once.
+
+    All item states are clocked together as one uint32 array and
+    jump LFSR_BLOCK_STEPS steps at a time with lfsr_block_tables, so
+    there are about hv_dim / 32 vectorized steps instead of hv_dim
+    Python steps per item.
+    Row k is bit-identical to hv_gen_lfsr(base_seed, idx[k], hv_dim, hv_type).
+
+    Parameters:
+        base_seed (int): The base seed for generating the hypervectors.
+        idx (np.ndarray): The indices of the items to generate.
+        hv_dim (int): The dimension of the hypervectors to be generated.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        packed (bool): If True, return binary hypervectors bit-packed
+                       into uint64 words (see hv_pack).
+    Returns:
+        np.ndarray: The hypervectors of shape (len(idx), hv_dim).
+    """
+    out_table, next_table = lfsr_block_tables()
+    state = lfsr_item_seed_vec(base_seed, idx)
+    num_items = len(state)
+
+    # hv_gen_lfsr flips the collected bits, so step t lands on
+    # element hv_dim - 1 - t. The first num_blocks blocks fill the
+    # elements from the end, one uint32 word per block.
+    num_blocks, num_rem = divmod(hv_dim, LFSR_BLOCK_STEPS)
+    words = np.empty((num_blocks, num_items), dtype="<u4")
+    for block in range(num_blocks - 1, -1, -1):
+        words[block] = lfsr_apply_table(out_table, state)
+        state = lfsr_apply_table(next_table, state)
+    words = np.ascontiguousarray(words.T)
+
+    # Two uint32 words of a little-endian row are one packed uint64 word
+    if packed and num_rem == 0 and num_blocks % 2 == 0:
+        hv_check_packable(hv_dim, "binary")
+        return words.view("<u8").astype(np.uint64, copy=False)
+
+    # The remaining steps fill the first num_rem elements
+    bits = np.empty((num_items, hv_dim), dtype=np.uint8)
+    for i in range(num_rem - 1, -1, -1):
+        bits[:, i] = state & np.uint32(1)
+        state = lfsr_next_vec(state)
+    bits[:, num_rem:] = np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little")
+
+    if packed:
+        return hv_pack(bits)
+    if hv_type == "bipolar":
+        return np.where(bits == 0, -1, 1)
+    return bits.astype(np.int32)
+
+
 # For generating CA90 hypervectors
 def hv_ca90_step(state: np.ndarray) -> np.ndarray:
     """
@@ -202,8 +493,9 @@ def hv_ca90_step(state: np.ndarray) -> np.ndarray:
 
     Returns:
         np.ndarray: The next state of the CA90.
+                    A set of states of shape (num_hv, hv_dim) is stepped per row.
     """
-    return np.roll(state, 1) ^ np.roll(state, -1)
+    return np.roll(state, 1, axis=-1) ^ np.roll(state, -1, axis=-1)
 
 
 def hv_ca90_expand_seed(seed: np.ndarray, D: int) -> tuple:
@@ -230,23 +522,89 @@ def hv_ca90_expand_seed(seed: np.ndarray, D: int) -> tuple:
     return hv0, layers
 
 
+# For generating many CA90 hypervectors at once
+def hv_gen_ca90_im(
+    base_seed: int,
+    idx: np.ndarray,
+    hv_dim: int,
+    hv_type: str = "binary",
+    seed_size: int = 512,
+    packed: bool = False,
+) -> np.ndarray:
+    """
+    Generate the CA90 hypervectors of many items at once.
+
+    The seed of each item is its LFSR hypervector of seed_size bits
+    (see hv_gen_lfsr_im), which is then expanded with CA90 as in
+    hv_ca90_expand_seed. Row k only depends on base_seed and idx[k],
+    so any row can be regenerated on its own.
+
+    Parameters:
+        base_seed (int): The base seed for generating the item seeds.
+        idx (np.ndarray): The indices of the items to generate.
+        hv_dim (int): The dimension of the hypervectors to be generated.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        seed_size (int): The number of bits of each item seed.
+        packed (bool): If True, return binary hypervectors bit-packed
+                       into uint64 words (see hv_pack).
+    Returns:
+        np.ndarray: The hypervectors of shape (len(idx), hv_dim).
+    """
+    bits = hv_gen_lfsr_im(base_seed, idx, min(seed_size, hv_dim)).astype(np.uint8)
+    while bits.shape[-1] < hv_dim:
+        bits = np.concatenate([hv_ca90_step(bits), bits], axis=-1)
+    bits = bits[:, :hv_dim]
+
+    if packed:
+        return hv_pack(bits)
+    if hv_type == "bipolar":
+        return np.where(bits == 0, -1, 1)
+    return bits.astype(np.int32)
+
+
 # ---------------------------------------------------------------------------
 # Hypervector item memory generation functions
 # ---------------------------------------------------------------------------
 
 
 # Generating empty memories
-def hv_gen_empty_mem(num_hv: int, hv_dim: int) -> np.ndarray:
+def hv_gen_empty_mem(
+    num_hv: int, hv_dim: int, packed: bool = False, dtype=np.float64
+) -> np.ndarray:
     """
     Generate an empty hypervector memory.
 
     Parameters:
         num_hv (int): The number of hypervectors.
         hv_dim (int): The dimension of each hypervector.
+        packed (bool): If True, return a bit-packed binary memory
+                       of shape (num_hv, hv_dim // 64) in uint64 words.
+        dtype: The element type of an unpacked memory,
+               e.g. the result of hv_count_dtype for bundling counters.
     Returns:
         np.ndarray: An empty hypervector memory.
     """
-    return np.zeros((num_hv, hv_dim))
+    if packed:
+        return np.zeros((num_hv, hv_packed_words(hv_dim)), dtype=np.uint64)
+    return np.zeros((num_hv, hv_dim), dtype=dtype)
+
+
+# Counter width for bundling a number of hypervectors
+def hv_count_dtype(max_count: int) -> np.dtype:
+    """
+    Pick the smallest signed integer type for bundling counters,
+    like BundCountWidth of the RTL bundler units.
+
+    Parameters:
+        max_count (int): The largest magnitude a counter can reach,
+                         e.g. the number of bundled binarized HVs.
+    Returns:
+        np.dtype: The smallest signed integer type that holds +-max_count.
+    """
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if max_count <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise OverflowError(f"No integer counter type can hold {max_count}")
 
 
 # Generating orthogonal item memory
@@ -258,6 +616,7 @@ def hv_gen_orthogonal_im(
     gen_ri_p_dense: float = 0.5,
     gen_lfsr_base_seed: int = 42,
     gen_ca90_seed_size: int = 512,
+    packed: bool = False,
 ):
     """
     Generate an item memory with orthogonal hypervectors.
@@ -267,27 +626,36 @@ def hv_gen_orthogonal_im(
         hv_size (int): The size of each hypervector.
         hv_type (str): The type of hypervector.
         Can be 'bipolar', 'binary', 'real', or 'complex'.
+        packed (bool): If True, return binary hypervectors bit-packed
+                       into uint64 words (see hv_pack).
 
     Returns:
         np.ndarray: The generated item memory.
     """
+    if packed:
+        hv_check_packable(hv_size, hv_type)
+
     if gen_type == "lfsr":
-        im = np.array(
-            [
-                hv_gen_lfsr(gen_lfsr_base_seed, idx, hv_size, hv_type)
-                for idx in range(num_items)
-            ]
+        return hv_gen_lfsr_im(
+            gen_lfsr_base_seed, np.arange(num_items), hv_size, hv_type, packed
         )
 
     elif gen_type == "ca90":
-        im = np.zeros((num_items, hv_size))
-        im[0], _ = hv_ca90_expand_seed(
-            hv_gen_ri(gen_ca90_seed_size, gen_ri_p_dense, hv_type), hv_size
+        return hv_gen_ca90_im(
+            gen_lfsr_base_seed,
+            np.arange(num_items),
+            hv_size,
+            hv_type,
+            gen_ca90_seed_size,
+            packed,
         )
     else:
         im = np.array(
             [hv_gen_ri(hv_size, gen_ri_p_dense, hv_type) for _ in range(num_items)]
         )
+
+    if packed:
+        im = hv_pack(im)
     return im
 
 
@@ -297,6 +665,7 @@ def hv_gen_continuous_im(
     hv_size=1024,
     cim_max_is_ortho=True,
     hv_type="bipolar",
+    packed=False,
 ):
     """
     Generate a continuous item memory (CIM).
@@ -307,10 +676,15 @@ def hv_gen_continuous_im(
         cim_max_is_ortho (bool): If True, the maximum distance
                                  between hypervectors is orthogonal.
         hv_type (str): The type of hypervector. Can be 'bipolar' or 'binary'.
+        packed (bool): If True, return binary hypervectors bit-packed
+                       into uint64 words (see hv_pack).
 
     Returns:
         np.ndarray: The generated continuous item memory.
     """
+    if packed:
+        hv_check_packable(hv_size, hv_type)
+
     # First initialize some seed HV
     # Calculate % number of flips
     if cim_max_is_ortho:
@@ -319,7 +693,10 @@ def hv_gen_continuous_im(
         num_flips = hv_size // (num_items - 1)
 
     # Initialize empty matrix
+    # binary flips are XORs, so they need integer elements
     cim = hv_gen_empty_mem(num_items, hv_size)
+    if hv_type == "binary":
+        cim = cim.astype(int)
 
     # Generate first seed HV
     cim[0] = hv_gen_ri(hv_size, p_dense=0.5, hv_type=hv_type)
@@ -329,6 +706,9 @@ def hv_gen_continuous_im(
         cim[i + 1] = hv_rand_flip(
             cim[i], i * num_flips, (i + 1) * num_flips, hv_type=hv_type
         )
+
+    if packed:
+        cim = hv_pack(cim)
     return cim
 
 
@@ -348,6 +728,10 @@ def hv_bind(hv_a: np.ndarray, hv_b: np.ndarray, hv_type: str = "binary") -> np.n
         hv_type (str): The type of the hypervector ("binary" or "bipolar").
     Returns:
         np.ndarray: The bound hypervector.
+
+    Note:
+        Binary binding is a plain XOR, so it also works
+        word-wise on bit-packed hypervectors (see hv_pack).
     """
     # If bipolar we do multiplication
     # otherwise we do bit-wise XOR
@@ -364,11 +748,120 @@ def hv_circ_perm(hv_a: np.ndarray, permute_amt: int) -> np.ndarray:
 
     Parameters:
         hv_a (np.ndarray): The input hypervector to be permuted.
+                           A memory of shape (num_hv, hv_dim) is permuted per row.
         permute_amt (int): The amount by which to circularly permute the hypervector.
     Returns:
         np.ndarray: The circularly permuted hypervector.
     """
-    return np.roll(hv_a, permute_amt)
+    return np.roll(hv_a, permute_amt, axis=-1)
+
+
+# All circular permutations as a strided view
+def hv_circ_perm_bank(hv_a: np.ndarray) -> np.ndarray:
+    """
+    Get every circular permutation of hypervector(s) as a read-only
+    strided view of the doubled rows, without copying any rotation.
+
+    bank[..., r, :] equals hv_circ_perm(hv_a, r) for 0 <= r <= hv_dim,
+    so gathering from the bank replaces one np.roll per hypervector.
+
+    Parameters:
+        hv_a (np.ndarray): Hypervector(s) of shape (..., hv_dim).
+    Returns:
+        np.ndarray: The view of shape (..., hv_dim + 1, hv_dim).
+    """
+    hv_a = np.asarray(hv_a)
+    hv_dim = hv_a.shape[-1]
+    doubled = np.concatenate([hv_a, hv_a], axis=-1)
+    # Window k is the rotation by hv_dim - k
+    bank = np.lib.stride_tricks.sliding_window_view(doubled, hv_dim, axis=-1)
+    return bank[..., ::-1, :]
+
+
+# Summing a set of hypervectors before bundling
+def hv_bundle_sum(hv_set: np.ndarray, acc_dtype=np.float64) -> np.ndarray:
+    """
+    Sum a set of hypervectors the same way hv_bundle_into does.
+    Bundling the partial sums of consecutive sets, e.g. computed
+    by separate workers, gives the same counters as bundling the
+    sets one after the other.
+
+    Parameters:
+        hv_set (np.ndarray): One HV of shape (hv_dim,) or a set of shape
+                             (N, hv_dim) whose rows are summed.
+        acc_dtype: The element type of the counters that are bundled into.
+    Returns:
+        np.ndarray: The sum of the HVs of shape (hv_dim,).
+    """
+    hv_set = np.asarray(hv_set)
+    if hv_set.ndim == 1:
+        return hv_set
+    # Sum in 64 bits so a set of HVs cannot overflow integer counters
+    if np.issubdtype(acc_dtype, np.integer) and not np.issubdtype(
+        hv_set.dtype, np.floating
+    ):
+        return hv_set.sum(axis=0, dtype=np.int64)
+    return hv_set.sum(axis=0)
+
+
+# Bundling into existing counters
+def hv_bundle_into(
+    acc: np.ndarray,
+    hv_set: np.ndarray,
+    subtract: bool = False,
+    saturate: bool = False,
+) -> np.ndarray:
+    """
+    Bundle hypervectors into counters in place.
+
+    Float counters are plain in-place additions. Integer counters
+    behave like the RTL bundler counters: if a counter would leave
+    the range of its type it either saturates at the limit, or an
+    OverflowError is raised and acc is left unchanged.
+
+    Parameters:
+        acc (np.ndarray): The counters of shape (hv_dim,), updated in place.
+        hv_set (np.ndarray): One HV of shape (hv_dim,) or a set of shape
+                             (N, hv_dim) whose rows are all bundled.
+        subtract (bool): If True, subtract the HVs instead of adding them.
+        saturate (bool): If True, integer counters saturate on overflow.
+    Returns:
+        np.ndarray: The updated counters acc.
+    """
+    hv_sum = hv_bundle_sum(hv_set, acc.dtype)
+    update = np.subtract if subtract else np.add
+
+    if not np.issubdtype(acc.dtype, np.integer):
+        update(acc, hv_sum, out=acc)
+        return acc
+
+    if np.issubdtype(hv_sum.dtype, np.floating):
+        hv_int = np.rint(hv_sum)
+        if not np.array_equal(hv_int, hv_sum):
+            raise ValueError("Integer counters can only bundle integer hypervectors")
+        hv_sum = hv_int.astype(np.int64)
+
+    # Cheap bound first, the exact check is only needed close to the limits
+    acc_info = np.iinfo(acc.dtype)
+    if subtract:
+        sum_low, sum_high = -int(hv_sum.max()), -int(hv_sum.min())
+    else:
+        sum_low, sum_high = int(hv_sum.min()), int(hv_sum.max())
+    if (int(acc.min()) + sum_low >= acc_info.min) and (
+        int(acc.max()) + sum_high <= acc_info.max
+    ):
+        update(acc, hv_sum, out=acc, casting="unsafe")
+        return acc
+
+    acc_total = update(acc.astype(np.int64), hv_sum)
+    acc_overflow = (acc_total < acc_info.min) | (acc_total > acc_info.max)
+    if acc_overflow.any() and not saturate:
+        raise OverflowError(
+            f"Bundling overflows the {acc.dtype} counters, "
+            "use a wider counter type or saturation"
+        )
+    acc[...] = np.clip(acc_total, acc_info.min, acc_info.max)
+    return acc
 
 
 # Binarize hypervector
@@ -419,19 +912,841 @@ def hv_norm_dist(
     # If binary we do hamming distance,
     # else we do cosine similarity
     if (hv_type == "bipolar") or (quant_type is not None):
-        hv_dot = np.dot(hv_a, hv_b)
-        norm_a = np.linalg.norm(hv_a)
-        norm_b = np.linalg.norm(hv_b)
-        if (norm_a == 0) or (norm_b == 0):
-            norm_factor = 1
+        return _hv_cos_dist(hv_a, hv_b)
+    return _hv_ham_dist(hv_a, hv_b)
+
+
+# Cosine similarity of hv_norm_dist
+def _hv_cos_dist(hv_a, hv_b):
+    hv_dot = np.dot(hv_a, hv_b)
+    norm_a = np.linalg.norm(hv_a)
+    norm_b = np.linalg.norm(hv_b)
+    if (norm_a == 0) or (norm_b == 0):
+        norm_factor = 1
+    else:
+        norm_factor = norm_a * norm_b
+    return hv_dot / (norm_factor)
+
+
+# Normalized Hamming distance of hv_norm_dist
+def _hv_ham_dist(hv_a, hv_b):
+    ham_dist = np.sum(np.bitwise_xor(hv_a, hv_b))
+    return 1 - (ham_dist / hv_a.size)
+
+
+# ---------------------------------------------------------------------------
+# Batch encoding functions
+# ---------------------------------------------------------------------------
+# These encode N samples at once and return an (N, hv_dim) matrix.
+# Each one gives the same bundled (non-binarized) HVs as the
+# per-sample loops of the reference encoders in app/.
+
+
+# Record-based (ID-level) encoding
+def hv_encode_record_batch(
+    id_im: np.ndarray, level_im: np.ndarray, X: np.ndarray, hv_type: str = "binary"
+) -> np.ndarray:
+    """
+    Encode samples as the bundle of hv_bind(id_im[f], level_im[X[n, f]])
+    over all features f.
+
+    Features are grouped per level, so the whole batch takes one
+    matrix product per level instead of one bind per feature.
+
+    Parameters:
+        id_im (np.ndarray): The ID item memory, at least one row per feature.
+        level_im (np.ndarray): The level item memory, one row per level.
+        X (np.ndarray): The level index of each feature, of shape (N, F).
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X)
+    id_im = np.asarray(id_im[: X.shape[1]], dtype=np.float64)
+    level_im = np.asarray(level_im, dtype=np.float64)
+
+    encoded_vecs = np.zeros((X.shape[0], id_im.shape[1]))
+    for level in range(len(level_im)):
+        level_mask = (X == level).astype(np.float64)
+        level_ids = level_mask @ id_im
+        if hv_type == "bipolar":
+            encoded_vecs += level_ids * level_im[level]
         else:
-            norm_factor = norm_a * norm_b
-        dist = hv_dot / (norm_factor)
+            # For 0/1 elements a XOR b = a + b - 2ab
+            encoded_vecs += level_ids * (1 - 2 * level_im[level])
+            encoded_vecs += np.outer(level_mask.sum(axis=1), level_im[level])
+    return encoded_vecs
+
+
+# Precomputed ID-level bound HVs
+def hv_gen_bound_table(
+    id_im: np.ndarray,
+    level_im: np.ndarray,
+    hv_type: str = "binary",
+    max_bytes: int = HV_BOUND_TABLE_BYTES,
+) -> Optional[np.ndarray]:
+    """
+    Precompute hv_bind(id_im[f], level_im[l]) for every feature f and level l,
+    so record-based encoding becomes a gather and a sum
+    (see hv_encode_record_table).
+
+    Binary tables are uint8 and bipolar tables int8. A binary table that
+    does not fit in max_bytes is bit-packed into uint64 words, which is 8x
+    smaller, and packed item memories always give a packed table.
+
+    Parameters:
+        id_im (np.ndarray): The ID item memory, one row per feature.
+        level_im (np.ndarray): The level item memory, one row per level.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        max_bytes (int): The memory budget of the table.
+    Returns:
+        Optional[np.ndarray]: The table of shape (F, L, hv_dim), or
+        (F, L, hv_dim // 64) if packed, or None if it does not fit.
+    """
+    id_im = np.asarray(id_im)
+    level_im = np.asarray(level_im)
+    num_entries = len(id_im) * len(level_im)
+    packed = id_im.dtype == np.uint64
+
+    if not packed:
+        hv_dim = id_im.shape[1]
+        if num_entries * hv_dim <= max_bytes:
+            table_dtype = np.int8 if hv_type == "bipolar" else np.uint8
+            return hv_bind(
+                id_im.astype(table_dtype)[:, None],
+                level_im.astype(table_dtype)[None, :],
+                hv_type,
+            )
+        if hv_type != "binary" or hv_dim % HV_WORD_BITS != 0:
+            return None
+        id_im = hv_pack(id_im)
+        level_im = hv_pack(level_im)
+
+    # Binding packed HVs is a XOR of their words
+    if num_entries * id_im.shape[1] * id_im.itemsize > max_bytes:
+        return None
+    return hv_bind_packed(id_im[:, None], level_im[None, :])
+
+
+# Record-based encoding from a bound table
+def hv_encode_record_table(bound_table: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Encode samples as the bundle of bound_table[f, X[n, f]] over all
+    features f, which is the same as hv_encode_record_batch with the
+    item memories of the table.
+
+    Parameters:
+        bound_table (np.ndarray): The table of hv_gen_bound_table.
+        X (np.ndarray): The level index of each feature, of shape (N, F).
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X)
+    num_samples, num_features = X.shape
+    packed = bound_table.dtype == np.uint64
+    hv_dim = bound_table.shape[-1] * (HV_WORD_BITS if packed else 1)
+    feature_idx = np.arange(num_features)
+    # Narrow counters keep the sum over features fast
+    sum_dtype = hv_count_dtype(num_features)
+
+    encoded_vecs = np.zeros((num_samples, hv_dim))
+    chunk_len = max(1, HV_ENCODE_CHUNK_ELEMS // max(1, num_features * hv_dim))
+    for start in range(0, num_samples, chunk_len):
+        bound_vecs = bound_table[feature_idx, X[start : start + chunk_len]]
+        if packed:
+            bound_vecs = hv_unpack(bound_vecs)
+        encoded_vecs[start : start + chunk_len] = np.add.reduce(
+            bound_vecs, axis=1, dtype=sum_dtype
+        )
+    return encoded_vecs
+
+
+# Record-based encoding from a cache of bound tables
+def hv_encode_record_cached(
+    ortho_im,
+    level_im,
+    X: np.ndarray,
+    table_cache: dict,
+    id_offset: int = 0,
+    level_rows: Optional[tuple] = None,
+    hv_type: str = "binary",
+    max_bytes: int = HV_BOUND_TABLE_BYTES,
+) -> np.ndarray:
+    """
+    Encode samples as the bundle of hv_bind(ortho_im[id_offset + f],
+    level_im[X[n, f]]) over all features f, like hv_encode_record_batch.
+
+    The bound table of each layout (id_offset, F, level_rows, max_bytes)
+    is built once by hv_gen_bound_table and kept in table_cache, so the
+    item memories must not change while the cache is in use. When the
+    table does not fit in max_bytes, the HVs are bound on the fly.
+
+    Parameters:
+        ortho_im: The orthogonal item memory, the IDs of the features.
+        level_im: The level item memory, e.g. the CiM.
+        X (np.ndarray): The level index of each feature, of shape (N, F).
+        table_cache (dict): The bound tables by layout.
+        id_offset (int): The orthogonal IM row of the first feature ID.
+        level_rows (Optional[tuple]): The (start, stop) orthogonal IM rows
+                                      of the level HVs instead of level_im.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        max_bytes (int): The memory budget of a table.
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X)
+    num_features = X.shape[1]
+
+    def record_ims():
+        id_im = np.asarray(ortho_im[id_offset : id_offset + num_features])
+        if level_rows is None:
+            return id_im, np.asarray(level_im)
+        return id_im, np.asarray(ortho_im[level_rows[0] : level_rows[1]])
+
+    layout = (id_offset, num_features, level_rows, max_bytes)
+    if layout not in table_cache:
+        table_cache[layout] = hv_gen_bound_table(
+            *record_ims(), hv_type=hv_type, max_bytes=max_bytes
+        )
+
+    bound_table = table_cache[layout]
+    if bound_table is not None:
+        return hv_encode_record_table(bound_table, X)
+    id_im, level_im = record_ims()
+    if id_im.dtype == np.uint64:
+        id_im = hv_unpack(id_im)
+        level_im = hv_unpack(level_im)
+    return hv_encode_record_batch(id_im, level_im, X, hv_type=hv_type)
+
+
+# Binary or bipolar item memory in 8-bit elements
+def hv_compact_im(item_im: np.ndarray) -> np.ndarray:
+    """
+    Copy an item memory of 0/1 elements to uint8 and one of +1/-1
+    elements to int8, so gathering and summing its rows moves 8x fewer
+    bytes than int64. Other values keep their dtype.
+
+    Parameters:
+        item_im (np.ndarray): The item memory.
+    Returns:
+        np.ndarray: The item memory in the compact dtype.
+    """
+    item_im = np.asarray(item_im)
+    if np.all((item_im == 0) | (item_im == 1)):
+        return item_im.astype(np.uint8)
+    if np.all(np.abs(item_im) == 1):
+        return item_im.astype(np.int8)
+    return item_im
+
+
+# Bundle of rotated item memory rows
+def _hv_encode_rotated(item_im, idx, shifts):
+    # Sum of hv_circ_perm(item_im[idx[n, f]], shifts[n, f]) over f
+    item_im = hv_compact_im(item_im)
+    hv_dim = item_im.shape[1]
+    bank = hv_circ_perm_bank(item_im)
+    shifts = shifts % hv_dim
+    num_samples, num_features = idx.shape
+    sum_dtype = None
+    if np.issubdtype(item_im.dtype, np.integer):
+        sum_dtype = hv_count_dtype(num_features)
+
+    encoded_vecs = np.zeros((num_samples, hv_dim))
+    chunk_len = max(1, HV_ENCODE_CHUNK_ELEMS // max(1, num_features * hv_dim))
+    for start in range(0, num_samples, chunk_len):
+        stop = start + chunk_len
+        encoded_vecs[start:stop] = np.add.reduce(
+            bank[idx[start:stop], shifts[start:stop]], axis=1, dtype=sum_dtype
+        )
+    return encoded_vecs
+
+
+# Permutation-sequence encoding
+def hv_encode_perm_seq_batch(item_im: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Encode sequences as the bundle of hv_circ_perm(item_im[X[n, i]], i)
+    over all positions i.
+
+    The rotated rows are gathered from hv_circ_perm_bank, so each
+    sample is one gather and one sum instead of a np.roll per position.
+
+    Parameters:
+        item_im (np.ndarray): The item memory, one row per symbol.
+        X (np.ndarray): The symbol index at each position, of shape (N, L).
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X)
+    # Only fetch the rows that are used, which matters for lazy IMs
+    item_im = np.asarray(item_im[: int(X.max()) + 1]) if X.size else np.asarray(item_im)
+    shifts = np.broadcast_to(np.arange(X.shape[1]), X.shape)
+    return _hv_encode_rotated(item_im, X, shifts)
+
+
+# Permutation-by-value encoding
+def hv_encode_perm_id_batch(item_im: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Encode samples as the bundle of hv_circ_perm(item_im[f], X[n, f])
+    over all features f, e.g. pixels that keep or permute their ID HV.
+
+    Parameters:
+        item_im (np.ndarray): The ID item memory, at least one row per feature.
+        X (np.ndarray): The permutation of each feature, of shape (N, F).
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X).astype(np.intp, copy=False)
+    item_im = np.asarray(item_im[: X.shape[1]])
+    idx = np.broadcast_to(np.arange(X.shape[1]), X.shape)
+    return _hv_encode_rotated(item_im, idx, X)
+
+
+# Compact n-gram item memory
+def hv_ngram_table(item_im: np.ndarray, hv_type: str = "binary") -> np.ndarray:
+    """
+    Copy an item memory into the smallest exact dtype for n-gram binding,
+    with one extra identity row at the end for skipped symbols.
+
+    Binary 0/1 HVs become uint8 and bipolar +1/-1 HVs become int8,
+    so the bound n-grams take 8x less memory than int64 and
+    XOR or multiply in place. Other values keep their dtype.
+
+    Parameters:
+        item_im (np.ndarray): The item memory, one row per symbol.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+    Returns:
+        np.ndarray: The table of shape (num_items + 1, hv_dim).
+    """
+    item_im = np.asarray(item_im)
+    if hv_type == "bipolar":
+        identity = 1
+        if np.all(np.abs(item_im) == 1):
+            item_im = item_im.astype(np.int8)
+    else:
+        identity = 0
+        if np.all((item_im == 0) | (item_im == 1)):
+            item_im = item_im.astype(np.uint8)
+    identity_row = np.full((1, item_im.shape[1]), identity, dtype=item_im.dtype)
+    return np.concatenate([item_im, identity_row])
+
+
+# N-gram encoding
+def hv_encode_ngram_batch(
+    item_im: np.ndarray,
+    X: np.ndarray,
+    ngram_len: int,
+    hv_type: str = "binary",
+    num_windows: Optional[int] = None,
+    perm_shifts: Optional[list] = None,
+    sliding: bool = False,
+) -> np.ndarray:
+    """
+    Encode sequences as the bundle of their n-grams, where the n-gram
+    starting at position i binds hv_circ_perm(item_im[X[n, i + j]], perm_shifts[j])
+    over j = 0 .. ngram_len - 1.
+
+    The item memory is kept in a compact dtype (see hv_ngram_table) and
+    permuted once per n-gram position. All windows of a chunk of samples
+    are then gathered and bound in place, one position at a time.
+
+    With sliding=True each position is gathered only once instead of
+    ngram_len times. Running binds (prefix products) P along the sequence
+    reuse the partial products of the previous window, since with
+    self-inverse binding an n-gram is P[i + ngram_len] bound with P[i].
+    This needs binary or bipolar HVs and evenly spaced perm_shifts,
+    and pays off for long n-grams.
+
+    Parameters:
+        item_im (np.ndarray): The item memory, one row per symbol.
+        X (np.ndarray): The symbol index at each position, of shape (N, L).
+                        Negative indices are skipped symbols that bind as
+                        the identity, so they leave the n-gram unchanged.
+        ngram_len (int): The number of symbols per n-gram.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        num_windows (Optional[int]): The number of n-grams per sample,
+                                     defaults to all L - ngram_len + 1 windows.
+        perm_shifts (Optional[list]): The permutation of each n-gram position,
+                                      defaults to j for position j.
+        sliding (bool): If True, use running binds over the sequence.
+    Returns:
+        np.ndarray: The encoded hypervectors of shape (N, hv_dim).
+    """
+    X = np.asarray(X)
+    if perm_shifts is None:
+        perm_shifts = list(range(ngram_len))
+    # Only fetch the rows that are used, which matters for lazy IMs
+    num_items = int(X.max()) + 1 if X.size else 0
+    item_table = hv_ngram_table(item_im[: max(num_items, 1)], hv_type)
+    X = np.where(X < 0, len(item_table) - 1, X)
+    num_samples = X.shape[0]
+    hv_dim = item_table.shape[1]
+    if num_windows is None:
+        num_windows = X.shape[1] - ngram_len + 1
+
+    encoded_vecs = np.zeros((num_samples, hv_dim))
+    if num_windows <= 0:
+        return encoded_vecs
+
+    if item_table.dtype == np.uint8:
+        bind_into = np.bitwise_xor
+        sum_dtype = np.int64
+    elif item_table.dtype == np.int8:
+        bind_into = np.multiply
+        sum_dtype = np.int64
+    else:
+        bind_into = None
+        sum_dtype = None
+
+    if sliding:
+        if bind_into is None:
+            raise ValueError("Sliding n-grams need binary or bipolar HVs")
+        return _hv_encode_ngram_sliding(
+            item_table, X, ngram_len, num_windows, perm_shifts, encoded_vecs
+        )
+
+    # Permuted item memory for each position in the n-gram
+    perm_ims = [hv_circ_perm(item_table, shift) for shift in perm_shifts]
+
+    # Bound n-grams are (samples, windows, hv_dim) so work in chunks
+    chunk_len = max(1, HV_ENCODE_CHUNK_ELEMS // (num_windows * hv_dim))
+    for start in range(0, num_samples, chunk_len):
+        X_chunk = X[start : start + chunk_len]
+        ngram_vecs = perm_ims[0][X_chunk[:, :num_windows]]
+        for j in range(1, ngram_len):
+            perm_vecs = perm_ims[j][X_chunk[:, j : j + num_windows]]
+            if bind_into is None:
+                ngram_vecs = hv_bind(ngram_vecs, perm_vecs, hv_type)
+            else:
+                bind_into(ngram_vecs, perm_vecs, out=ngram_vecs)
+        encoded_vecs[start : start + chunk_len] = ngram_vecs.sum(
+            axis=1, dtype=sum_dtype
+        )
+    return encoded_vecs
+
+
+# N-gram encoding with running binds
+def _hv_encode_ngram_sliding(
+    item_table, X, ngram_len, num_windows, perm_shifts, encoded_vecs
+):
+    hv_dim = item_table.shape[1]
+    base_shift = perm_shifts[0]
+    step_shift = perm_shifts[1] - perm_shifts[0] if ngram_len > 1 else 0
+    if any(shift != base_shift + j * step_shift for j, shift in enumerate(perm_shifts)):
+        raise ValueError("Sliding n-grams need evenly spaced perm_shifts")
+
+    # Symbol t is rotated by step_shift * t so that a window starting at i
+    # is the window at 0 rotated by step_shift * i. Rotations are
+    # gathered from hv_circ_perm_bank instead of rolled copies
+    seq_len = num_windows + ngram_len - 1
+    rot_table = hv_circ_perm_bank(item_table)
+    seq_rot = (step_shift * np.arange(seq_len)) % hv_dim
+    window_rot = (base_shift - step_shift * np.arange(num_windows)) % hv_dim
+    is_binary = item_table.dtype == np.uint8
+    bind_into = np.bitwise_xor if is_binary else np.multiply
+
+    chunk_len = max(1, HV_ENCODE_CHUNK_ELEMS // (seq_len * hv_dim))
+    for start in range(0, len(X), chunk_len):
+        X_chunk = X[start : start + chunk_len, :seq_len]
+
+        # Position-major, prefix_vecs[t] binds the rotated symbols before t
+        prefix_vecs = np.empty((seq_len + 1, len(X_chunk), hv_dim), item_table.dtype)
+        prefix_vecs[0] = 0 if is_binary else 1
+        prefix_vecs[1:] = rot_table[X_chunk.T, seq_rot[:, None]]
+        for t in range(1, seq_len + 1):
+            bind_into(prefix_vecs[t], prefix_vecs[t - 1], out=prefix_vecs[t])
+        ngram_vecs = bind_into(prefix_vecs[ngram_len:], prefix_vecs[:num_windows])
+
+        # Undo the rotation of each window
+        ngram_vecs = hv_circ_perm_bank(ngram_vecs)[
+            np.arange(num_windows), :, window_rot
+        ]
+        encoded_vecs[start : start + chunk_len] = ngram_vecs.sum(axis=0, dtype=np.int64)
+    return encoded_vecs
+
+
+# ---------------------------------------------------------------------------
+# Bit-packed binary hypervector functions
+# ---------------------------------------------------------------------------
+# A packed HV stores element i of a binary HV in bit (i % 64)
+# of word (i // 64), so a D-dimensional HV is D // 64 uint64 words.
+# All functions below work on the last axis, so a whole
+# memory of shape (num_hv, D // 64) can be processed at once.
+
+
+# Number of uint64 words for a given dimension
+def hv_packed_words(hv_dim: int) -> int:
+    """
+    Get the number of uint64 words needed to pack a binary hypervector.
+
+    Parameters:
+        hv_dim (int): The dimension of the hypervector.
+    Returns:
+        int: The number of 64-bit words.
+    """
+    if hv_dim % HV_WORD_BITS != 0:
+        raise ValueError(
+            f"Packed HVs need a dimension divisible by {HV_WORD_BITS}, got {hv_dim}"
+        )
+    return hv_dim // HV_WORD_BITS
+
+
+# Sanity check before packing
+def hv_check_packable(hv_dim: int, hv_type: str) -> None:
+    """
+    Check that hypervectors of this dimension and type can be bit-packed.
+
+    Parameters:
+        hv_dim (int): The dimension of the hypervector.
+        hv_type (str): The type of the hypervector. Only 'binary' can be packed.
+    """
+    if hv_type != "binary":
+        raise ValueError(f"Only binary HVs can be packed, got {hv_type}")
+    hv_packed_words(hv_dim)
+
+
+# Packing binary hypervectors into words
+def hv_pack(hv_a: np.ndarray) -> np.ndarray:
+    """
+    Pack binary hypervectors (0/1 elements) into uint64 words.
+
+    Parameters:
+        hv_a (np.ndarray): Binary hypervector(s) of shape (..., hv_dim).
+    Returns:
+        np.ndarray: Packed hypervector(s) of shape (..., hv_dim // 64).
+    """
+    hv_a = np.asarray(hv_a)
+    hv_packed_words(hv_a.shape[-1])
+    packed = np.packbits(hv_a.astype(np.uint8), axis=-1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False)
+
+
+# Unpacking words back into binary hypervectors
+def hv_unpack(hv_a: np.ndarray) -> np.ndarray:
+    """
+    Unpack uint64 words back into binary hypervectors.
+
+    Parameters:
+        hv_a (np.ndarray): Packed hypervector(s) of shape (..., num_words).
+    Returns:
+        np.ndarray: Binary hypervector(s) of shape (..., num_words * 64) in uint8.
+    """
+    hv_bytes = np.ascontiguousarray(hv_a, dtype="<u8").view(np.uint8)
+    return np.unpackbits(hv_bytes, axis=-1, bitorder="little")
+
+
+# Counting set bits per hypervector
+def hv_popcount(hv_a: np.ndarray) -> np.ndarray:
+    """
+    Count the number of set bits of packed hypervector(s) along the last axis.
+
+    Parameters:
+        hv_a (np.ndarray): Packed hypervector(s) of shape (..., num_words).
+    Returns:
+        np.ndarray: The number of ones in each hypervector.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(hv_a).sum(axis=-1, dtype=np.int64)
+    hv_bytes = np.ascontiguousarray(hv_a, dtype=np.uint64).view(np.uint8)
+    return POPCOUNT_LUT_8[hv_bytes].sum(axis=-1, dtype=np.int64)
+
+
+# Binding packed hypervectors
+def hv_bind_packed(hv_a: np.ndarray, hv_b: np.ndarray) -> np.ndarray:
+    """
+    Bind two packed binary hypervectors with a word-wise XOR.
+
+    Parameters:
+        hv_a (np.ndarray): The first packed hypervector.
+        hv_b (np.ndarray): The second packed hypervector.
+    Returns:
+        np.ndarray: The bound packed hypervector.
+    """
+    return np.bitwise_xor(hv_a, hv_b)
+
+
+# Circular permutation on packed hypervectors
+def hv_circ_perm_packed(hv_a: np.ndarray, permute_amt: int) -> np.ndarray:
+    """
+    Circularly permute packed hypervector(s), equivalent to
+    hv_circ_perm on the unpacked hypervector.
+
+    The permutation is split into a rotation of whole words
+    and a bit shift that carries bits across neighbouring words.
+
+    Parameters:
+        hv_a (np.ndarray): Packed hypervector(s) of shape (..., num_words).
+        permute_amt (int): The amount by which to circularly permute.
+    Returns:
+        np.ndarray: The circularly permuted packed hypervector(s).
+    """
+    hv_dim = hv_a.shape[-1] * HV_WORD_BITS
+    word_shift, bit_shift = divmod(permute_amt % hv_dim, HV_WORD_BITS)
+    hv_a = np.roll(hv_a, word_shift, axis=-1)
+    if bit_shift:
+        carry = np.roll(hv_a, 1, axis=-1) >> np.uint64(HV_WORD_BITS - bit_shift)
+        hv_a = (hv_a << np.uint64(bit_shift)) | carry
+    return hv_a
+
+
+# Hamming distance on packed hypervectors
+def hv_ham_dist_packed(hv_a: np.ndarray, hv_b: np.ndarray) -> np.ndarray:
+    """
+    Calculate the Hamming distance between packed hypervectors.
+    Broadcasts, so a (num_hv, num_words) memory against a single
+    (num_words,) query returns one distance per row.
+
+    Parameters:
+        hv_a (np.ndarray): The first packed hypervector(s).
+        hv_b (np.ndarray): The second packed hypervector(s).
+    Returns:
+        np.ndarray: The number of differing bits.
+    """
+    return hv_popcount(np.bitwise_xor(hv_a, hv_b))
+
+
+# Normalized distance on packed hypervectors
+def hv_norm_dist_packed(hv_a: np.ndarray, hv_b: np.ndarray) -> np.ndarray:
+    """
+    Calculate the normalized distance between packed hypervectors.
+    Same output as hv_norm_dist for binary hypervectors.
+
+    Parameters:
+        hv_a (np.ndarray): The first packed hypervector(s).
+        hv_b (np.ndarray): The second packed hypervector(s).
+    Returns:
+        np.ndarray: The normalized distance, ranging from 0 to 1.
+    """
+    hv_dim = hv_a.shape[-1] * HV_WORD_BITS
+    return 1 - (hv_ham_dist_packed(hv_a, hv_b) / hv_dim)
+
+
+# ---------------------------------------------------------------------------
+# Kernel registry
+# ---------------------------------------------------------------------------
+# A kernel set holds the primitives of one hv_type and layout with the
+# type already resolved, so hot loops call them without string dispatch.
+# Backends are tried in order of preference and skipped when they do not
+# support the layout or cannot be built, e.g. when numba is not installed:
+#   "jit":    packed binary HVs, AM search with a numba popcount kernel
+#   "packed": packed binary HVs with NumPy word-wise kernels
+#   "numpy":  unpacked binary or bipolar HVs
+
+
+class hvKernels(NamedTuple):
+    """
+    HV primitives bound to one hv_type and layout (see hv_get_kernels).
+
+    Attributes:
+        backend (str): The backend that built the kernels.
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        packed (bool): If True, the kernels work on bit-packed HVs.
+        bind (callable): bind(hv_a, hv_b) like hv_bind.
+        circ_perm (callable): circ_perm(hv_a, permute_amt) like hv_circ_perm.
+        binarize (callable): binarize(hv_a, threshold) like hv_binarize,
+                             packed into words for packed kernels.
+        norm_dist (callable): norm_dist(hv_a, hv_b) like hv_norm_dist.
+        am_norms (callable): am_norms(class_am) like hv_am_norms.
+        am_search (callable): am_search(class_am, query_hv, class_am_norm=None,
+                              top_k=1) like hv_am_search.
+    """
+
+    backend: str
+    hv_type: str
+    packed: bool
+    bind: Callable
+    circ_perm: Callable
+    binarize: Callable
+    norm_dist: Callable
+    am_norms: Callable
+    am_search: Callable
+
+    # Workers resolve the kernels again, JIT closures do not pickle
+    def __reduce__(self):
+        return hv_get_kernels, (self.hv_type, self.packed, self.backend)
+
+
+# Builders of each backend, in order of preference
+HV_KERNEL_BUILDERS = dict()
+# Built kernels of each (backend, hv_type, packed), None if unsupported
+HV_KERNEL_CACHE = dict()
+
+
+# Register a kernel backend
+def hv_register_kernels(backend: str, builder: Callable) -> None:
+    """
+    Register a kernel backend. Backends registered later are preferred.
+
+    Parameters:
+        backend (str): The name of the backend.
+        builder (callable): builder(hv_type, packed) returns an hvKernels,
+                            or None if the backend does not support them.
+    """
+    HV_KERNEL_BUILDERS.pop(backend, None)
+    HV_KERNEL_BUILDERS[backend] = builder
+    for key in [key for key in HV_KERNEL_CACHE if key[0] == backend]:
+        del HV_KERNEL_CACHE[key]
+
+
+# Resolve the kernels once, e.g. per model
+def hv_get_kernels(
+    hv_type: str = "binary", packed: bool = False, backend: Optional[str] = None
+) -> hvKernels:
+    """
+    Get the best kernels for a hv_type and layout. Each backend builds
+    them once, later calls return the same hvKernels.
+
+    Parameters:
+        hv_type (str): The type of the hypervector ("binary" or "bipolar").
+        packed (bool): If True, HVs are bit-packed (see hv_pack).
+        backend (Optional[str]): The preferred backend. It falls back to
+                                 the others if it cannot build the kernels.
+    Returns:
+        hvKernels: The resolved kernels.
+    """
+    if packed:
+        hv_check_packable(HV_WORD_BITS, hv_type)
+    backends = list(reversed(HV_KERNEL_BUILDERS))
+    if backend is not None:
+        if backend not in HV_KERNEL_BUILDERS:
+            raise ValueError(f"Unknown kernel backend: {backend}")
+        backends.remove(backend)
+        backends.insert(0, backend)
+
+    for name in backends:
+        key = (name, hv_type, packed)
+        if key not in HV_KERNEL_CACHE:
+            try:
+                HV_KERNEL_CACHE[key] = HV_KERNEL_BUILDERS[name](hv_type, packed)
+            except Exception as error:
+                # A broken optional backend must not stop the model
+                warnings.warn(f"Kernel backend {name} failed: {error}")
+                HV_KERNEL_CACHE[key] = None
+        kernels = HV_KERNEL_CACHE[key]
+        if kernels is not None:
+            return kernels
+    raise ValueError(f"No kernel backend for {hv_type} HVs (packed={packed})")
+
+
+# Binarize unpacked binary HVs
+def _hv_binarize_binary(hv_a, threshold):
+    return np.greater_equal(hv_a, threshold).astype(np.int_)
+
+
+# Binarize bipolar HVs, the threshold is always 0
+def _hv_binarize_bipolar(hv_a, threshold=0):
+    hv_bin = np.greater_equal(hv_a, 0).astype(np.int_)
+    hv_bin *= 2
+    hv_bin -= 1
+    return hv_bin
+
+
+# Binarize binary HVs straight into packed words
+def _hv_binarize_packed(hv_a, threshold):
+    hv_bits = np.greater_equal(hv_a, threshold)
+    hv_packed_words(hv_bits.shape[-1])
+    packed = np.packbits(hv_bits, axis=-1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False)
+
+
+# Plain NumPy kernels
+def _hv_numpy_kernels(hv_type, packed):
+    if packed:
+        return None
+    if hv_type == "bipolar":
+        bind, binarize, norm_dist = np.multiply, _hv_binarize_bipolar, _hv_cos_dist
     else:
-        ham_dist = np.sum(np.bitwise_xor(hv_a, hv_b))
-        dist = 1 - (ham_dist / hv_a.size)
+        bind, binarize, norm_dist = np.bitwise_xor, _hv_binarize_binary, _hv_ham_dist
+    return hvKernels(
+        backend="numpy",
+        hv_type=hv_type,
+        packed=False,
+        bind=bind,
+        circ_perm=hv_circ_perm,
+        binarize=binarize,
+        norm_dist=norm_dist,
+        am_norms=functools.partial(hv_am_norms, hv_type=hv_type),
+        am_search=functools.partial(hv_am_search, hv_type=hv_type),
+    )
+
+
+# Bit-packed NumPy kernels
+def _hv_packed_kernels(hv_type, packed):
+    if not packed or hv_type != "binary":
+        return None
+    return hvKernels(
+        backend="packed",
+        hv_type=hv_type,
+        packed=True,
+        bind=hv_bind_packed,
+        circ_perm=hv_circ_perm_packed,
+        binarize=_hv_binarize_packed,
+        norm_dist=hv_norm_dist_packed,
+        am_norms=hv_popcount,
+        am_search=functools.partial(hv_am_search, hv_type=hv_type, packed=True),
+    )
+
+
+# Packed kernels with AM search compiled by numba, if it is installed
+def _hv_jit_kernels(hv_type, packed):
+    if not packed or hv_type != "binary":
+        return None
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    popcount_masks = tuple(
+        np.uint64(mask)
+        for mask in (
+            0x5555_5555_5555_5555,
+            0x3333_3333_3333_3333,
+            0x0F0F_0F0F_0F0F_0F0F,
+            0x0101_0101_0101_0101,
+        )
+    )
+    shifts = tuple(np.uint64(shift) for shift in (1, 2, 4, 56))
+
+    @numba.njit(cache=False, nogil=True)
+    def ham_dist_matrix(query_hv, class_am):
+        m1, m2, m4, h01 = popcount_masks
+        s1, s2, s4, s56 = shifts
+        ham_dist = np.zeros((query_hv.shape[0], class_am.shape[0]), np.int64)
+        for q in range(query_hv.shape[0]):
+            for c in range(class_am.shape[0]):
+                count = 0
+                for w in range(query_hv.shape[1]):
+                    # SWAR popcount of one word
+                    x = query_hv[q, w] ^ class_am[c, w]
+                    x = x - ((x >> s1) & m1)
+                    x = (x & m2) + ((x >> s2) & m2)
+                    x = (x + (x >> s4)) & m4
+                    count += (x * h01) >> s56
+                ham_dist[q, c] = count
+        return ham_dist
+
+    def am_search(class_am, query_hv, class_am_norm=None, top_k=1):
+        query_hv = np.ascontiguousarray(np.atleast_2d(query_hv), dtype=np.uint64)
+        class_am = np.ascontiguousarray(class_am, dtype=np.uint64)
+        ham_dist = ham_dist_matrix(query_hv, class_am)
+        scores = 1 - (ham_dist / (query_hv.shape[-1] * HV_WORD_BITS))
+        return hv_am_rank(scores, top_k)
+
+    # Compile now and check against NumPy, so a bad build falls back
+    rng = np.random.default_rng(0)
+    words = rng.integers(0, 1 << 63, (5, 3), dtype=np.uint64)
+    _, _, jit_scores = am_search(words[:2], words)
+    _, _, ref_scores = hv_am_search(words[:2], words, hv_type, packed=True)
+    if not np.array_equal(jit_scores, ref_scores):
+        raise ValueError("numba AM search does not match NumPy")
+
+    return _hv_packed_kernels(hv_type, packed)._replace(
+        backend="jit", am_search=am_search
+    )
+
 
-    return dist
+hv_register_kernels("numpy", _hv_numpy_kernels)
+hv_register_kernels("packed", _hv_packed_kernels)
+hv_register_kernels("jit", _hv_jit_kernels)
 
 
 # ---------------------------------------------------------------------------
@@ -539,6 +1854,8 @@ def checker_im_pairwise_dist(im: np.ndarray, hv_type: str, threshold: float) ->
 
 
 if __name__ == "__main__":
+    import pickle
+
     # Example usage
     HV_DIM = 2048
     P_DENSE = 0.5
@@ -643,6 +1960,48 @@ if __name__ == "__main__":
     # Get pair-wise distances between the hypervectors
     checker_im_pairwise_dist(lfsr_set, hv_type=HV_TYPE, threshold=THRESHOLD)
 
+    # The vectorized generator must match the scalar reference
+    for lfsr_dim in [HV_DIM, HV_DIM + 17]:
+        lfsr_ref = np.array(
+            [
+                hv_gen_lfsr(BASE_SEED, item, lfsr_dim, HV_TYPE)
+                for item in range(NUM_ITEMS)
+            ]
+        )
+        assert np.array_equal(
+            hv_gen_lfsr_im(BASE_SEED, np.arange(NUM_ITEMS), lfsr_dim, HV_TYPE),
+            lfsr_ref,
+        ), "Vectorized LFSR mismatch!"
+    print("Vectorized LFSR generation matches hv_gen_lfsr!")
+
+    # ---------------------------
+    # Binary CA90 HV check
+    # ---------------------------
+    print("======== Binary CA90 HV Tests ========")
+
+    HV_TYPE = "binary"
+
+    # Generate a set of CA90 hypervectors
+    ca90_set = hv_gen_orthogonal_im(
+        num_items=NUM_ITEMS,
+        hv_size=HV_DIM,
+        hv_type=HV_TYPE,
+        gen_type="ca90",
+        gen_lfsr_base_seed=BASE_SEED,
+    )
+
+    # Get density of each hypervector
+    checker_im_density(ca90_set, hv_type=HV_TYPE, threshold=THRESHOLD)
+
+    # Get pair-wise distances between the hypervectors
+    checker_im_pairwise_dist(ca90_set, hv_type=HV_TYPE, threshold=THRESHOLD)
+
+    # Each row is the CA90 expansion of its own LFSR seed
+    ca90_seed = hv_gen_lfsr(BASE_SEED, 3, 512, HV_TYPE)
+    ca90_ref, _ = hv_ca90_expand_seed(ca90_seed, HV_DIM)
+    assert np.array_equal(ca90_set[3], ca90_ref), "CA90 expansion mismatch!"
+    print("CA90 rows match hv_ca90_expand_seed!")
+
     # ---------------------------
     # Generating CiM
     # ---------------------------
@@ -662,3 +2021,234 @@ if __name__ == "__main__":
     # Just manual inspection to see if it is working
     print("Pairwise distances of 1st CiM HV:")
     print(cim_distances[0])
+
+    # ---------------------------
+    # Packed binary HV check
+    # ---------------------------
+    print("======== Packed Binary HV Tests ========")
+    HV_TYPE = "binary"
+    BASE_SEED = random.getrandbits(32)
+
+    # Packed and unpacked generation must agree
+    lfsr_set = hv_gen_orthogonal_im(
+        num_items=NUM_ITEMS,
+        hv_size=HV_DIM,
+        hv_type=HV_TYPE,
+        gen_type="lfsr",
+        gen_lfsr_base_seed=BASE_SEED,
+    )
+    lfsr_set_packed = hv_gen_orthogonal_im(
+        num_items=NUM_ITEMS,
+        hv_size=HV_DIM,
+        hv_type=HV_TYPE,
+        gen_type="lfsr",
+        gen_lfsr_base_seed=BASE_SEED,
+        packed=True,
+    )
+    assert np.array_equal(hv_pack(lfsr_set), lfsr_set_packed), "Packing mismatch!"
+    assert np.array_equal(hv_unpack(lfsr_set_packed), lfsr_set), "Unpack mismatch!"
+
+    # Bind, permute, and distance must match the unpacked functions
+    lfsr_bank = hv_circ_perm_bank(lfsr_set)
+    for permute_amt in [0, 1, 63, 64, 65, 1000, HV_DIM - 1]:
+        assert np.array_equal(
+            lfsr_bank[:, permute_amt % HV_DIM], hv_circ_perm(lfsr_set, permute_amt)
+        ), f"Permutation bank mismatch at {permute_amt}!"
+        assert np.array_equal(
+            hv_unpack(hv_circ_perm_packed(lfsr_set_packed[0], permute_amt)),
+            hv_circ_perm(lfsr_set[0], permute_amt),
+        ), f"Packed permutation mismatch at {permute_amt}!"
+    assert np.array_equal(
+        hv_unpack(hv_bind_packed(lfsr_set_packed[0], lfsr_set_packed[1])),
+        hv_bind(lfsr_set[0], lfsr_set[1], hv_type=HV_TYPE),
+    ), "Packed binding mismatch!"
+    packed_dist = hv_norm_dist_packed(lfsr_set_packed, lfsr_set_packed[0])
+    for i in range(NUM_ITEMS):
+        expected_dist = hv_norm_dist(lfsr_set[i], lfsr_set[0], hv_type=HV_TYPE)
+        assert np.isclose(packed_dist[i], expected_dist), "Packed distance mismatch!"
+    print(f"Pass! Packed IM uses {lfsr_set_packed.nbytes} bytes", end=" ")
+    print(f"instead of {lfsr_set.nbytes} bytes")
+
+    # Packed CiM must match its unpacked version
+    np.random.seed(0)
+    cim_set = hv_gen_continuous_im(num_items=21, hv_size=HV_DIM, hv_type=HV_TYPE)
+    np.random.seed(0)
+    cim_set_packed = hv_gen_continuous_im(
+        num_items=21, hv_size=HV_DIM, hv_type=HV_TYPE, packed=True
+    )
+    assert np.array_equal(hv_pack(cim_set), cim_set_packed), "Packed CiM mismatch!"
+    print("Pass! Packed CiM check")
+
+    # ---------------------------
+    # Batched AM search check
+    # ---------------------------
+    print("======== Batched AM Search Tests ========")
+    for HV_TYPE in ["binary", "bipolar"]:
+        class_am = hv_gen_orthogonal_im(
+            num_items=NUM_ITEMS, hv_size=HV_DIM, hv_type=HV_TYPE, gen_type="ri"
+        )
+        query_set = hv_gen_orthogonal_im(
+            num_items=32, hv_size=HV_DIM, hv_type=HV_TYPE, gen_type="ri"
+        )
+        predict_idx, topk_idx, scores = hv_am_search(
+            class_am, query_set, hv_type=HV_TYPE, top_k=3
+        )
+        for q in range(len(query_set)):
+            expected_scores = [
+                hv_norm_dist(class_am[c], query_set[q], hv_type=HV_TYPE)
+                for c in range(NUM_ITEMS)
+            ]
+            assert np.allclose(scores[q], expected_scores), "Score mismatch!"
+            assert predict_idx[q] == topk_idx[q, 0], "Top-k mismatch!"
+            assert predict_idx[q] == hv_prediction_idx(class_am, query_set[q], HV_TYPE)
+        if HV_TYPE == "binary":
+            packed_idx, _, packed_scores = hv_am_search(
+                hv_pack(class_am), hv_pack(query_set), packed=True
+            )
+            assert np.allclose(packed_scores, scores), "Packed score mismatch!"
+            assert np.array_equal(packed_idx, predict_idx), "Packed search mismatch!"
+        print(f"Pass! {HV_TYPE} batched AM search check")
+
+    # ---------------------------
+    # Batch encoding check
+    # ---------------------------
+    print("======== Batch Encoding Tests ========")
+    for HV_TYPE in ["binary", "bipolar"]:
+        item_im = hv_gen_orthogonal_im(num_items=64, hv_size=HV_DIM, hv_type=HV_TYPE)
+        level_im = hv_gen_continuous_im(num_items=8, hv_size=HV_DIM, hv_type=HV_TYPE)
+        X = np.random.randint(0, 8, size=(16, 32))
+
+        # Record-based encoding
+        expected = [
+            np.sum([hv_bind(item_im[f], level_im[x[f]], HV_TYPE) for f in range(32)], 0)
+            for x in X
+        ]
+        encoded = hv_encode_record_batch(item_im, level_im, X, hv_type=HV_TYPE)
+        assert np.array_equal(encoded, expected), "Record encoding mismatch!"
+
+        # Same records from the bound table, and from a packed one
+        # when the unpacked table does not fit
+        bound_table = hv_gen_bound_table(item_im[:32], level_im, HV_TYPE)
+        encoded = hv_encode_record_table(bound_table, X)
+        assert np.array_equal(encoded, expected), "Bound table mismatch!"
+        packed_table = hv_gen_bound_table(
+            item_im[:32], level_im, HV_TYPE, max_bytes=bound_table.nbytes - 1
+        )
+        if HV_TYPE == "binary":
+            assert packed_table.nbytes * 8 == bound_table.nbytes
+            encoded = hv_encode_record_table(packed_table, X)
+            assert np.array_equal(encoded, expected), "Packed bound table mismatch!"
+        else:
+            assert packed_table is None, "Bound table over budget!"
+
+        # Permutation-sequence encoding
+        expected = [
+            np.sum([hv_circ_perm(item_im[x[i]], i) for i in range(32)], 0) for x in X
+        ]
+        encoded = hv_encode_perm_seq_batch(item_im, X)
+        assert np.array_equal(encoded, expected), "Sequence encoding mismatch!"
+
+        # Permutation-by-value encoding, e.g. of pixels
+        X_pixels = X % 2
+        expected = [
+            np.sum([hv_circ_perm(item_im[f], x[f]) for f in range(32)], 0)
+            for x in X_pixels
+        ]
+        encoded = hv_encode_perm_id_batch(item_im, X_pixels)
+        assert np.array_equal(encoded, expected), "Permuted ID encoding mismatch!"
+
+        # N-gram encoding
+        expected = []
+        for x in X:
+            encoded_vec = hv_gen_empty(HV_DIM)
+            for i in range(32 - 3 + 1):
+                ngram_vec = item_im[x[i]]
+                for j in range(1, 3):
+                    perm_vec = hv_circ_perm(item_im[x[i + j]], j)
+                    ngram_vec = hv_bind(ngram_vec, perm_vec, HV_TYPE)
+                encoded_vec += ngram_vec
+            expected.append(encoded_vec)
+        encoded = hv_encode_ngram_batch(item_im, X, 3, hv_type=HV_TYPE)
+        assert np.array_equal(encoded, expected), "N-gram encoding mismatch!"
+        encoded = hv_encode_ngram_batch(item_im, X, 3, hv_type=HV_TYPE, sliding=True)
+        assert np.array_equal(encoded, expected), "Sliding n-gram mismatch!"
+
+        # Skipped symbols and other permutations per n-gram position
+        X_skip = np.where(X % 5 == 0, -1, X)
+        encoded = hv_encode_ngram_batch(
+            item_im, X_skip, 3, hv_type=HV_TYPE, perm_shifts=[8, 4, 0]
+        )
+        sliding = hv_encode_ngram_batch(
+            item_im, X_skip, 3, hv_type=HV_TYPE, perm_shifts=[8, 4, 0], sliding=True
+        )
+        identity = np.full(HV_DIM, int(HV_TYPE == "bipolar"))
+        expected = []
+        for x in X_skip:
+            encoded_vec = hv_gen_empty(HV_DIM)
+            for i in range(32 - 3 + 1):
+                ngram_vec = identity
+                for j in range(3):
+                    if x[i + j] >= 0:
+                        perm_vec = hv_circ_perm(item_im[x[i + j]], 8 - 4 * j)
+                        ngram_vec = hv_bind(ngram_vec, perm_vec, HV_TYPE)
+                encoded_vec += ngram_vec
+            expected.append(encoded_vec)
+        assert np.array_equal(encoded, expected), "Skipped n-gram mismatch!"
+        assert np.array_equal(sliding, expected), "Skipped sliding n-gram mismatch!"
+        print(f"Pass! {HV_TYPE} batch encoding check")
+
+    # ---------------------------
+    # Integer bundling check
+    # ---------------------------
+    print("======== Integer Bundling Tests ========")
+    hv_set = hv_gen_orthogonal_im(NUM_ITEMS, HV_DIM, "bipolar", "lfsr")
+    float_acc = hv_gen_empty(HV_DIM)
+    int_acc = hv_gen_empty(HV_DIM, dtype=hv_count_dtype(NUM_ITEMS))
+    hv_bundle_into(float_acc, hv_set)
+    hv_bundle_into(int_acc, hv_set)
+    hv_bundle_into(float_acc, hv_set[0], subtract=True)
+    hv_bundle_into(int_acc, hv_set[0], subtract=True)
+    assert np.array_equal(float_acc, int_acc), "Integer bundling mismatch!"
+
+    # Counters at the limit either raise or saturate
+    int_acc = np.full(HV_DIM, 127, dtype=np.int8)
+    try:
+        hv_bundle_into(int_acc, hv_set[0])
+        raise AssertionError("Counter overflow was not detected!")
+    except OverflowError:
+        pass
+    hv_bundle_into(int_acc, hv_set[0], saturate=True)
+    assert np.array_equal(int_acc, np.where(hv_set[0] > 0, 127, 126))
+    print("Pass! Integer bundling check")
+
+    # ---------------------------
+    # Kernel registry check
+    # ---------------------------
+    print("======== Kernel Registry Tests ========")
+    for HV_TYPE, PACKED in (("binary", False), ("bipolar", False), ("binary", True)):
+        kernels = hv_get_kernels(HV_TYPE, PACKED)
+        assert kernels is hv_get_kernels(HV_TYPE, PACKED), "Kernels not cached!"
+        assert pickle.loads(pickle.dumps(kernels)) is kernels, "Kernel pickling!"
+        item_im = hv_gen_orthogonal_im(NUM_ITEMS, HV_DIM, HV_TYPE, "lfsr")
+        class_sum = np.add.reduce(item_im[:8].reshape(4, 2, HV_DIM), axis=1)
+        class_bin = hv_binarize(class_sum, 1, HV_TYPE)
+        ref_norms = hv_am_norms(class_bin, HV_TYPE)
+        ref_search = hv_am_search(class_bin, item_im, HV_TYPE, top_k=3)
+        ref_dist = hv_norm_dist(item_im[0], item_im[1], HV_TYPE)
+        if PACKED:
+            item_im, class_ref = hv_pack(item_im), hv_pack(class_bin)
+            ref_norms = hv_popcount(class_ref)
+        else:
+            class_ref = class_bin
+        class_am = kernels.binarize(class_sum, 1)
+        assert np.array_equal(class_am, class_ref), "Kernel binarize mismatch!"
+        assert np.array_equal(
+            kernels.bind(item_im[0], item_im[1]),
+            hv_bind(item_im[0], item_im[1], HV_TYPE),
+        ), "Kernel bind mismatch!"
+        assert np.array_equal(kernels.am_norms(class_am), ref_norms)
+        assert kernels.norm_dist(item_im[0], item_im[1]) == ref_dist
+        search = kernels.am_search(class_am, item_im, top_k=3)
+        for result, ref_result in zip(search, ref_search):
+            assert np.array_equal(result, ref_result), "Kernel search mismatch!"
+        print(f"Pass! {kernels.backend} kernels of {HV_TYPE} HVs check")
@@ -0,0 +1,330 @@
+"""
+================================
+VSAX Inference Model
+================================
+
+This library consists of an immutable, inference-only view of a trained
+VSA model. It keeps only what a prediction needs: the item memories,
+the searched class AM and its norms. It only imports NumPy, vsax and
+vsax_io, so a serving process loads it without tqdm or argparse.
+"""
+
+# ---------------------------------------------------------------------------
+# Importing packages
+# ---------------------------------------------------------------------------
+import numpy as np
+import vsax
+import vsax_io
+from typing import Optional
+
+
+# ---------------------------------------------------------------------------
+# Auxiliary functions
+# ---------------------------------------------------------------------------
+
+
+# Contiguous, read-only copy of an array
+def frozen_array(array, copy: bool = True) -> np.ndarray:
+    """
+    Make a C-contiguous array that cannot be written to.
+
+    Parameters:
+        array (np.ndarray): The array to freeze.
+        copy (bool): If False, contiguous arrays such as
+                     read-only memory maps are not copied.
+    Returns:
+        np.ndarray: The read-only array.
+    """
+    if copy:
+        array = np.array(array, order="C")
+    else:
+        array = np.ascontiguousarray(array)
+    array.flags.writeable = False
+    return array
+
+
+# ============================================================================
+# Inference model class
+# ============================================================================
+
+
+class vsaInferModel:
+    """
+    Immutable inference model built from a trained vsaModel.
+
+    Predictions match vsaModel.test_model: the same AM is searched
+    (the binarized AM if binarize_am or packed, the frozen AM otherwise)
+    with the same similarity scores and tie-breaking.
+
+    Parameters:
+        model_name (str): The name of the model.
+        hv_size (int): The size of the hypervectors.
+        hv_type (str): The type of hypervector.
+        packed (bool): If True, IMs and the searched AM are bit-packed.
+        binarize_encode (bool): If True, encodings are binarized.
+        class_list (list): List of class labels.
+        ortho_im (np.ndarray): The orthogonal item memory.
+        cim (np.ndarray): The continuous item memory.
+        class_am (np.ndarray): The searched class AM.
+        model_class (type): The vsaModel subclass whose encode and
+                            encode_batch methods encode the samples.
+                            They run on the inference model, which has
+                            the attributes they use (hv_size, hv_type,
+                            ortho_im, cim, packed, binarize_encode,
+                            encode_record_batch).
+                            If None, the inputs of the predict
+                            functions are encoded HVs.
+        bound_table_bytes (int): The max bytes of each bound table
+                                 of encode_record_batch.
+        kernel_backend (str): The preferred backend of the HV kernels
+                              (see vsax.hv_get_kernels).
+
+    Methods:
+        from_model(model, model_class): Snapshot a trained vsaModel.
+        load(load_path, model_class): Load a saved model file.
+        encode(item_data): Encode one sample with the model class.
+        encode_batch(X): Encode a batch of samples with the model class.
+        encode_record_batch(X, id_offset, level_rows): Record-based encoding.
+        predict(x): Predict the class label of one sample.
+        predict_batch(X): Predict the class labels of a batch of samples.
+        predict_topk(X, top_k): Predict the top_k class labels and scores.
+    """
+
+    __slots__ = (
+        "model_name",
+        "hv_size",
+        "hv_type",
+        "packed",
+        "binarize_encode",
+        "class_list",
+        "num_classes",
+        "ortho_im",
+        "cim",
+        "class_am",
+        "class_am_norm",
+        "class_labels",
+        "model_class",
+        "bound_table_bytes",
+        "_bound_tables",
+        "kernels",
+    )
+
+    def __init__(
+        self,
+        model_name: str,
+        hv_size: int,
+        hv_type: str,
+        packed: bool,
+        binarize_encode: bool,
+        class_list: list,
+        ortho_im,
+        cim: np.ndarray,
+        class_am: np.ndarray,
+        model_class: Optional[type] = None,
+        bound_table_bytes: int = vsax.HV_BOUND_TABLE_BYTES,
+        kernel_backend: Optional[str] = None,
+    ):
+        set_slot = object.__setattr__
+        kernels = vsax.hv_get_kernels(hv_type, packed, kernel_backend)
+        set_slot(self, "model_name", model_name)
+        set_slot(self, "hv_size", hv_size)
+        set_slot(self, "hv_type", hv_type)
+        set_slot(self, "packed", packed)
+        set_slot(self, "binarize_encode", binarize_encode)
+        set_slot(self, "class_list", tuple(class_list))
+        set_slot(self, "num_classes", len(class_list))
+        set_slot(self, "ortho_im", ortho_im)
+        set_slot(self, "cim", cim)
+        set_slot(self, "class_am", class_am)
+        set_slot(
+            self,
+            "class_am_norm",
+            frozen_array(kernels.am_norms(class_am)),
+        )
+        set_slot(self, "class_labels", frozen_array(class_list))
+        set_slot(self, "model_class", model_class)
+        set_slot(self, "bound_table_bytes", bound_table_bytes)
+        # Bound tables of encode_record_batch by their layout, the item
+        # memories never change so a table is built once per layout
+        set_slot(self, "_bound_tables", dict())
+        set_slot(self, "kernels", kernels)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    # Snapshot of a trained model
+    @classmethod
+    def from_model(cls, model, model_class: Optional[type] = None):
+        """
+        Build an inference model from a trained vsaModel.
+
+        Parameters:
+            model (vsaModel): The trained model. Its arrays are copied,
+                              so later training does not change
+                              the inference model.
+            model_class (type): The class that encodes the samples,
+                                defaults to the class of the model.
+        Returns:
+            vsaInferModel: The inference model.
+        """
+        if model_class is None:
+            model_class = type(model)
+
+        # Lazy IMs generate their rows on demand and are kept as they are
+        ortho_im = model.ortho_im
+        if isinstance(ortho_im, np.ndarray):
+            ortho_im = frozen_array(ortho_im)
+
+        return cls(
+            model_name=model.model_name,
+            hv_size=model.hv_size,
+            hv_type=model.hv_type,
+            packed=model.packed,
+            binarize_encode=model.binarize_encode,
+            class_list=model.class_list,
+            ortho_im=ortho_im,
+            cim=frozen_array(model.cim),
+            class_am=frozen_array(model._search_am()),
+            model_class=model_class,
+            bound_table_bytes=model.bound_table_bytes,
+            kernel_backend=model.kernels.backend,
+        )
+
+    # Load only what inference needs from a model file
+    @classmethod
+    def load(cls, load_path: str, model_class: Optional[type] = None):
+        """
+        Load an inference model from a file saved by vsaModel.save_model.
+
+        Only the searched AM is decoded, raw arrays stay memory-mapped
+        read-only, and a seeded orthogonal IM is regenerated.
+
+        Parameters:
+            load_path (str): The path of the model file.
+            model_class (type): The vsaModel subclass that encodes the samples.
+        Returns:
+            vsaInferModel: The inference model.
+        """
+        header, arrays = vsax_io.load_model_file(load_path, mmap_mode="r")
+        array_specs = header["arrays"]
+
+        def load_array(name):
+            spec = array_specs[name]
+            if spec["encoding"] == "same":
+                return load_array(spec["like"])
+            array = vsax_io.expand_array(arrays[name], spec)
+            return frozen_array(array, copy=False)
+
+        if array_specs["ortho_im"]["encoding"] == "seed":
+            ortho_im = frozen_array(
+                vsax.hv_gen_orthogonal_im(
+                    num_items=header["num_ortho_im"],
+                    hv_size=header["hv_size"],
+                    hv_type=header["hv_type"],
+                    gen_type=header["gen_type"],
+                    gen_ri_p_dense=header["gen_ri_p_dense"],
+                    gen_lfsr_base_seed=header["gen_lfsr_base_seed"],
+                    packed=header["packed"],
+                ),
+                copy=False,
+            )
+        else:
+            ortho_im = load_array("ortho_im")
+
+        if header["binarize_am"] or header["packed"]:
+            class_am = load_array("class_am_bin")
+        else:
+            class_am = load_array("class_am_frozen")
+
+        return cls(
+            model_name=header["model_name"],
+            hv_size=header["hv_size"],
+            hv_type=header["hv_type"],
+            packed=header["packed"],
+            binarize_encode=header["binarize_encode"],
+            class_list=header["class_list"],
+            ortho_im=ortho_im,
+            cim=load_array("cim"),
+            class_am=class_am,
+            model_class=model_class,
+        )
+
+    # Encoders of the model class, run on this model
+    def encode(self, item_data):
+        return self.model_class.encode(self, item_data)
+
+    def encode_batch(self, X):
+        return self.model_class.encode_batch(self, X)
+
+    # Record-based encoding like vsaModel.encode_record_batch
+    def encode_record_batch(self, X, id_offset=0, level_rows=None):
+        return vsax.hv_encode_record_cached(
+            self.ortho_im,
+            self.cim,
+            X,
+            self._bound_tables,
+            id_offset=id_offset,
+            level_rows=level_rows,
+            hv_type=self.hv_type,
+            max_bytes=self.bound_table_bytes,
+        )
+
+    # Encoded HVs that are searched, bit-packed for packed models
+    def _encode_query(self, X):
+        if self.model_class is None:
+            encoded_vecs = np.asarray(X)
+        else:
+            encoded_vecs = self.encode_batch(X)
+        if self.packed and encoded_vecs.dtype != np.uint64:
+            encoded_vecs = vsax.hv_pack(encoded_vecs)
+        return encoded_vecs
+
+    # Search a batch of encoded HVs
+    def _search(self, encoded_vecs, top_k=1):
+        return self.kernels.am_search(
+            self.class_am, encoded_vecs, class_am_norm=self.class_am_norm, top_k=top_k
+        )
+
+    def predict(self, x):
+        """
+        Predict the class label of one sample.
+
+        Parameters:
+            x: One sample, or one encoded HV if the model has no encoder.
+        Returns:
+            The predicted class label.
+        """
+        predict_idx, _, _ = self._search(self._encode_query([x]))
+        return self.class_list[predict_idx[0]]
+
+    def predict_batch(self, X) -> np.ndarray:
+        """
+        Predict the class labels of a batch of samples.
+
+        Parameters:
+            X: The batch of samples, or of encoded HVs
+               if the model has no encoder.
+        Returns:
+            np.ndarray: The predicted class label of each sample.
+        """
+        predict_idx, _, _ = self._search(self._encode_query(X))
+        return self.class_labels[predict_idx]
+
+    def predict_topk(self, X, top_k: int = 3) -> tuple:
+        """
+        Predict the top_k class labels of a batch of samples.
+
+        Parameters:
+            X: The batch of samples, or of encoded HVs
+               if the model has no encoder.
+            top_k (int): The number of best classes per sample.
+        Returns:
+            tuple: The top_k class labels per sample sorted from best
+            to worst, of shape (N, top_k), and their scores.
+        """
+        _, topk_idx, scores = self._search(self._encode_query(X), top_k)
+        topk_scores = np.take_along_axis(scores, topk_idx, axis=-1)
+        return self.class_labels[topk_idx], topk_scores
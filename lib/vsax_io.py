@@ -0,0 +1,277 @@
+"""
+================================
+VSAX Model File Functions
+================================
+
+This library consists of the functions that save and load VSA models
+in a compact, versioned and memory-mappable file format.
+It only depends on NumPy, so inference code can load models
+without the training and data utilities.
+"""
+
+# ---------------------------------------------------------------------------
+# Importing packages
+# ---------------------------------------------------------------------------
+import json
+import struct
+import zipfile
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Model file format
+# ---------------------------------------------------------------------------
+# Models are saved as an uncompressed .npz with a JSON header member.
+# Arrays are stored in their most compact exact form (see compact_array)
+# and every member can be memory-mapped straight from the file.
+vsax_model_format = "vsax-model"
+vsax_model_version = 1
+vsax_model_header_name = "header"
+
+# Parameters in the header of a model file
+vsax_model_params = (
+    "model_name",
+    "hv_size",
+    "hv_type",
+    "num_ortho_im",
+    "num_cim",
+    "cim_max_is_ortho",
+    "class_list",
+    "gen_type",
+    "gen_ri_p_dense",
+    "gen_lfsr_base_seed",
+    "packed",
+    "lazy_im",
+    "acc_dtype",
+    "acc_saturate",
+    "binarize_encode",
+    "binarize_am",
+)
+
+# Arrays of a model file
+vsax_model_arrays = (
+    "ortho_im",
+    "cim",
+    "class_am",
+    "class_am_frozen",
+    "class_am_bin",
+    "class_am_count",
+)
+
+
+# ---------------------------------------------------------------------------
+# Model file functions
+# ---------------------------------------------------------------------------
+
+
+# Smallest integer type that holds all values of a dataset
+def smallest_int_dtype(dataset: np.ndarray) -> np.dtype:
+    """
+    Find the smallest integer dtype that can hold all values of a dataset.
+
+    Args:
+        dataset (np.ndarray): Integer dataset
+    Returns:
+        np.dtype: The smallest (unsigned if possible) integer dtype
+    """
+    if dataset.size == 0:
+        return dataset.dtype
+    low, high = int(dataset.min()), int(dataset.max())
+    if low >= 0:
+        return np.min_scalar_type(high)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return dataset.dtype
+
+
+# Store an array in its most compact exact form
+def compact_array(array: np.ndarray) -> tuple[np.ndarray, dict]:
+    """
+    Convert an array to the smallest exact representation.
+
+    Arrays with only 0/1 or only -1/+1 values are bit-packed,
+    integral arrays use the smallest integer dtype, if needed
+    relative to the minimum of each row, and everything else
+    is kept as is.
+
+    Args:
+        array (np.ndarray): Array to store
+    Returns:
+        stored (np.ndarray): The array to write
+        spec (dict): What expand_array needs to restore the array
+    """
+    array = np.asarray(array)
+    spec = {
+        "encoding": "raw",
+        "dtype": np.lib.format.dtype_to_descr(array.dtype),
+        "shape": list(array.shape),
+    }
+    if array.size == 0 or not (
+        np.issubdtype(array.dtype, np.integer)
+        or np.issubdtype(array.dtype, np.floating)
+        or array.dtype == np.bool_
+    ):
+        return array, spec
+
+    for low in (0, -1):
+        if array.ndim > 0 and np.all((array == low) | (array == 1)):
+            spec.update(encoding="bits", low=low)
+            stored = np.packbits(array == 1, axis=-1, bitorder="little")
+            return stored, spec
+
+    if np.issubdtype(array.dtype, np.floating):
+        if not np.array_equal(np.rint(array), array):
+            return array, spec
+        int_array = array.astype(np.int64)
+    else:
+        int_array = array
+    stored = int_array.astype(smallest_int_dtype(int_array))
+
+    # Counters of one row are often close together, so storing them
+    # relative to the row minimum can need a smaller dtype
+    if array.ndim > 1:
+        offset = int_array.min(axis=-1, keepdims=True)
+        shifted = int_array - offset
+        shifted = shifted.astype(smallest_int_dtype(shifted))
+        if shifted.dtype.itemsize < stored.dtype.itemsize:
+            spec.update(encoding="int", offset=offset.tolist())
+            return shifted, spec
+    if stored.dtype != array.dtype:
+        spec["encoding"] = "int"
+    return stored, spec
+
+
+# Restore an array stored by compact_array
+def expand_array(stored: np.ndarray, spec: dict) -> np.ndarray:
+    """
+    Restore an array from its compact form.
+
+    Raw arrays are returned as they are, so memory-mapped
+    arrays stay memory-mapped.
+
+    Args:
+        stored (np.ndarray): The stored array
+        spec (dict): The spec returned by compact_array
+    Returns:
+        np.ndarray: The restored array
+    """
+    dtype = np.dtype(np.lib.format.descr_to_dtype(spec["dtype"]))
+    if spec["encoding"] == "raw":
+        return stored
+    if spec["encoding"] == "int":
+        if "offset" in spec:
+            return (stored + np.array(spec["offset"], dtype=np.int64)).astype(dtype)
+        return stored.astype(dtype)
+    if spec["encoding"] == "bits":
+        shape = spec["shape"]
+        bits = np.unpackbits(stored, axis=-1, count=shape[-1], bitorder="little")
+        if spec["low"] == -1:
+            return (2 * bits.astype(np.int8) - 1).astype(dtype)
+        return bits.astype(dtype)
+    raise ValueError(f"Unknown array encoding: {spec['encoding']}")
+
+
+# Memory-map the members of an uncompressed .npz file
+def load_npz_mmap(file_path: str, mmap_mode: str = "r") -> dict:
+    """
+    Memory-map every array of an uncompressed .npz file,
+    which np.load does not do for .npz files.
+
+    Args:
+        file_path (str): Path to the .npz file
+        mmap_mode (str): "r" for read-only or "c" for copy-on-write arrays
+    Returns:
+        dict: Array name to memory-mapped array
+    """
+    arrays = dict()
+    with open(file_path, "rb") as rf, zipfile.ZipFile(rf) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Compressed member {info.filename} in {file_path}")
+
+            # The local file header has its own name and extra field lengths
+            rf.seek(info.header_offset)
+            local_header = rf.read(30)
+            name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+            rf.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(rf)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(rf)
+            else:
+                header = np.lib.format.read_array_header_2_0(rf)
+            shape, fortran_order, dtype = header
+            if dtype.hasobject:
+                raise ValueError(f"Object array {info.filename} in {file_path}")
+
+            name = info.filename.removesuffix(".npy")
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                file_path,
+                dtype=dtype,
+                mode=mmap_mode,
+                offset=rf.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+# Check if a file is in the model file format
+def is_model_file(file_path: str) -> bool:
+    """
+    Check if a file was written by save_model_file,
+    older models are compressed .npz files without a header.
+
+    Args:
+        file_path (str): Path to the model file
+    Returns:
+        bool: True for the model file format
+    """
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            return f"{vsax_model_header_name}.npy" in zf.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+# Save a header and its arrays as a model file
+def save_model_file(file_path: str, header: dict, arrays: dict) -> None:
+    """
+    Save a model header and arrays as an uncompressed .npz file.
+
+    Args:
+        file_path (str): Path to the model file, np.savez
+                         adds .npz if it is missing
+        header (dict): JSON-serializable model header
+        arrays (dict): Array name to array
+    """
+    header = dict(format=vsax_model_format, version=vsax_model_version, **header)
+    header_bytes = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    np.savez(file_path, **{vsax_model_header_name: header_bytes}, **arrays)
+
+
+# Load the header and arrays of a model file
+def load_model_file(file_path: str, mmap_mode: str = "r") -> tuple[dict, dict]:
+    """
+    Load a model file written by save_model_file.
+
+    Args:
+        file_path (str): Path to the model file
+        mmap_mode (str): "r" for read-only or "c" for copy-on-write arrays
+    Returns:
+        header (dict): The model header
+        arrays (dict): Array name to memory-mapped array
+    """
+    arrays = load_npz_mmap(file_path, mmap_mode=mmap_mode)
+    header = json.loads(bytes(arrays.pop(vsax_model_header_name)).decode())
+    if header.get("format") != vsax_model_format:
+        raise ValueError(f"Not a VSAX model file: {file_path}")
+    if header.get("version", 0) > vsax_model_version:
+        raise ValueError(
+            f"Model file version {header['version']} is newer than "
+            f"the supported version {vsax_model_version}: {file_path}"
+        )
+    return header, arrays
@@ -8,11 +8,20 @@ These classes are meant to be reproducible and extendable to other applications.
 """
 
 import os
+import copy
+import functools
+import tempfile
 import vsax
 import vsax_util
+import vsax_io
+import vsax_infer
+import vsax_profile
 import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
 from tqdm import tqdm
 from typing import Optional
+from collections import OrderedDict
 import argparse
 
 # ============================================================================
@@ -31,13 +40,220 @@ def vsax_general_parser():
     parser.add_argument(
         "--dtqdm", "-d", action="store_true", help="Disable tqdm progress bars"
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes for training and testing, -1 for all cores",
+    )
+    parser.add_argument(
+        "--profile",
+        "-p",
+        action="store_true",
+        help="Time each stage and print the profile with the model statistics",
+    )
     args = parser.parse_args()
 
     save_mode = args.save
     load_mode = args.load
     disable_tqdm = args.dtqdm
+    n_jobs = os.cpu_count() if args.jobs == -1 else args.jobs
+    profile_mode = args.profile
+
+    return save_mode, load_mode, disable_tqdm, n_jobs, profile_mode
+
+
+# Time a model method as a profiler stage and track the model arrays after it
+def profiled_stage(stage_name):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(stage_name):
+                result = method(self, *args, **kwargs)
+            if self.profiler.enabled:
+                self.profiler.track_arrays(self._profile_arrays())
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# ============================================================================
+# Process pool functions
+# ============================================================================
+# Item memories are shared with the workers through shared memory
+# so they are neither copied per worker nor pickled per task.
+
+# Model and search AM of the current pool worker, set by _pool_init
+_pool_model = None
+_pool_search = None
+_pool_shm = []
+
+
+# Copy an array into a new shared memory block
+def _pool_share_array(arr):
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
 
-    return save_mode, load_mode, disable_tqdm
+
+# Worker initializer that attaches the shared item memories
+def _pool_init(model, shared_ims, search):
+    global _pool_model, _pool_search
+    for im_name, (shm_name, shape, dtype) in shared_ims.items():
+        # Pool workers share the resource tracker of the parent,
+        # which unlinks the blocks once the pool is done
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _pool_shm.append(shm)
+        setattr(model, im_name, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    _pool_model = model
+    _pool_search = search
+
+
+# Worker task on one chunk of samples of a class
+def _pool_task(task_args):
+    task, class_label, X_chunk = task_args
+    return _pool_model._chunk_task(task, class_label, X_chunk, _pool_search)
+
+
+# ============================================================================
+# Lazy item memory class
+# ============================================================================
+
+
+class vsaLazyIM:
+    """
+    Item memory that generates its hypervectors on demand.
+
+    Every row only depends on the base seed and the item index
+    (see vsax.hv_gen_lfsr_im and vsax.hv_gen_ca90_im), so rows are
+    generated when they are indexed and the most recently used ones
+    are kept in a bounded LRU cache. It indexes like the full
+    (num_items, hv_size) array: integers, slices, index arrays and
+    boolean masks on the first axis. np.asarray(im) builds the whole
+    memory.
+
+    Parameters:
+        num_items (int): The number of items in the item memory.
+        hv_size (int): The size of the hypervectors.
+        hv_type (str): The type of hypervector ('bipolar' or 'binary').
+        gen_type (str): The type of hypervector generation.
+                        Can be 'lfsr' or 'ca90'.
+        gen_lfsr_base_seed (int): The base seed for the LFSR generator.
+        gen_ca90_seed_size (int): The number of seed bits expanded by CA90.
+        packed (bool): If True, rows are bit-packed in uint64 words.
+        cache_size (int): The maximum number of cached rows.
+    """
+
+    def __init__(
+        self,
+        num_items: int,
+        hv_size: int,
+        hv_type: str = "binary",
+        gen_type: str = "lfsr",
+        gen_lfsr_base_seed: int = 42,
+        gen_ca90_seed_size: int = 512,
+        packed: bool = False,
+        cache_size: int = 1024,
+    ):
+        if gen_type not in ("lfsr", "ca90"):
+            raise ValueError(
+                f"Lazy item memories need a seeded generator, got gen_type={gen_type}"
+            )
+        if packed:
+            vsax.hv_check_packable(hv_size, hv_type)
+
+        self.num_items = num_items
+        self.hv_size = hv_size
+        self.hv_type = hv_type
+        self.gen_type = gen_type
+        self.gen_lfsr_base_seed = gen_lfsr_base_seed
+        self.gen_ca90_seed_size = gen_ca90_seed_size
+        self.packed = packed
+        self.cache_size = cache_size
+
+        # Cached rows from least to most recently used
+        self._cache = OrderedDict()
+
+    @property
+    def shape(self):
+        if self.packed:
+            return (self.num_items, vsax.hv_packed_words(self.hv_size))
+        return (self.num_items, self.hv_size)
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.num_items
+
+    def __array__(self, dtype=None, copy=None):
+        im = self._gen_rows(np.arange(self.num_items))
+        return im if dtype is None else im.astype(dtype)
+
+    def __getitem__(self, key):
+        # Only the first axis is generated, the rest is plain indexing
+        if isinstance(key, tuple):
+            rows = self[key[0]]
+            if isinstance(key[0], (int, np.integer)):
+                return rows[key[1:]]
+            return rows[(slice(None),) + key[1:]]
+
+        if isinstance(key, (int, np.integer)):
+            return self._get_rows(self._check_idx(np.array([key])))[0]
+        if isinstance(key, slice):
+            return self._get_rows(np.arange(self.num_items)[key])
+
+        key = np.asarray(key)
+        if key.dtype == bool:
+            if key.shape != (self.num_items,):
+                raise IndexError("Boolean index does not match the item memory")
+            return self._get_rows(np.flatnonzero(key))
+        idx = self._check_idx(key.ravel())
+        return self._get_rows(idx).reshape(key.shape + self.shape[1:])
+
+    # Bound check and wrap negative indices
+    def _check_idx(self, idx):
+        idx = idx.astype(np.int64)
+        if np.any((idx < -self.num_items) | (idx >= self.num_items)):
+            raise IndexError(f"Item index out of range for {self.num_items} items")
+        return np.where(idx < 0, idx + self.num_items, idx)
+
+    # Generate rows without touching the cache
+    def _gen_rows(self, idx):
+        if self.gen_type == "lfsr":
+            return vsax.hv_gen_lfsr_im(
+                self.gen_lfsr_base_seed, idx, self.hv_size, self.hv_type, self.packed
+            )
+        return vsax.hv_gen_ca90_im(
+            self.gen_lfsr_base_seed,
+            idx,
+            self.hv_size,
+            self.hv_type,
+            self.gen_ca90_seed_size,
+            self.packed,
+        )
+
+    # Fetch rows from the cache, generating the missing ones at once
+    def _get_rows(self, idx):
+        if len(idx) == 0:
+            return self._gen_rows(idx)
+        unique_idx, inverse = np.unique(idx, return_inverse=True)
+        missing = [item for item in unique_idx.tolist() if item not in self._cache]
+        if missing:
+            for item, row in zip(missing, self._gen_rows(np.array(missing))):
+                self._cache[item] = row.copy()
+
+        rows = []
+        for item in unique_idx.tolist():
+            self._cache.move_to_end(item)
+            rows.append(self._cache[item])
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return np.stack(rows)[inverse]
 
 
 # ============================================================================
@@ -62,9 +278,39 @@ class vsaModel:
         gen_type (str): The type of hypervector generation. Can be 'ri' or 'lfsr'.
         gen_ri_p_dense (float): The density of the random index hypervectors.
         gen_lfsr_base_seed (int): The base seed for the LFSR generator.
+        packed (bool): If True, keep binary IMs and the binarized AM
+                       bit-packed in uint64 words (see vsax.hv_pack).
+                       Only valid for hv_type 'binary'. Packed models work on
+                       binarized encodings and always search the binarized AM.
+        lazy_im (bool): If True, the orthogonal IM is a vsaLazyIM that
+                        generates its rows on demand. Only valid for the
+                        'lfsr' and 'ca90' generators. Saved models then
+                        only keep the seed instead of the whole IM.
+        acc_dtype (str): The element type of the class AM counters.
+                         Can be 'float64', a signed integer type such as
+                         'int16' or 'int32', or 'auto'. 'auto' picks the
+                         smallest integer type for the number of training
+                         samples (see vsax.hv_count_dtype) when encodings
+                         are binarized, and 'int32' otherwise. Retraining
+                         widens 'auto' counters for its epochs of updates.
+        acc_saturate (bool): If True, integer counters saturate like the RTL
+                             bundler counters. Otherwise an overflow raises
+                             OverflowError.
+        n_jobs (int): The number of worker processes for training and testing,
+                      -1 uses all cores. Every chunk of batch_size samples is a
+                      task and the results are reduced in the same order as
+                      the serial path, so they match it exactly.
+        kernel_backend (str): The preferred backend of the HV kernels ('numpy',
+                              'packed' or 'jit'). If None or not available,
+                              the best available one is used
+                              (see vsax.hv_get_kernels).
+        profiler (vsax_profile.vsaProfiler): If given, the stages are timed
+                                             and counted into this profiler,
+                                             e.g. one shared with read_data.
+                                             Otherwise profiling is disabled.
 
     Attributes:
-        ortho_im (np.ndarray): The orthogonal item memory hypervectors.
+        ortho_im (np.ndarray or vsaLazyIM): The orthogonal item memory hypervectors.
         cim (np.ndarray): The continuous item memory hypervectors.
         class_am (np.ndarray): The AM for each class.
         class_am_frozen (np.ndarray): The frozen AM for each class.
@@ -73,6 +319,16 @@ class vsaModel:
         test_class_score (np.ndarray): The score for each class during testing.
         test_class_accuracy (np.ndarray): The accuracy for each class during testing.
         model_accuracy (float): The overall accuracy of the model during testing.
+        retrain_valid_accuracy (list): The validation accuracy before and after
+                                       each retraining epoch.
+        batch_size (int): The number of samples encoded and searched at once.
+        encode_cache_bytes (int): The max bytes of encodings that mini-batch
+                                  retraining keeps across epochs.
+        bound_table_bytes (int): The max bytes of the precomputed ID-level
+                                 table of encode_record_batch.
+        kernels (vsax.hvKernels): The HV kernels resolved for hv_type and packed.
+        profiler (vsax_profile.vsaProfiler): The stage timers, counters and
+                                             peak AM/IM sizes of the run.
 
     Debugging Parameters:
         tqdm_train_disable (bool): If True, show progress bar during training.
@@ -81,10 +337,15 @@ class vsaModel:
 
     Methods:
         encode(item_data): Encode the input data into a hypervector.
+        encode_batch(X): Encode a batch of samples into a matrix of hypervectors.
+        encode_record_batch(X, id_offset, level_im): Record-based (ID-level)
+            batch encoding from a precomputed table of bound HVs.
         train_model(X_train): Train the VSA model using the provided training data.
-        retrain_model(X_train): Retrain the VSA model using the provided training data.
+        retrain_model(X_train, epochs, learning_rate, mini_batch, X_valid, patience):
+            Retrain the VSA model using the provided training data.
         test_model(X_test): Test the VSA model using the provided test data.
-        print_model_stats(): Print the statistics of the VSA model.
+        print_model_stats(): Print the statistics of the VSA model,
+            and the profile if profiling is enabled.
         save_model(save_path): Save the model parameters to a file.
         load_model(load_path): Load the model parameters from a file.
     """
@@ -101,6 +362,13 @@ class vsaModel:
         gen_type: str = "ri",
         gen_ri_p_dense: float = 0.5,
         gen_lfsr_base_seed: int = 42,
+        packed: bool = False,
+        lazy_im: bool = False,
+        acc_dtype: str = "float64",
+        acc_saturate: bool = False,
+        n_jobs: int = 1,
+        kernel_backend: Optional[str] = None,
+        profiler: Optional[vsax_profile.vsaProfiler] = None,
     ):
         # Model name
         self.model_name = model_name
@@ -116,24 +384,36 @@ class vsaModel:
         self.gen_type = gen_type
         self.gen_ri_p_dense = gen_ri_p_dense
         self.gen_lfsr_base_seed = gen_lfsr_base_seed
+        self.packed = packed
+        if self.packed:
+            vsax.hv_check_packable(self.hv_size, self.hv_type)
+        self.lazy_im = lazy_im
+
+        # HV kernels resolved once for the hv_type and layout
+        self.kernel_backend = kernel_backend
+        self._resolve_kernels()
+
+        # Class AM counter parameters
+        self.acc_dtype = acc_dtype
+        self.acc_saturate = acc_saturate
+        acc_np_dtype = self._acc_np_dtype()
+        if not (
+            np.issubdtype(acc_np_dtype, np.floating)
+            or np.issubdtype(acc_np_dtype, np.signedinteger)
+        ):
+            raise ValueError(f"Unsupported accumulator type: {acc_dtype}")
 
         # Parameters that will be determined later
         self.class_list = class_list
         self.num_classes = len(class_list)
 
         # Some extra internal parameters
-        self.binarize_encode = False
+        # packed models only deal with binarized encodings
+        self.binarize_encode = self.packed
         self.binarize_am = False
 
         # Generate list of item memories (iMs)
-        self.ortho_im = vsax.hv_gen_orthogonal_im(
-            num_items=self.num_ortho_im,
-            hv_size=self.hv_size,
-            hv_type=self.hv_type,
-            gen_type=self.gen_type,
-            gen_ri_p_dense=self.gen_ri_p_dense,
-            gen_lfsr_base_seed=self.gen_lfsr_base_seed,
-        )
+        self.ortho_im = self._gen_ortho_im()
 
         # Generate list of CiM
         self.cim = vsax.hv_gen_continuous_im(
@@ -141,12 +421,19 @@ class vsaModel:
             hv_size=self.hv_size,
             cim_max_is_ortho=self.cim_max_is_ortho,
             hv_type=self.hv_type,
+            packed=self.packed,
         )
 
         # Initialization of associative memories
-        self.class_am = vsax.hv_gen_empty_mem(self.num_classes, self.hv_size)
-        self.class_am_frozen = vsax.hv_gen_empty_mem(self.num_classes, self.hv_size)
-        self.class_am_bin = vsax.hv_gen_empty_mem(self.num_classes, self.hv_size)
+        self.class_am = vsax.hv_gen_empty_mem(
+            self.num_classes, self.hv_size, dtype=acc_np_dtype
+        )
+        self.class_am_frozen = vsax.hv_gen_empty_mem(
+            self.num_classes, self.hv_size, dtype=acc_np_dtype
+        )
+        self.class_am_bin = vsax.hv_gen_empty_mem(
+            self.num_classes, self.hv_size, packed=self.packed
+        )
         self.class_am_count = np.zeros(self.num_classes)
 
         # Some statistics for testing
@@ -159,6 +446,28 @@ class vsaModel:
         self.tqdm_retrain_disable = False
         self.tqdm_test_disable = False
 
+        # Number of samples encoded and searched at once
+        self.batch_size = 1024
+
+        # Max bytes of encodings kept across mini-batch retraining epochs
+        self.encode_cache_bytes = 1 << 30
+
+        # Max bytes of the precomputed ID-level table, and the
+        # cached tables by layout, see encode_record_batch
+        self.bound_table_bytes = vsax.HV_BOUND_TABLE_BYTES
+        self._bound_tables = dict()
+
+        # Validation accuracy after each retraining epoch
+        self.retrain_valid_accuracy = []
+
+        # Number of worker processes
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+        # Stage timers and counters, disabled unless a profiler is given
+        if profiler is None:
+            profiler = vsax_profile.vsaProfiler(enabled=False)
+        self.profiler = profiler
+
     # Main encoding function
     def encode(self, item_data):
         """
@@ -176,7 +485,265 @@ class vsaModel:
             override this function in the subclass."
         )
 
+    # Batch encoding function
+    def encode_batch(self, X):
+        """
+        Encode a batch of samples into a matrix of hypervectors.
+        By default this calls encode on every sample. Override it in the
+        subclass with a vectorized encoder (e.g. vsax.hv_encode_record_batch)
+        that gives the same output as encode for every sample.
+
+        Parameters:
+            X: The samples to be encoded, an (N, F) array or a list of N samples.
+        Returns:
+            np.ndarray: The encoded hypervectors of shape (N, hv_size).
+        """
+        return np.array([self.encode(item_data) for item_data in X])
+
+    # Record-based (ID-level) batch encoding
+    def encode_record_batch(self, X, id_offset=0, level_rows=None):
+        """
+        Bundle hv_bind(ortho_im[id_offset + f], level_im[X[n, f]]) over all
+        features f. Use it in encode_batch of record-based encoders.
+
+        The F x L bound HVs are precomputed once into a table that every
+        batch gathers from, as long as it fits in bound_table_bytes.
+        Otherwise they are bound on the fly like vsax.hv_encode_record_batch.
+        The tables are kept by layout and bound_table_bytes (see
+        vsax.hv_encode_record_cached) until the item memories are loaded.
+
+        Parameters:
+            X: The level index of each feature, of shape (N, F).
+            id_offset (int): The orthogonal IM row of the first feature ID.
+            level_rows (tuple): The (start, stop) orthogonal IM rows of the
+                                level HVs, defaults to the CiM.
+        Returns:
+            np.ndarray: The encoded hypervectors of shape (N, hv_size).
+        """
+        return vsax.hv_encode_record_cached(
+            self.ortho_im,
+            self.cim,
+            X,
+            self._bound_tables,
+            id_offset=id_offset,
+            level_rows=level_rows,
+            hv_type=self.hv_type,
+            max_bytes=self.bound_table_bytes,
+        )
+
+    # Orthogonal IM of the model parameters
+    def _gen_ortho_im(self):
+        if self.lazy_im:
+            return self._gen_lazy_im()
+        return vsax.hv_gen_orthogonal_im(
+            num_items=self.num_ortho_im,
+            hv_size=self.hv_size,
+            hv_type=self.hv_type,
+            gen_type=self.gen_type,
+            gen_ri_p_dense=self.gen_ri_p_dense,
+            gen_lfsr_base_seed=self.gen_lfsr_base_seed,
+            packed=self.packed,
+        )
+
+    # If the orthogonal IM can be regenerated from the seed when loading
+    def _ortho_im_from_seed(self):
+        if self.lazy_im:
+            return True
+        if self.gen_type not in ("lfsr", "ca90"):
+            return False
+        return np.array_equal(self._gen_ortho_im(), self.ortho_im)
+
+    # Orthogonal IM that is generated on demand from the seed
+    def _gen_lazy_im(self):
+        return vsaLazyIM(
+            num_items=self.num_ortho_im,
+            hv_size=self.hv_size,
+            hv_type=self.hv_type,
+            gen_type=self.gen_type,
+            gen_lfsr_base_seed=self.gen_lfsr_base_seed,
+            packed=self.packed,
+        )
+
+    # Element type of the class AM counters for a number of samples
+    def _acc_np_dtype(self, num_samples=None):
+        if self.acc_dtype != "auto":
+            return np.dtype(self.acc_dtype)
+        # Binarized encodings add at most 1 per sample to each counter
+        if num_samples is not None and self.binarize_encode:
+            return vsax.hv_count_dtype(num_samples)
+        return np.dtype(np.int32)
+
+    # Widen automatic counters to also hold num_updates more +/- updates
+    def _widen_acc_np_dtype(self, num_updates):
+        if self.acc_dtype != "auto":
+            return
+        max_count = max(
+            -int(self.class_am.min(initial=0)), int(self.class_am.max(initial=0))
+        )
+        acc_np_dtype = np.promote_types(
+            self.class_am.dtype, self._acc_np_dtype(max_count + num_updates)
+        )
+        if self.class_am.dtype != acc_np_dtype:
+            self.class_am = self.class_am.astype(acc_np_dtype)
+            self.class_am_frozen = self.class_am_frozen.astype(acc_np_dtype)
+
+    # Bundle one or more encoded HVs into the counters of a class
+    def _bundle_class(self, class_label, encoded_vecs, subtract=False, scale=1):
+        with self.profiler.stage("bundle"):
+            hv_set = self._bundle_hv(encoded_vecs)
+            if scale != 1:
+                hv_set = hv_set * scale
+            vsax.hv_bundle_into(
+                self.class_am[class_label],
+                hv_set,
+                subtract=subtract,
+                saturate=self.acc_saturate,
+            )
+
+    # Kernels of the loaded hv_type and layout
+    def _resolve_kernels(self):
+        self.kernels = vsax.hv_get_kernels(
+            self.hv_type, self.packed, self.kernel_backend
+        )
+
+    # Unpack an encoded HV so it can be bundled into the counters
+    def _bundle_hv(self, encoded_vec):
+        if self.packed and encoded_vec.dtype == np.uint64:
+            return vsax.hv_unpack(encoded_vec)
+        return encoded_vec
+
+    # Binarize a bundled class HV into the format of class_am_bin
+    def _binarize_class_hv(self, class_hv, threshold):
+        # Packed kernels binarize straight into packed words
+        with self.profiler.stage("binarize"):
+            return self.kernels.binarize(class_hv, threshold)
+
+    # AM that is used for searching
+    def _search_am(self):
+        if self.binarize_am or self.packed:
+            return self.class_am_bin
+        return self.class_am_frozen
+
+    # Predict the classes of a batch of encoded HVs
+    def _predict_batch(self, class_am, encoded_vecs, class_am_norm=None):
+        with self.profiler.stage("search"):
+            if self.packed and encoded_vecs.dtype != np.uint64:
+                encoded_vecs = vsax.hv_pack(encoded_vecs)
+            predict_idx, _, _ = self.kernels.am_search(
+                class_am, encoded_vecs, class_am_norm=class_am_norm
+            )
+        self.profiler.count("am_comparisons", len(encoded_vecs) * len(class_am))
+        return predict_idx
+
+    # Encode a batch of samples as a profiler stage
+    def _encode_profiled(self, X):
+        with self.profiler.stage("encode"):
+            encoded_vecs = self.encode_batch(X)
+        self.profiler.count("encodes", len(encoded_vecs))
+        return encoded_vecs
+
+    # Arrays whose peak size the profiler tracks
+    def _profile_arrays(self):
+        return {
+            "ortho_im": self.ortho_im,
+            "cim": self.cim,
+            "class_am": self.class_am,
+            "class_am_frozen": self.class_am_frozen,
+            "class_am_bin": self.class_am_bin,
+            "bound_table": max(
+                (table for table in self._bound_tables.values() if table is not None),
+                key=lambda table: table.nbytes,
+                default=None,
+            ),
+        }
+
+    # Encode the samples of one class in chunks of batch_size
+    def _encode_chunks(self, X_data, desc, disable):
+        data_len = len(X_data)
+        with tqdm(total=data_len, desc=desc, disable=disable) as pbar:
+            for start in range(0, data_len, self.batch_size):
+                stop = min(start + self.batch_size, data_len)
+                encoded_vecs = self._encode_profiled(X_data[start:stop])
+                pbar.update(stop - start)
+                yield encoded_vecs
+
+    # Work done on one chunk of samples of a class, serially or in a worker
+    def _chunk_task(self, task, class_label, X_chunk, search=None):
+        encoded_vecs = self.encode_batch(X_chunk)
+        if task == "train":
+            return vsax.hv_bundle_sum(
+                self._bundle_hv(encoded_vecs), self.class_am.dtype
+            )
+        class_am, class_am_norm = search
+        predict_labels = self._predict_batch(class_am, encoded_vecs, class_am_norm)
+        return int(np.sum(predict_labels == class_label))
+
+    # Run a task on all chunks of all classes with a process pool
+    def _pool_map(self, task, X_data, desc, disable, search=None):
+        """
+        Returns the per-chunk results of each class, in the chunk
+        order of the serial path.
+        """
+        # Share the plain item memories, lazy ones are regenerated per worker
+        worker_model = copy.copy(self)
+        # Workers build their own bound tables instead of pickling them
+        worker_model._bound_tables = dict()
+        # Workers do not profile, the pool is timed as one stage
+        worker_model.profiler = vsax_profile.vsaProfiler(enabled=False)
+        shared_ims = dict()
+        shm_list = []
+        try:
+            for im_name in ("ortho_im", "cim"):
+                im = getattr(self, im_name)
+                if isinstance(im, np.ndarray) and im.nbytes > 0:
+                    shm, shared_ims[im_name] = _pool_share_array(im)
+                    shm_list.append(shm)
+                    setattr(worker_model, im_name, None)
+
+            chunk_list = [
+                (class_label, start)
+                for class_label in range(self.num_classes)
+                for start in range(0, len(X_data[class_label]), self.batch_size)
+            ]
+            task_list = (
+                (
+                    task,
+                    class_label,
+                    X_data[class_label][start : start + self.batch_size],
+                )
+                for class_label, start in chunk_list
+            )
+
+            class_results = [[] for _ in range(self.num_classes)]
+            with self.profiler.stage(f"pool_{task}"), multiprocessing.Pool(
+                self.n_jobs,
+                initializer=_pool_init,
+                initargs=(worker_model, shared_ims, search),
+            ) as pool:
+                for (class_label, _), result in zip(
+                    chunk_list,
+                    tqdm(
+                        pool.imap(_pool_task, task_list),
+                        total=len(chunk_list),
+                        desc=desc,
+                        disable=disable,
+                    ),
+                ):
+                    class_results[class_label].append(result)
+        finally:
+            for shm in shm_list:
+                shm.close()
+                shm.unlink()
+
+        # Counts of the work done by the workers
+        num_samples = sum(len(X_data[c]) for c in range(self.num_classes))
+        self.profiler.count("encodes", num_samples)
+        if task == "test":
+            self.profiler.count("am_comparisons", num_samples * len(search[0]))
+        return class_results
+
     # Training function
+    @profiled_stage("train")
     def train_model(self, X_train):
         """
         Train the VSA model using the provided training data.
@@ -187,24 +754,47 @@ class vsaModel:
             Updates the AM of the model based on the training data.
         """
         print("Training model...")
+
+        # Automatic counter types are fixed once the sample count is known
+        num_samples = sum(len(X_train[c]) for c in range(self.num_classes))
+        acc_np_dtype = self._acc_np_dtype(num_samples)
+        if self.class_am.dtype != acc_np_dtype and not self.class_am_count.any():
+            self.class_am = self.class_am.astype(acc_np_dtype)
+            self.class_am_frozen = self.class_am_frozen.astype(acc_np_dtype)
+
+        # Partial sums of every chunk from the worker processes
+        if self.n_jobs > 1:
+            class_sums = self._pool_map(
+                "train",
+                X_train,
+                desc="Training chunks",
+                disable=self.tqdm_train_disable,
+            )
+
         for class_label in range(self.num_classes):
             data_len = len(X_train[class_label])
 
             # Non-binarized training
-            for item_num in tqdm(
-                range(data_len),
-                desc=f"Training class {class_label}",
-                disable=self.tqdm_train_disable,
-            ):
-                # Getting encodede HV
-                encoded_vec = self.encode(X_train[class_label][item_num])
-                # Bundle to the appropriate class
-                self.class_am[class_label] += encoded_vec
+            if self.n_jobs > 1:
+                for chunk_sum in class_sums[class_label]:
+                    vsax.hv_bundle_into(
+                        self.class_am[class_label],
+                        chunk_sum,
+                        saturate=self.acc_saturate,
+                    )
+            else:
+                for encoded_vecs in self._encode_chunks(
+                    X_train[class_label],
+                    desc=f"Training class {class_label}",
+                    disable=self.tqdm_train_disable,
+                ):
+                    # Bundle to the appropriate class
+                    self._bundle_class(class_label, encoded_vecs)
 
             # Automatically compute binarized output
             threshold = data_len / 2
-            self.class_am_bin[class_label] = vsax.hv_binarize(
-                self.class_am[class_label], threshold, self.hv_type
+            self.class_am_bin[class_label] = self._binarize_class_hv(
+                self.class_am[class_label], threshold
             )
 
             # Setting the frozen class
@@ -214,61 +804,297 @@ class vsaModel:
             self.class_am_count[class_label] = data_len
         print("Training complete!")
 
-    # Retraining function
-    def retrain_model(self, X_train):
-        print("Retraining model...")
-        """
-        Retrain the VSA model using the provided training data.
-
-        Args:
-            X_train (list): A list of training data for each class.
-        """
+    # One retraining pass that searches the AM of the previous classes
+    def _retrain_epoch(self, X_train, learning_rate):
         # Select if binarized AM or not
-        if self.binarize_am:
-            temp_class_am = self.class_am_bin
-        else:
-            temp_class_am = self.class_am_frozen
+        temp_class_am = self._search_am()
 
         for class_label in range(self.num_classes):
-            data_len = len(X_train[class_label])
+            # The searched AM is only updated after each class
+            temp_class_am_norm = self.kernels.am_norms(temp_class_am)
 
             # Retraining with binarized AM
-            for item_num in tqdm(
-                range(data_len),
+            for encoded_vecs in self._encode_chunks(
+                X_train[class_label],
                 desc=f"Retraining class {class_label}",
                 disable=self.tqdm_retrain_disable,
             ):
-                # Getting encoded HV
-                encoded_vec = self.encode(X_train[class_label][item_num])
-
-                # Predict item
-                predict_label = vsax.hv_prediction_idx(
-                    temp_class_am, encoded_vec, hv_type=self.hv_type
+                # Predict items
+                predict_labels = self._predict_batch(
+                    temp_class_am, encoded_vecs, temp_class_am_norm
                 )
 
-                # If incorrect we update the AMs
-                if predict_label != class_label:
+                # If incorrect we update the AMs,
+                # bundling all misses of a wrong class at once
+                wrong_items = np.flatnonzero(predict_labels != class_label)
+                if len(wrong_items) == 0:
+                    continue
+                for predict_label in np.unique(predict_labels[wrong_items]):
+                    wrong_vecs = encoded_vecs[
+                        wrong_items[predict_labels[wrong_items] == predict_label]
+                    ]
                     # Subtract from wrong class AM
-                    self.class_am[predict_label] -= encoded_vec
-                    self.class_am_count[predict_label] -= 1
-                    # Add to correct class AM
-                    self.class_am[class_label] += encoded_vec
-                    self.class_am_count[class_label] += 1
+                    self._bundle_class(
+                        predict_label, wrong_vecs, subtract=True, scale=learning_rate
+                    )
+                    self.class_am_count[predict_label] -= (
+                        len(wrong_vecs) * learning_rate
+                    )
+                # Add to correct class AM
+                self._bundle_class(
+                    class_label, encoded_vecs[wrong_items], scale=learning_rate
+                )
+                self.class_am_count[class_label] += len(wrong_items) * learning_rate
 
             # Automatically compute binarized output
             threshold = self.class_am_count[class_label] / 2
-            self.class_am_bin[class_label] = vsax.hv_binarize(
-                self.class_am[class_label], threshold, self.hv_type
+            self.class_am_bin[class_label] = self._binarize_class_hv(
+                self.class_am[class_label], threshold
             )
 
         # For updating the frozen AM
-        for class_label in range(self.num_classes):
-            # Update frozen AM
-            self.class_am_frozen[class_label] = np.copy(self.class_am[class_label])
+        self.class_am_frozen[...] = self.class_am
+
+    # Encode all samples at once if they fit in encode_cache_bytes
+    def _encode_all(self, X_data, sample_idx):
+        data_len = len(sample_idx)
+        first_vecs = self._encode_profiled(
+            [X_data[class_label][item] for class_label, item in sample_idx[:1]]
+        )
+        if first_vecs.nbytes * data_len > self.encode_cache_bytes:
+            return None
+        encoded_vecs = np.empty((data_len,) + first_vecs.shape[1:], first_vecs.dtype)
+        for start in range(0, data_len, self.batch_size):
+            stop = min(start + self.batch_size, data_len)
+            encoded_vecs[start:stop] = self._encode_profiled(
+                [X_data[c][item] for c, item in sample_idx[start:stop]]
+            )
+        return encoded_vecs
+
+    # One retraining pass in mini-batches over all classes
+    def _retrain_epoch_batch(
+        self, X_train, learning_rate, sample_idx, sample_order, encoded_all
+    ):
+        sample_labels = np.array([class_label for class_label, _ in sample_idx])
+        data_len = len(sample_idx)
+        with tqdm(
+            total=data_len, desc="Retraining", disable=self.tqdm_retrain_disable
+        ) as pbar:
+            for start in range(0, data_len, self.batch_size):
+                batch_items = sample_order[start : start + self.batch_size]
+                if encoded_all is not None:
+                    encoded_vecs = encoded_all[batch_items]
+                else:
+                    encoded_vecs = self._encode_profiled(
+                        [
+                            X_train[sample_idx[i][0]][sample_idx[i][1]]
+                            for i in batch_items
+                        ]
+                    )
+                batch_labels = sample_labels[batch_items]
+
+                # Predict the whole mini-batch against the current AM
+                class_am = self._search_am()
+                class_am_norm = self.kernels.am_norms(class_am)
+                predict_labels = self._predict_batch(
+                    class_am, encoded_vecs, class_am_norm
+                )
+                pbar.update(len(batch_items))
+
+                wrong_items = np.flatnonzero(predict_labels != batch_labels)
+                if len(wrong_items) == 0:
+                    continue
+                add_labels = batch_labels[wrong_items]
+                sub_labels = predict_labels[wrong_items]
+
+                # Scatter the +/- updates of all misses into one delta per class
+                wrong_vecs = self._bundle_hv(encoded_vecs[wrong_items])
+                if np.issubdtype(wrong_vecs.dtype, np.floating):
+                    class_delta = np.zeros(self.class_am.shape)
+                else:
+                    class_delta = np.zeros(self.class_am.shape, dtype=np.int64)
+                np.add.at(class_delta, add_labels, wrong_vecs)
+                np.subtract.at(class_delta, sub_labels, wrong_vecs)
+                np.add.at(self.class_am_count, add_labels, learning_rate)
+                np.subtract.at(self.class_am_count, sub_labels, learning_rate)
+
+                # Bundle the deltas and refresh the searched AMs
+                for class_label in np.union1d(add_labels, sub_labels):
+                    self._bundle_class(
+                        class_label, class_delta[class_label], scale=learning_rate
+                    )
+                    self.class_am_bin[class_label] = self._binarize_class_hv(
+                        self.class_am[class_label],
+                        self.class_am_count[class_label] / 2,
+                    )
+                    self.class_am_frozen[class_label] = self.class_am[class_label]
+
+    # Retraining function
+    @profiled_stage("retrain")
+    def retrain_model(
+        self,
+        X_train,
+        epochs: int = 1,
+        learning_rate: float = 1,
+        mini_batch: bool = False,
+        X_valid=None,
+        patience: int = 1,
+        seed: Optional[int] = None,
+    ):
+        """
+        Retrain the VSA model using the provided training data.
+
+        By default every class is searched against the AM left by the
+        previous classes. With mini_batch, the samples of all classes
+        are retrained in mini-batches of batch_size, and the searched
+        AM is refreshed after every mini-batch. In that mode, the
+        encodings are computed once and reused across epochs if they fit
+        in encode_cache_bytes.
+
+        Args:
+            X_train (list): A list of training data for each class.
+            epochs (int): The maximum number of passes over X_train.
+            learning_rate (float): The scale of each +/- update, which also
+                                   weighs the class counts of the binarization
+                                   thresholds. Integer counters need an
+                                   integer learning rate.
+            mini_batch (bool): If True, retrain in mini-batches over all classes.
+            X_valid (list): Optional validation data for each class. If given,
+                            training stops early once the validation accuracy
+                            did not improve for patience epochs, and the best
+                            model is kept.
+            patience (int): The number of epochs without improvement to wait.
+            seed (Optional[int]): If set, the mini-batch samples are shuffled
+                                  every epoch with this seed.
+        """
+        print("Retraining model...")
+
+        # Integer counters only take integer updates
+        if np.issubdtype(self.class_am.dtype, np.integer):
+            if learning_rate != int(learning_rate):
+                raise ValueError(
+                    f"Integer counters ({self.class_am.dtype}) need an integer "
+                    f"learning rate, got {learning_rate}"
+                )
+            learning_rate = int(learning_rate)
+
+        # Every sample of every epoch moves a counter by at most learning_rate
+        num_samples = sum(len(X_train[c]) for c in range(self.num_classes))
+        self._widen_acc_np_dtype(epochs * num_samples * abs(learning_rate))
+
+        # Samples of all classes and their encodings for mini-batch retraining
+        if mini_batch:
+            sample_idx = [
+                (class_label, item)
+                for class_label in range(self.num_classes)
+                for item in range(len(X_train[class_label]))
+            ]
+            sample_order = np.arange(len(sample_idx))
+            encoded_all = None
+            if epochs > 1 and len(sample_idx) > 0:
+                encoded_all = self._encode_all(X_train, sample_idx)
+            rng = np.random.default_rng(seed)
+
+        # Validation accuracy of the starting model
+        self.retrain_valid_accuracy = []
+        if X_valid is not None:
+            best_accuracy = self._valid_accuracy(X_valid)
+            best_state = self._am_state()
+            stale_epochs = 0
+
+        for epoch in range(epochs):
+            if mini_batch:
+                if seed is not None:
+                    sample_order = rng.permutation(len(sample_idx))
+                self._retrain_epoch_batch(
+                    X_train, learning_rate, sample_idx, sample_order, encoded_all
+                )
+            else:
+                self._retrain_epoch(X_train, learning_rate)
+
+            if X_valid is None:
+                continue
+
+            # Early stopping on the validation accuracy
+            accuracy = self._valid_accuracy(X_valid)
+            print(f"Epoch {epoch}: validation accuracy {accuracy*100:.2f}%")
+            if accuracy > best_accuracy:
+                best_accuracy = accuracy
+                best_state = self._am_state()
+                stale_epochs = 0
+            else:
+                stale_epochs += 1
+                if stale_epochs >= patience:
+                    break
+
+        # Keep the best model on the validation data
+        if X_valid is not None:
+            self._set_am_state(best_state)
 
         print("Retraining complete!")
 
+    # Copy of everything retraining changes
+    def _am_state(self):
+        return [
+            np.copy(self.class_am),
+            np.copy(self.class_am_frozen),
+            np.copy(self.class_am_bin),
+            np.copy(self.class_am_count),
+        ]
+
+    def _set_am_state(self, am_state):
+        (
+            self.class_am,
+            self.class_am_frozen,
+            self.class_am_bin,
+            self.class_am_count,
+        ) = am_state
+
+    # Accuracy on validation data without touching the test statistics
+    def _valid_accuracy(self, X_valid):
+        class_correct_counts = self._class_correct_counts(
+            X_valid, desc="Validating", disable=self.tqdm_retrain_disable
+        )
+        total_count = sum(len(X_valid[c]) for c in range(self.num_classes))
+        accuracy = sum(class_correct_counts) / total_count
+        self.retrain_valid_accuracy.append(accuracy)
+        return accuracy
+
+    # Number of correct predictions for each class
+    def _class_correct_counts(self, X_data, desc, disable):
+        class_am = self._search_am()
+        class_am_norm = self.kernels.am_norms(class_am)
+        search = (class_am, class_am_norm)
+
+        # Correct counts of every chunk from the worker processes
+        if self.n_jobs > 1:
+            class_counts = self._pool_map(
+                "test",
+                X_data,
+                desc=f"{desc} chunks",
+                disable=disable,
+                search=search,
+            )
+            return [sum(class_counts[c]) for c in range(self.num_classes)]
+
+        class_correct_counts = []
+        for class_label in range(self.num_classes):
+            class_correct_count = 0
+            for encoded_vecs in self._encode_chunks(
+                X_data[class_label],
+                desc=f"{desc} class {class_label}",
+                disable=disable,
+            ):
+                # Compare with each class AM
+                predict_labels = self._predict_batch(
+                    class_am, encoded_vecs, class_am_norm
+                )
+                class_correct_count += int(np.sum(predict_labels == class_label))
+            class_correct_counts.append(class_correct_count)
+        return class_correct_counts
+
     # Testing function
+    @profiled_stage("test")
     def test_model(self, X_test):
         """
         Test the VSA model using the provided test data.
@@ -281,34 +1107,17 @@ class vsaModel:
         print("Testing model...")
 
         correct_count = 0
-        class_correct_count = 0
         total_count = 0
 
-        if self.binarize_am:
-            class_am = self.class_am_bin
-        else:
-            class_am = self.class_am_frozen
+        class_correct_counts = self._class_correct_counts(
+            X_test, desc="Testing", disable=self.tqdm_test_disable
+        )
 
         for class_label in range(self.num_classes):
             data_len = len(X_test[class_label])
-            class_correct_count = 0
-            for item_num in tqdm(
-                range(data_len),
-                desc=f"Testing class {class_label}",
-                disable=self.tqdm_test_disable,
-            ):
-                # Getting encoded HV
-                encoded_vec = self.encode(X_test[class_label][item_num])
-                # Compare with each class AM
-                predict_label = vsax.hv_prediction_idx(
-                    class_am, encoded_vec, hv_type=self.hv_type
-                )
-
-                if predict_label == class_label:
-                    correct_count += 1
-                    class_correct_count += 1
-                total_count += 1
-
+            class_correct_count = class_correct_counts[class_label]
+            correct_count += class_correct_count
+            total_count += data_len
             self.test_class_score[class_label] = class_correct_count
             self.test_class_accuracy[class_label] = class_correct_count / data_len
 
@@ -343,6 +1152,10 @@ class vsaModel:
             print(f"LFSR Base Seed: {self.gen_lfsr_base_seed}")
 
         # Print modes
+        print(f"Packed: {self.packed}")
+        print(f"Lazy IM: {self.lazy_im}")
+        print(f"Accumulator Type: {self.class_am.dtype}")
+        print(f"Accumulator Saturate: {self.acc_saturate}")
         print(f"Binarize Encode: {self.binarize_encode}")
         print(f"Binarize AM: {self.binarize_am}")
 
@@ -356,43 +1169,86 @@ class vsaModel:
 
         print(f"Overall Accuracy: {self.model_accuracy*100:.2f}%")
 
+        # Printing the profile of the run
+        if self.profiler.enabled:
+            self.profiler.print_report()
+
     # Function to save the model parameters
+    @profiled_stage("save")
     def save_model(self, save_path):
         """
         Save the model parameters to a file.
 
+        The file is an uncompressed .npz with a versioned JSON header
+        (see vsax_io.save_model_file). Each array is stored in its
+        most compact exact form: binary and bipolar arrays bit-packed,
+        integral counters in the smallest integer type. An orthogonal IM
+        that the seed regenerates exactly and a frozen AM that equals
+        the AM are not stored at all.
+
         Parameters:
             save_path (str): The path to save the model parameters.
         """
-        np.savez_compressed(
-            save_path,
-            model_name=self.model_name,
-            hv_size=self.hv_size,
-            hv_type=self.hv_type,
-            num_ortho_im=self.num_ortho_im,
-            num_cim=self.num_cim,
-            cim_max_is_ortho=self.cim_max_is_ortho,
-            class_list=self.class_list,
-            gen_type=self.gen_type,
-            gen_ri_p_dense=self.gen_ri_p_dense,
-            gen_lfsr_base_seed=self.gen_lfsr_base_seed,
-            ortho_im=self.ortho_im,
-            cim=self.cim,
-            class_am=self.class_am,
-            class_am_frozen=self.class_am_frozen,
-            class_am_bin=self.class_am_bin,
-            class_am_count=self.class_am_count,
-        )
+        header = {name: getattr(self, name) for name in vsax_io.vsax_model_params}
+        header["class_list"] = np.asarray(self.class_list).tolist()
+        header["arrays"] = dict()
+        arrays = dict()
+        for name in vsax_io.vsax_model_arrays:
+            if name == "ortho_im" and self._ortho_im_from_seed():
+                header["arrays"][name] = dict(encoding="seed")
+                continue
+            # The frozen AM is the same as the AM after (re)training
+            if (
+                name == "class_am_frozen"
+                and self.class_am_frozen.dtype == self.class_am.dtype
+                and np.array_equal(self.class_am_frozen, self.class_am)
+            ):
+                header["arrays"][name] = dict(encoding="same", like="class_am")
+                continue
+            arrays[name], header["arrays"][name] = vsax_io.compact_array(
+                getattr(self, name)
+            )
+        vsax_io.save_model_file(save_path, header, arrays)
         print(f"Saved model: {save_path}!")
 
     # Function to load the model parameters
+    @profiled_stage("load")
     def load_model(self, load_path):
         """
         Load the model parameters from a file.
 
+        Arrays that are stored as they are in memory stay memory-mapped
+        copy-on-write, so loading does not read them until they are used.
+        Older compressed .npz model files are loaded as well.
+
         Parameters:
             load_path (str): The path to load the model parameters from.
         """
+        # The bound tables of the old item memories are stale
+        self._bound_tables = dict()
+
+        if not vsax_io.is_model_file(load_path):
+            self._load_legacy_model(load_path)
+            print(f"Loaded model: {load_path}!")
+            return
+
+        header, arrays = vsax_io.load_model_file(load_path, mmap_mode="c")
+        for name in vsax_io.vsax_model_params:
+            setattr(self, name, header[name])
+        self.num_classes = len(self.class_list)
+        for name in vsax_io.vsax_model_arrays:
+            spec = header["arrays"][name]
+            if spec["encoding"] == "seed":
+                setattr(self, name, self._gen_ortho_im())
+            elif spec["encoding"] == "same":
+                setattr(self, name, np.array(getattr(self, spec["like"])))
+            else:
+                setattr(self, name, vsax_io.expand_array(arrays[name], spec))
+        self._resolve_kernels()
+        print(f"Loaded model: {load_path}!")
+
+    # Load a compressed .npz model file from before the versioned format
+    def _load_legacy_model(self, load_path):
         data = np.load(load_path, allow_pickle=True)
         self.model_name = data["model_name"].item()
         self.hv_size = data["hv_size"].item()
@@ -401,16 +1257,28 @@ class vsaModel:
         self.num_cim = data["num_cim"].item()
         self.cim_max_is_ortho = data["cim_max_is_ortho"].item()
         self.class_list = data["class_list"].tolist()
+        self.num_classes = len(self.class_list)
         self.gen_type = data["gen_type"].item()
         self.gen_ri_p_dense = data["gen_ri_p_dense"].item()
         self.gen_lfsr_base_seed = data["gen_lfsr_base_seed"].item()
-        self.ortho_im = data["ortho_im"]
+        # Older model files have no packed entry
+        self.packed = data["packed"].item() if "packed" in data else False
+        self.lazy_im = data["lazy_im"].item() if "lazy_im" in data else False
+        if self.lazy_im:
+            self.ortho_im = self._gen_lazy_im()
+        else:
+            self.ortho_im = data["ortho_im"]
+        # Older model files only have float64 counters
+        self.acc_dtype = data["acc_dtype"].item() if "acc_dtype" in data else "float64"
+        self.acc_saturate = (
+            data["acc_saturate"].item() if "acc_saturate" in data else False
+        )
         self.cim = data["cim"]
         self.class_am = data["class_am"]
         self.class_am_frozen = data["class_am_frozen"]
         self.class_am_bin = data["class_am_bin"]
         self.class_am_count = data["class_am_count"]
-        print(f"Loaded model: {load_path}!")
+        self._resolve_kernels()
 
 
 if __name__ == "__main__":
@@ -474,3 +1342,270 @@ if __name__ == "__main__":
         print("VSAX Model Pass!")
     else:
         raise ValueError("VSAX Model did not achieve expected accuracy.")
+
+    # Integer counters must bundle exactly like float counters
+    vsa_int_char_model = vsaCharModel(
+        hv_size=1024,
+        hv_type="bipolar",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+        acc_dtype="auto",
+    )
+    vsa_int_char_model.train_model(char_recog_dict)
+    vsa_float_char_model = vsaCharModel(
+        hv_size=1024,
+        hv_type="bipolar",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+    )
+    vsa_float_char_model.train_model(char_recog_dict)
+    assert vsa_int_char_model.class_am.dtype == np.int32, "Wrong counter type!"
+    assert np.array_equal(
+        vsa_int_char_model.class_am, vsa_float_char_model.class_am
+    ), "Integer counter mismatch!"
+
+    # Retraining widens automatic counters instead of overflowing them
+    rng = np.random.default_rng(0)
+    unbalanced_dict = {0: rng.integers(0, 2, (120, 35)), 1: rng.integers(0, 2, (7, 35))}
+    vsa_int_char_model = vsaCharModel(
+        hv_size=256,
+        hv_type="bipolar",
+        num_ortho_im=35,
+        class_list=[0, 1],
+        gen_type="lfsr",
+        acc_dtype="auto",
+    )
+    vsa_int_char_model.binarize_encode = True
+    vsa_int_char_model.tqdm_train_disable = True
+    vsa_int_char_model.tqdm_retrain_disable = True
+    vsa_int_char_model.train_model(unbalanced_dict)
+    assert vsa_int_char_model.class_am.dtype == np.int8, "Wrong counter type!"
+    vsa_int_char_model.retrain_model(unbalanced_dict, epochs=30)
+    assert vsa_int_char_model.class_am.dtype == np.int16, "Counters not widened!"
+    try:
+        vsa_int_char_model.retrain_model(unbalanced_dict, learning_rate=0.5)
+        raise AssertionError("Integer counters took a fractional learning rate!")
+    except ValueError:
+        pass
+    print("VSAX Integer Counter Pass!")
+
+    # Process pool training and testing must match the serial path
+    vsa_pool_char_model = vsaCharModel(
+        hv_size=1024,
+        hv_type="bipolar",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+        n_jobs=2,
+    )
+    vsa_pool_char_model.train_model(char_recog_dict)
+    assert np.array_equal(
+        vsa_pool_char_model.class_am, vsa_float_char_model.class_am
+    ), "Process pool training mismatch!"
+    assert vsa_pool_char_model.test_model(
+        char_recog_dict
+    ) == vsa_float_char_model.test_model(
+        char_recog_dict
+    ), "Process pool testing mismatch!"
+    print("VSAX Process Pool Pass!")
+
+    # Training on index-based split views must match the plain data
+    X_view_train, _ = vsax_util.split_data(
+        char_recog_dict, list(range(10)), split_percent=1.0, disable_tqdm=True, seed=0
+    )
+    vsa_view_char_model = vsaCharModel(
+        hv_size=1024,
+        hv_type="bipolar",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+    )
+    vsa_view_char_model.train_model(X_view_train)
+    assert np.array_equal(
+        vsa_view_char_model.class_am, vsa_float_char_model.class_am
+    ), "Split view training mismatch!"
+    print("VSAX Split View Pass!")
+
+    # Same application but with a bit-packed binary model
+    class vsaPackedCharModel(vsaModel):
+        def encode(self, item_data):
+            # Feature length
+            item_len = len(item_data)
+            # Threshold
+            threshold = item_len / 2
+            encoded_vec = vsax.hv_gen_empty(self.hv_size)
+            # Iterate per item
+            for i in range(item_len):
+                if item_data[i] == 0:
+                    encoded_vec += vsax.hv_unpack(self.ortho_im[i])
+                else:
+                    encoded_vec += vsax.hv_unpack(
+                        vsax.hv_circ_perm_packed(self.ortho_im[i], 1)
+                    )
+            # Packed models always binarize the encoding
+            return vsax.hv_pack(vsax.hv_binarize(encoded_vec, threshold, self.hv_type))
+
+    vsa_packed_char_model = vsaPackedCharModel(
+        hv_size=1024,
+        hv_type="binary",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+        gen_lfsr_base_seed=42,
+        packed=True,
+    )
+    vsa_packed_char_model.train_model(char_recog_dict)
+    accuracy = vsa_packed_char_model.test_model(char_recog_dict)
+    vsa_packed_char_model.print_model_stats()
+
+    if accuracy >= 0.98:
+        print("VSAX Packed Model Pass!")
+    else:
+        raise ValueError("VSAX Packed Model did not achieve expected accuracy.")
+
+    # Saved models must load back bit-exact, with the IM regenerated
+    # from the seed and the others stored compactly
+    for vsa_saved_model in (vsa_char_model, vsa_packed_char_model):
+        with tempfile.TemporaryDirectory() as model_dir:
+            model_file = os.path.join(model_dir, "model.npz")
+            vsa_saved_model.save_model(model_file)
+            vsa_loaded_model = copy.copy(vsa_saved_model)
+            vsa_loaded_model.load_model(model_file)
+            for array_name in vsax_io.vsax_model_arrays:
+                saved_array = np.asarray(getattr(vsa_saved_model, array_name))
+                loaded_array = np.asarray(getattr(vsa_loaded_model, array_name))
+                assert saved_array.dtype == loaded_array.dtype and np.array_equal(
+                    saved_array, loaded_array
+                ), f"Saved model {array_name} mismatch!"
+            assert vsa_loaded_model.test_model(
+                char_recog_dict
+            ) == vsa_saved_model.test_model(
+                char_recog_dict
+            ), "Saved model accuracy mismatch!"
+
+            # Inference models from the trained model and from its file
+            # must predict exactly like the trained model
+            X_infer = np.concatenate([char_recog_dict[c] for c in range(10)])
+            model_predict = vsa_saved_model._predict_batch(
+                vsa_saved_model._search_am(), vsa_saved_model.encode_batch(X_infer)
+            )
+            for vsa_infer_model in (
+                vsax_infer.vsaInferModel.from_model(vsa_saved_model),
+                vsax_infer.vsaInferModel.load(model_file, type(vsa_saved_model)),
+            ):
+                assert np.array_equal(
+                    vsa_infer_model.predict_batch(X_infer), model_predict
+                ), "Inference model mismatch!"
+                assert vsa_infer_model.predict(X_infer[3]) == model_predict[3]
+                topk_labels, _ = vsa_infer_model.predict_topk(X_infer, top_k=3)
+                assert np.array_equal(topk_labels[:, 0], model_predict)
+    print("VSAX Model File Pass!")
+
+    # Record-based encoding from the bound table, a packed table
+    # or binding on the fly must match the per-sample encoder
+    class vsaRecordCharModel(vsaModel):
+        def encode(self, item_data):
+            # IDs start at 2 and the 1st 2 are the pixel levels
+            encoded_vec = vsax.hv_gen_empty(self.hv_size)
+            for i in range(len(item_data)):
+                encoded_vec += vsax.hv_bind(
+                    self.ortho_im[i + 2], self.ortho_im[item_data[i]], self.hv_type
+                )
+            return encoded_vec
+
+        def encode_batch(self, X):
+            return self.encode_record_batch(X, id_offset=2, level_rows=(0, 2))
+
+    X_record = np.concatenate([char_recog_dict[c] for c in range(10)])
+    for hv_type, gen_type in (("binary", "lfsr"), ("bipolar", "ri")):
+        vsa_record_model = vsaRecordCharModel(
+            hv_size=1024,
+            hv_type=hv_type,
+            num_ortho_im=37,
+            class_list=list(range(10)),
+            gen_type=gen_type,
+        )
+        expected = np.array([vsa_record_model.encode(x) for x in X_record])
+        for bound_table_bytes in (1 << 20, 1 << 16, 0):
+            vsa_record_model.bound_table_bytes = bound_table_bytes
+            encoded = vsa_record_model.encode_batch(X_record)
+            assert np.array_equal(encoded, expected), "Record encoding mismatch!"
+        vsa_record_model.train_model(char_recog_dict)
+        vsa_record_model.test_model(char_recog_dict)
+        vsa_infer_model = vsax_infer.vsaInferModel.from_model(vsa_record_model)
+        assert np.array_equal(
+            vsa_infer_model.encode_batch(X_record), expected
+        ), "Inference record encoding mismatch!"
+    print("VSAX Record Encoding Pass!")
+
+    # Same packed model, but generating the item memory on demand
+    vsa_lazy_char_model = vsaPackedCharModel(
+        hv_size=1024,
+        hv_type="binary",
+        num_ortho_im=35,
+        class_list=list(range(10)),
+        gen_type="lfsr",
+        gen_lfsr_base_seed=42,
+        packed=True,
+        lazy_im=True,
+    )
+    assert np.array_equal(
+        np.asarray(vsa_lazy_char_model.ortho_im), vsa_packed_char_model.ortho_im
+    ), "Lazy IM mismatch!"
+    vsa_lazy_char_model.train_model(char_recog_dict)
+    accuracy = vsa_lazy_char_model.test_model(char_recog_dict)
+
+    if accuracy >= 0.98:
+        print("VSAX Lazy IM Model Pass!")
+    else:
+        raise ValueError("VSAX Lazy IM Model did not achieve expected accuracy.")
+
+    # Mini-batch retraining with early stopping keeps the best model
+    vsa_lazy_char_model.retrain_model(
+        char_recog_dict,
+        epochs=3,
+        mini_batch=True,
+        X_valid=char_recog_dict,
+        seed=0,
+    )
+    accuracy = vsa_lazy_char_model.test_model(char_recog_dict)
+    if accuracy >= max(vsa_lazy_char_model.retrain_valid_accuracy):
+        print("VSAX Mini-batch Retraining Pass!")
+    else:
+        raise ValueError("VSAX Mini-batch Retraining did not keep the best model.")
+
+    # A profiled run gives the same model and counts every stage
+    import json
+
+    char_profiler = vsax_profile.vsaProfiler()
+    char_model_list = []
+    for profiler in (char_profiler, None):
+        vsa_profiled_char_model = vsaCharModel(
+            hv_size=1024,
+            hv_type="bipolar",
+            num_ortho_im=35,
+            class_list=list(range(10)),
+            gen_type="lfsr",
+            profiler=profiler,
+        )
+        vsa_profiled_char_model.binarize_am = True
+        vsa_profiled_char_model.train_model(char_recog_dict)
+        vsa_profiled_char_model.retrain_model(char_recog_dict)
+        vsa_profiled_char_model.test_model(char_recog_dict)
+        char_model_list.append(vsa_profiled_char_model)
+    char_model_list[0].print_model_stats()
+    profile = json.loads(json.dumps(char_profiler.report()))
+    num_chars = char_model_list[0].num_classes
+    if (
+        not np.array_equal(char_model_list[0].class_am, char_model_list[1].class_am)
+        or char_model_list[1].profiler.report()["stages"]
+        or not {"train", "retrain", "test", "encode", "bundle", "binarize", "search"}
+        <= set(profile["stages"])
+        or profile["counters"]["encodes"] != 3 * num_chars
+        or profile["counters"]["am_comparisons"] != 2 * num_chars * num_chars
+        or profile["peak_bytes"]["class_am"] != char_model_list[0].class_am.nbytes
+    ):
+        raise ValueError("VSAX profiling did not record the run.")
+    print("VSAX Profiling Pass!")
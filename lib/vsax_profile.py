@@ -0,0 +1,144 @@
+"""
+================================
+VSAX Profiling Functions
+================================
+
+This library consists of an opt-in profiler for VSA model runs:
+wall-clock timers around each stage (read_data, encode, bundle,
+binarize, search, ...), event counters such as the number of encoded
+samples and AM comparisons, and the peak size of the AM/IM arrays.
+A disabled profiler hands out one shared no-op context and ignores
+counts, so its hooks can stay in place in production runs.
+"""
+
+# ---------------------------------------------------------------------------
+# Importing packages
+# ---------------------------------------------------------------------------
+import json
+import time
+import contextlib
+
+# Shared context of disabled profilers, entering it does nothing
+_null_stage = contextlib.nullcontext()
+
+
+# ============================================================================
+# Profiler class
+# ============================================================================
+
+
+class _stageTimer:
+    """
+    Context that adds its wall-clock time to a profiler stage.
+    Nested stages are timed inclusively, e.g. train includes encode.
+    """
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        calls, total = self.profiler.stages.get(self.name, (0, 0.0))
+        self.profiler.stages[self.name] = (calls + 1, total + elapsed)
+        return False
+
+
+class vsaProfiler:
+    """
+    Per-stage timers, counters and array memory of a model run.
+
+    Parameters:
+        enabled (bool): If False, stage, count and track_arrays do nothing.
+
+    Attributes:
+        stages (dict): Number of calls and total seconds of each stage.
+        counters (dict): Total of each counter.
+        peak_bytes (dict): Largest size seen of each tracked array.
+
+    Methods:
+        stage(name): Context manager that times a stage.
+        count(name, amount): Add to a counter.
+        track_arrays(arrays): Record the size of named arrays.
+        report(): The profile as a JSON-serializable dict.
+        print_report(): Print the profile.
+        save_json(save_path): Write the profile to a JSON file.
+        reset(): Clear everything that was recorded.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages = dict()
+        self.counters = dict()
+        self.peak_bytes = dict()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _null_stage
+        return _stageTimer(self, name)
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def track_arrays(self, arrays: dict):
+        """
+        Record the size of named arrays, keeping the peak of each name
+        and of their total. Entries without an nbytes size are skipped.
+
+        Parameters:
+            arrays (dict): The arrays by name.
+        """
+        if not self.enabled:
+            return
+        total_bytes = 0
+        for name, array in arrays.items():
+            nbytes = getattr(array, "nbytes", None)
+            if nbytes is None:
+                continue
+            total_bytes += nbytes
+            self.peak_bytes[name] = max(self.peak_bytes.get(name, 0), nbytes)
+        self.peak_bytes["total"] = max(self.peak_bytes.get("total", 0), total_bytes)
+
+    def report(self) -> dict:
+        return {
+            "stages": {
+                name: {"calls": calls, "total_s": total}
+                for name, (calls, total) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "peak_bytes": dict(self.peak_bytes),
+        }
+
+    def print_report(self):
+        """
+        Print the profile in the layout of vsaModel.print_model_stats.
+        """
+        print("===================")
+        print(" Profile Statistics:")
+        print("===================")
+        for name, (calls, total) in self.stages.items():
+            print(
+                f"Stage {name}: {total:.4f} s in {calls} calls "
+                f"({total / calls * 1e3:.3f} ms per call)"
+            )
+        for name, total in self.counters.items():
+            print(f"Count {name}: {total}")
+        for name, nbytes in self.peak_bytes.items():
+            print(f"Peak {name}: {nbytes / (1 << 20):.2f} MiB")
+
+    def save_json(self, save_path: str):
+        with open(save_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Saved profile: {save_path}!")
+
+    def reset(self):
+        self.stages.clear()
+        self.counters.clear()
+        self.peak_bytes.clear()
@@ -0,0 +1,641 @@
+"""
+================================
+VSAX Prediction Server
+================================
+
+This library consists of an asyncio prediction server for trained VSA
+models and a matching client. Requests from concurrent clients are
+coalesced into micro-batches, so each batch is encoded and searched
+with a single batched AM search.
+
+The protocol is one JSON object per line over a Unix socket or a
+localhost TCP connection:
+    {"id": 1, "x": [...]}              -> {"id": 1, "label": 3}
+    {"id": 2, "x": [...], "top_k": 3}  -> {"id": 2, "label": 3,
+                                           "topk": [3, 5, 1],
+                                           "scores": [...]}
+    {"id": 3, "op": "stats"}           -> {"id": 3, "stats": {...}}
+Errors are returned as {"id": ..., "error": "..."}.
+
+Running this file without a model trains a small synthetic model and
+the language app encoder, serves each on a temporary Unix socket and
+load-tests it with the local client, all offline.
+"""
+
+# ---------------------------------------------------------------------------
+# Importing packages
+# ---------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import importlib
+import importlib.util
+import collections
+import concurrent.futures
+import numpy as np
+import vsax_infer
+from typing import Optional
+
+# ---------------------------------------------------------------------------
+# Fixed parameters
+# ---------------------------------------------------------------------------
+SERVE_MAX_BATCH_SIZE = 64  # max requests searched in one micro-batch
+SERVE_MAX_WAIT_MS = 2.0  # max wait for a micro-batch to fill up
+SERVE_LATENCY_WINDOW = 100_000  # latencies kept for the percentiles
+SERVE_LINE_LIMIT = 1 << 24  # max bytes of one request or response line
+SERVE_APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../app")
+
+
+# ---------------------------------------------------------------------------
+# Auxiliary functions
+# ---------------------------------------------------------------------------
+
+
+# Plain Python value of a class label, for JSON responses
+def json_label(label):
+    return label.item() if isinstance(label, np.generic) else label
+
+
+# Number of best classes a request asks for, a JSON integer of at least 1
+def request_top_k(request):
+    top_k = request.get("top_k", 1)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+        raise ValueError(f"top_k must be an integer of at least 1, got {top_k!r}")
+    return top_k
+
+
+# Load a trained model for serving
+def load_serving_model(
+    load_path: str,
+    model_class: type,
+    binarize_encode: Optional[bool] = None,
+    binarize_am: Optional[bool] = None,
+) -> vsax_infer.vsaInferModel:
+    """
+    Load a model file through vsaModel.load_model, which reads both the
+    current and the older model files, and build its inference model.
+
+    Parameters:
+        load_path (str): The path of the model file.
+        model_class (type): The vsaModel subclass with the encoder.
+        binarize_encode (Optional[bool]): Overrides the saved setting,
+                                          older model files do not have it.
+        binarize_am (Optional[bool]): Overrides the saved setting.
+    Returns:
+        vsaInferModel: The inference model.
+    """
+    # The small placeholder parameters are replaced by the loaded ones
+    model = model_class(hv_size=64, num_ortho_im=1, num_cim=2, class_list=[0])
+    model.load_model(load_path)
+    if binarize_encode is not None:
+        model.binarize_encode = binarize_encode
+    if binarize_am is not None:
+        model.binarize_am = binarize_am
+    return vsax_infer.vsaInferModel.from_model(model)
+
+
+# Import a model class from a "module:Class" or "path/to/file.py:Class" string,
+# e.g. "app/vsax_bin_lang_recog.py:langVSA"
+def import_model_class(class_path: str) -> type:
+    module_name, _, class_name = class_path.rpartition(":")
+    if not module_name.endswith(".py"):
+        return getattr(importlib.import_module(module_name), class_name)
+    # The app scripts only run under __main__, so importing them has no
+    # side effects beyond defining their encoder classes
+    spec = importlib.util.spec_from_file_location(
+        os.path.splitext(os.path.basename(module_name))[0], module_name
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+# ============================================================================
+# Prediction server
+# ============================================================================
+
+
+class vsaPredictServer:
+    """
+    Asyncio server that batches concurrent prediction requests.
+
+    A request waits at most max_wait_ms for other requests to join its
+    micro-batch, and a micro-batch holds at most max_batch_size requests.
+    Batches run one at a time in a worker thread, so the event loop
+    keeps accepting requests while a batch is searched.
+
+    Parameters:
+        infer_model (vsaInferModel): The model to serve.
+        max_batch_size (int): The max number of requests per micro-batch.
+        max_wait_ms (float): The max wait for a micro-batch to fill up.
+
+    Attributes:
+        num_requests (int): The number of answered prediction requests.
+        num_batches (int): The number of searched micro-batches.
+        latencies (deque): The latest request latencies in seconds,
+                           from arrival to answer.
+
+    Methods:
+        start_unix(path): Start listening on a Unix socket.
+        start_tcp(host, port): Start listening on a TCP port.
+        close(): Stop the server.
+        stats(): The latency and throughput counters.
+    """
+
+    def __init__(
+        self,
+        infer_model: vsax_infer.vsaInferModel,
+        max_batch_size: int = SERVE_MAX_BATCH_SIZE,
+        max_wait_ms: float = SERVE_MAX_WAIT_MS,
+    ):
+        self.infer_model = infer_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        # Counters
+        self.num_requests = 0
+        self.num_batches = 0
+        self.latencies = collections.deque(maxlen=SERVE_LATENCY_WINDOW)
+        self.start_time = time.perf_counter()
+
+        # Internal state
+        self._queue = None
+        self._server = None
+        self._batch_task = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def start_unix(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        self._start_batching()
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=path, limit=SERVE_LINE_LIMIT
+        )
+        return self._server
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        self._start_batching()
+        self._server = await asyncio.start_server(
+            self._handle_client, host=host, port=port, limit=SERVE_LINE_LIMIT
+        )
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The request and batch counts, the mean batch size,
+                  the p50/p99 latency in ms and the throughput in
+                  requests per second since the server started.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        latencies_ms = np.array(self.latencies) * 1e3
+        p50, p99 = (
+            np.percentile(latencies_ms, [50, 99]) if len(latencies_ms) else (0, 0)
+        )
+        return {
+            "requests": self.num_requests,
+            "batches": self.num_batches,
+            "mean_batch_size": self.num_requests / max(self.num_batches, 1),
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "throughput_rps": self.num_requests / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _start_batching(self):
+        self._queue = asyncio.Queue()
+        self._batch_task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    # Read requests of one connection, answering them as they complete
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def answer(request_id, future):
+            try:
+                response = await future
+            except Exception as exc:
+                response = {"error": f"{type(exc).__name__}: {exc}"}
+            response["id"] = request_id
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    request = {"op": "invalid", "error": str(exc)}
+                if not isinstance(request, dict):
+                    request = {"op": "invalid", "error": "Request is not an object"}
+
+                future = asyncio.get_running_loop().create_future()
+                if request.get("op") == "stats":
+                    future.set_result({"stats": self.stats()})
+                elif "x" not in request:
+                    future.set_exception(ValueError(request.get("error", "no x")))
+                else:
+                    try:
+                        top_k = request_top_k(request)
+                    except ValueError as exc:
+                        future.set_exception(exc)
+                    else:
+                        arrival = time.perf_counter()
+                        await self._queue.put((request["x"], top_k, arrival, future))
+
+                task = asyncio.ensure_future(answer(request.get("id"), future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    # Collect micro-batches and search them one at a time
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1e3
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Take what else is already waiting, up to the batch size
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            responses = await loop.run_in_executor(
+                self._executor, self._predict_batch, batch
+            )
+            done_time = time.perf_counter()
+            self.num_batches += 1
+            for (_, _, arrival, future), response in zip(batch, responses):
+                self.num_requests += 1
+                self.latencies.append(done_time - arrival)
+                if future.done():
+                    continue
+                if isinstance(response, Exception):
+                    future.set_exception(response)
+                else:
+                    future.set_result(response)
+
+    # Predict a micro-batch, falling back to one request at a time on errors
+    def _predict_batch(self, batch):
+        top_k = max(request[1] for request in batch)
+        try:
+            labels, scores = self.infer_model.predict_topk(
+                [request[0] for request in batch], top_k=top_k
+            )
+        except Exception:
+            if len(batch) == 1:
+                return [self._predict_one(batch[0])]
+            return [self._predict_one(request) for request in batch]
+        return [
+            self._response(labels[i], scores[i], request[1])
+            for i, request in enumerate(batch)
+        ]
+
+    def _predict_one(self, request):
+        try:
+            labels, scores = self.infer_model.predict_topk([request[0]], request[1])
+        except Exception as exc:
+            return exc
+        return self._response(labels[0], scores[0], request[1])
+
+    @staticmethod
+    def _response(labels, scores, top_k):
+        response = {"label": json_label(labels[0])}
+        if top_k > 1:
+            response["topk"] = [json_label(label) for label in labels[:top_k]]
+            response["scores"] = [float(score) for score in scores[:top_k]]
+        return response
+
+
+# ============================================================================
+# Prediction client
+# ============================================================================
+
+
+class vsaPredictClient:
+    """
+    Asyncio client of vsaPredictServer. Requests are pipelined over one
+    connection, so many of them can be in flight at once.
+
+    Methods:
+        connect_unix(path): Connect to a Unix socket.
+        connect_tcp(host, port): Connect to a TCP port.
+        predict(x, top_k): Predict one sample.
+        stats(): The counters of the server.
+        close(): Close the connection.
+    """
+
+    def __init__(self):
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._pending = dict()
+        self._next_id = 0
+
+    async def connect_unix(self, path: str):
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            path, limit=SERVE_LINE_LIMIT
+        )
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def connect_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        self._reader, self._writer = await asyncio.open_connection(
+            host, port, limit=SERVE_LINE_LIMIT
+        )
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._read_task
+
+    async def predict(self, x, top_k: int = 1) -> dict:
+        request = {"x": np.asarray(x).tolist()}
+        if top_k > 1:
+            request["top_k"] = top_k
+        return await self._request(request)
+
+    async def stats(self) -> dict:
+        response = await self._request({"op": "stats"})
+        return response["stats"]
+
+    async def _request(self, request):
+        self._next_id += 1
+        request["id"] = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request["id"]] = future
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def _read_loop(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Server closed the connection"))
+        self._pending.clear()
+
+
+# Load test of a running server
+async def load_test(
+    connect,
+    samples,
+    num_requests: int = 1000,
+    concurrency: int = 32,
+) -> dict:
+    """
+    Send num_requests predictions from concurrency concurrent clients.
+
+    Parameters:
+        connect: Coroutine function that returns a connected vsaPredictClient.
+        samples: The samples to cycle through.
+        num_requests (int): The total number of requests.
+        concurrency (int): The number of concurrent clients.
+    Returns:
+        dict: The predicted labels in request order, and the client-side
+              p50/p99 latency in ms and throughput in requests per second.
+    """
+    labels = [None] * num_requests
+    latencies = [0.0] * num_requests
+    next_request = iter(range(num_requests))
+
+    async def worker():
+        client = await connect()
+        for i in next_request:
+            start = time.perf_counter()
+            response = await client.predict(samples[i % len(samples)])
+            latencies[i] = time.perf_counter() - start
+            labels[i] = response["label"]
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1e3
+    return {
+        "labels": labels,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "throughput_rps": num_requests / elapsed,
+    }
+
+
+# Serve a model until interrupted
+async def serve_forever(server: vsaPredictServer, unix_path=None, host=None, port=0):
+    if unix_path is not None:
+        listener = await server.start_unix(unix_path)
+        print(f"Serving on unix socket {unix_path}")
+    else:
+        listener = await server.start_tcp(host, port)
+        print(f"Serving on {listener.sockets[0].getsockname()}")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+# Serve a trained model through its model file, like a deployed model,
+# and check the served predictions against the model's own
+async def serve_test(
+    model, samples, num_requests, concurrency, max_batch_size, max_wait_ms
+):
+    expected = vsax_infer.vsaInferModel.from_model(model).predict_batch(samples)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_file = os.path.join(tmp_dir, "model.npz")
+        model.save_model(model_file)
+        infer_model = load_serving_model(model_file, type(model))
+
+        server = vsaPredictServer(infer_model, max_batch_size, max_wait_ms)
+        socket_path = os.path.join(tmp_dir, "vsax.sock")
+        await server.start_unix(socket_path)
+        try:
+
+            async def connect():
+                return await vsaPredictClient().connect_unix(socket_path)
+
+            result = await load_test(connect, samples, num_requests, concurrency)
+            client = await connect()
+            response = await client.predict(samples[0], top_k=3)
+            # A bad request is answered with an error and keeps the connection
+            try:
+                await client._request({"x": samples[0].tolist(), "top_k": "abc"})
+                raise AssertionError("Bad top_k was served!")
+            except RuntimeError as exc:
+                assert "top_k" in str(exc)
+            assert (await client.predict(samples[0]))["label"] == expected[0]
+            server_stats = await client.stats()
+            await client.close()
+        finally:
+            await server.close()
+
+    expected_labels = [expected[i % len(samples)].item() for i in range(num_requests)]
+    assert result["labels"] == expected_labels, "Served predictions mismatch!"
+    assert response["topk"][0] == response["label"] == expected[0]
+
+    print(f"Model: {type(model).__name__}")
+    print(f"Requests: {num_requests}, concurrency: {concurrency}")
+    print(f"Client p50: {result['p50_ms']:.2f} ms, p99: {result['p99_ms']:.2f} ms")
+    print(f"Client throughput: {result['throughput_rps']:.0f} requests/s")
+    print(f"Server stats: {json.dumps(server_stats)}")
+
+
+# Offline load test of a small synthetic model and of an app encoder
+async def self_test(num_requests, concurrency, max_batch_size, max_wait_ms):
+    import vsax
+    import vsax_models
+
+    # Noisy samples of random class prototypes
+    num_classes, num_features, num_levels = 10, 64, 16
+    rng = np.random.default_rng(0)
+    prototypes = rng.integers(0, num_levels, (num_classes, num_features))
+    X_train = dict()
+    for class_label in range(num_classes):
+        noise = rng.integers(-1, 2, (100, num_features))
+        X_train[class_label] = np.clip(prototypes[class_label] + noise, 0, 15)
+
+    class vsaRecordModel(vsax_models.vsaModel):
+        def encode_batch(self, X):
+            X = np.asarray(X)
+            encoded_vecs = vsax.hv_encode_record_batch(
+                self.ortho_im, self.cim, X, hv_type=self.hv_type
+            )
+            if self.binarize_encode:
+                encoded_vecs = vsax.hv_binarize(
+                    encoded_vecs, X.shape[1] // 2, self.hv_type
+                )
+            return encoded_vecs
+
+    model = vsaRecordModel(
+        hv_size=1024,
+        hv_type="binary",
+        num_ortho_im=num_features,
+        num_cim=num_levels,
+        class_list=list(range(num_classes)),
+        gen_type="lfsr",
+    )
+    model.binarize_encode = True
+    model.binarize_am = True
+    model.tqdm_train_disable = True
+    model.train_model(X_train)
+
+    samples = np.concatenate([X_train[c][:10] for c in range(num_classes)])
+    await serve_test(
+        model, samples, num_requests, concurrency, max_batch_size, max_wait_ms
+    )
+
+    # The language app encoder, served from its script like --model-class,
+    # on letter sequences that favor a few letters per class
+    langVSA = import_model_class(
+        os.path.join(SERVE_APP_PATH, "vsax_bin_lang_recog.py:langVSA")
+    )
+    num_letters, seq_len = 27, 64
+    X_train = dict()
+    for class_label in range(num_classes):
+        letter_p = rng.dirichlet(np.full(num_letters, 0.3))
+        X_train[class_label] = rng.choice(num_letters, (20, seq_len), p=letter_p)
+
+    model = langVSA(
+        hv_size=512,
+        num_ortho_im=num_letters,
+        class_list=list(range(num_classes)),
+        gen_type="lfsr",
+    )
+    model.binarize_am = True
+    model.tqdm_train_disable = True
+    model.train_model(X_train)
+
+    samples = np.concatenate([X_train[c][:5] for c in range(num_classes)])
+    predicted = vsax_infer.vsaInferModel.from_model(model).predict_batch(samples)
+    assert np.mean(predicted == np.repeat(range(num_classes), 5)) > 0.8
+    await serve_test(
+        model, samples, num_requests // 4, concurrency, max_batch_size, max_wait_ms
+    )
+    print("VSAX Serve Pass!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VSAX prediction server")
+    parser.add_argument(
+        "--model", help="Model file to serve, runs a self-test if not given"
+    )
+    parser.add_argument(
+        "--model-class",
+        help="Encoder vsaModel subclass as module:Class or path/to/file.py:Class",
+    )
+    parser.add_argument("--socket", help="Unix socket path to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--batch-size", type=int, default=SERVE_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=SERVE_MAX_WAIT_MS)
+    parser.add_argument("--binarize-encode", action="store_true", default=None)
+    parser.add_argument("--binarize-am", action="store_true", default=None)
+    parser.add_argument("--requests", type=int, default=2000, help="Self-test requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Self-test clients")
+    args = parser.parse_args()
+
+    if args.model is None:
+        asyncio.run(
+            self_test(
+                args.requests, args.concurrency, args.batch_size, args.max_wait_ms
+            )
+        )
+        sys.exit(0)
+
+    if args.model_class is None:
+        parser.error("--model-class is needed to encode the requests")
+    infer_model = load_serving_model(
+        args.model,
+        import_model_class(args.model_class),
+        binarize_encode=args.binarize_encode,
+        binarize_am=args.binarize_am,
+    )
+    server = vsaPredictServer(infer_model, args.batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(serve_forever(server, args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
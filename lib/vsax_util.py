@@ -8,11 +8,13 @@ Also consists of plotting functions that are useful for profiling too.
 """
 
 # Importing packages
+import os
+import json
 import urllib.request
 import zipfile
 import tarfile
-import random
 import numpy as np
+import vsax_io
 from tqdm import tqdm
 from pathlib import Path
 
@@ -31,6 +33,17 @@ vsax_data_url_bin_lang = "https://github.com/rgantonio/chronomatica/releases/dow
 ver_trained_models = "v0.1.3"
 git_trained_models_url = f"https://github.com/KULeuven-MICAS/hypercorex/releases/download/vsax_trained_models_{ver_trained_models}"
 
+# ---------------------------------------------------------------------------
+# Binary dataset cache
+# ---------------------------------------------------------------------------
+# Parsed class files are cached as one .npy per class in a sub-directory
+# of the data path, together with an index that records the size and
+# modification time of each source text file.
+vsax_cache_dir_name = "npy_cache"
+vsax_cache_index_name = "index.json"
+vsax_cache_version = 1
+vsax_cache_chunk_rows = 65536
+
 # ---------------------------------------------------------------------------
 # File extraction functions
 # ---------------------------------------------------------------------------
@@ -174,6 +187,82 @@ def load_dataset(
         return dataset
 
 
+# Stamp of a source file that tells if a cached copy is still valid
+def dataset_cache_stamp(file_path: str, disable_split: bool) -> dict:
+    """
+    Describe a source text file for the dataset cache index.
+
+    Args:
+        file_path (str): Path to the text file
+        disable_split (bool): How the lines of the file are parsed
+    Returns:
+        dict: The cache version, parse mode, size and modification time
+    """
+    file_stat = os.stat(file_path)
+    return {
+        "version": vsax_cache_version,
+        "disable_split": disable_split,
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+    }
+
+
+# Loading the cache index of a data directory
+def load_cache_index(cache_dir: Path) -> dict:
+    """
+    Load the index of a dataset cache directory.
+
+    Args:
+        cache_dir (Path): The cache directory
+    Returns:
+        dict: The stamp of each cached file, empty if there is no index
+    """
+    try:
+        with open(cache_dir / vsax_cache_index_name, "r") as rf:
+            return json.load(rf)
+    except (OSError, ValueError):
+        return dict()
+
+
+# Writing files into the cache without leaving partial files behind
+def write_cache_file(file_path: Path, write_func) -> None:
+    """
+    Write a cache file through a temporary file and an atomic rename.
+
+    Args:
+        file_path (Path): The final path of the file
+        write_func: Function that writes the contents to an open binary file
+    """
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, "wb") as wf:
+        write_func(wf)
+    os.replace(tmp_path, file_path)
+
+
+# Write the levels of a dataset as a .npy file, one chunk at a time
+def write_levels_file(
+    wf, dataset: np.ndarray, dst_levels: int, chunk_rows: int = vsax_cache_chunk_rows
+) -> None:
+    """
+    Stream the levels of a dataset into an open .npy file.
+
+    Args:
+        wf: binary file object to write to
+        dataset (np.ndarray): Input array, possibly memory-mapped
+        dst_levels (int): Number of output quantization levels
+        chunk_rows (int): Number of rows quantized at a time
+    """
+    dtype = levels_dtype(dataset, dst_levels)
+    header = {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": dataset.shape,
+    }
+    np.lib.format.write_array_header_1_0(wf, header)
+    for levels in iter_quantize_levels(dataset, dst_levels, chunk_rows, dtype):
+        wf.write(np.ascontiguousarray(levels).tobytes())
+
+
 # Reading of data from files for each class label
 def read_data(
     class_list: list,
@@ -181,10 +270,18 @@ def read_data(
     convert_int: bool = True,
     disable_split: bool = False,
     disable_tqdm: bool = False,
+    use_cache: bool = True,
+    dst_levels: int | None = None,
 ) -> list:
     """
     Read data from files for each class label.
 
+    Integer data is cached the first time a class file is parsed,
+    as a .npy file with the smallest integer dtype that fits. Later
+    reads memory-map the cached file, until the size or modification
+    time of the text file changes. With dst_levels, the data is also
+    quantized to levels in chunks and the levels are cached the same way.
+
     Args:
         class_list: list of class labels
         data_path: path to the data files
@@ -192,65 +289,193 @@ def read_data(
         disable_split: whether to disable splitting of
                        lines into lists (e.g. for language data)
         disable_tqdm: whether to disable tqdm progress bars
+        use_cache: whether to use the binary dataset cache
+        dst_levels: number of quantization levels (see convert_levels),
+                    None keeps the data as read
     Returns:
         X_data: list of NumPy arrays with data for each class label
     """
+    if dst_levels is not None and not convert_int:
+        raise ValueError("dst_levels requires integer data (convert_int=True)")
+
+    use_cache = use_cache and convert_int
+    cache_dir = Path(data_path) / vsax_cache_dir_name
+    cache_index = load_cache_index(cache_dir) if use_cache else dict()
+    index_changed = False
+
     X_data = []
     for class_label in tqdm(class_list, desc="Reading data", disable=disable_tqdm):
         # Training dataset
         read_file = f"{data_path}/{class_label}.txt"
-        X_data.append(
-            load_dataset(
+        if not use_cache:
+            dataset = load_dataset(
                 read_file, convert_int=convert_int, disable_split=disable_split
             )
-        )
+            if dst_levels is not None:
+                dataset = quantize_levels(dataset, dst_levels)
+            X_data.append(dataset)
+            continue
+
+        # Parse and cache the text file if it changed since it was cached
+        cache_file = cache_dir / f"{class_label}.npy"
+        cache_stamp = dataset_cache_stamp(read_file, disable_split)
+        if cache_index.get(str(class_label)) != cache_stamp or not cache_file.exists():
+            dataset = load_dataset(
+                read_file, convert_int=convert_int, disable_split=disable_split
+            )
+            dataset = dataset.astype(vsax_io.smallest_int_dtype(dataset))
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                write_cache_file(cache_file, lambda wf: np.save(wf, dataset))
+            except OSError:
+                if dst_levels is not None:
+                    dataset = quantize_levels(dataset, dst_levels)
+                X_data.append(dataset)
+                continue
+            cache_index[str(class_label)] = cache_stamp
+            index_changed = True
+
+        dataset = np.load(cache_file, mmap_mode="r")
+
+        # Quantize the mapped data to levels without loading it all
+        if dst_levels is not None:
+            levels_key = f"{class_label}_levels{dst_levels}"
+            levels_file = cache_dir / f"{levels_key}.npy"
+            if cache_index.get(levels_key) != cache_stamp or not levels_file.exists():
+                try:
+                    write_cache_file(
+                        levels_file,
+                        lambda wf: write_levels_file(wf, dataset, dst_levels),
+                    )
+                except OSError:
+                    X_data.append(quantize_levels(dataset, dst_levels))
+                    continue
+                cache_index[levels_key] = cache_stamp
+                index_changed = True
+            dataset = np.load(levels_file, mmap_mode="r")
+
+        X_data.append(dataset)
+
+    if index_changed:
+        try:
+            write_cache_file(
+                cache_dir / vsax_cache_index_name,
+                lambda wf: wf.write(json.dumps(cache_index, indent=2).encode()),
+            )
+        except OSError:
+            pass
     return X_data
 
 
+# ---------------------------------------------------------------------------
+# Index-based data splits
+# ---------------------------------------------------------------------------
+# Splits keep the per-class data as it is read and only hold an index
+# array per class, so the memory of a split is O(N) integers and the
+# items are only gathered when a model reads a chunk of them.
+
+
+class vsaDataView:
+    """
+    Read-only view of the items of one class, selected by an index array.
+
+    Supports len(), iteration, integer indexing and slicing, where a
+    slice gathers only the selected items. Views of views are flattened,
+    so they always index the original data.
+    """
+
+    __slots__ = ("data", "indices")
+
+    def __init__(self, data, indices):
+        if isinstance(data, vsaDataView):
+            indices = data.indices[np.asarray(indices, dtype=np.intp)]
+            data = data.data
+        self.data = data
+        self.indices = np.asarray(indices, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def shape(self):
+        return (len(self.indices),) + tuple(np.shape(self.data)[1:])
+
+    def __getitem__(self, key):
+        idx = self.indices[key]
+        if np.ndim(idx) == 0:
+            return self.data[idx]
+        if isinstance(self.data, np.ndarray):
+            return self.data[idx]
+        return [self.data[i] for i in idx]
+
+    def __iter__(self):
+        for idx in self.indices:
+            yield self.data[idx]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[:], dtype=dtype)
+
+
+# Shuffled index arrays of a split
+def split_indices(
+    item_len: int,
+    split_percent: float = 0.8,
+    seed: int | np.random.Generator | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Shuffle item indices and split them into two parts.
+
+    Args:
+        item_len: number of items
+        split_percent: percentage of data to go into first split
+        seed: seed or np.random.Generator for the shuffle
+    Returns:
+        split1_idx: indices of the first split
+        split2_idx: indices of the second split
+    """
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(item_len)
+    split1_len = round(item_len * split_percent)
+    return perm[:split1_len], perm[split1_len:]
+
+
 # Splitting the data and randomizing items
 def split_data(
     X_data: list,
     class_list: list,
     split_percent: float = 0.8,
     disable_tqdm: bool = False,
+    seed: int | np.random.Generator | None = None,
 ) -> tuple[list, list]:
     """
     Split data into two parts based on split_percent.
 
+    The items are not copied, each split holds a vsaDataView
+    per class over the arrays of X_data.
+
     Args:
         X_data: list of NumPy arrays with data for each class label
         class_list: list of class labels
         split_percent: percentage of data to go into first split
+        disable_tqdm: whether to disable tqdm progress bars
+        seed: seed or np.random.Generator for the shuffle,
+              None gives a different split on every run
     Returns:
         X_split_data1: first split of data
         X_split_data2: second split of data
     """
+    rng = np.random.default_rng(seed)
+
     # Initialize empty lists
     X_split_data1 = []
     X_split_data2 = []
 
     for class_label in tqdm(class_list, desc="Splitting data", disable=disable_tqdm):
-        # Get item counts first
-        item_len = len(X_data[class_label])
-        split1_len = round(item_len * split_percent)
-        split2_len = item_len - split1_len
-
-        # Randomize the contents of the list first
-        random.shuffle(X_data[class_label])
-
-        # Get split 1 first
-        split1_list = []
-        for item_num in range(split1_len):
-            split1_list.append(X_data[class_label][item_num])
-
-        # Get split 2 next but starts at split1_len count
-        split2_list = []
-        for item_num in range(split1_len, split1_len + split2_len):
-            split2_list.append(X_data[class_label][item_num])
-
-        # Load into dictionaries
-        X_split_data1.append(split1_list)
-        X_split_data2.append(split2_list)
+        split1_idx, split2_idx = split_indices(
+            len(X_data[class_label]), split_percent, rng
+        )
+        X_split_data1.append(vsaDataView(X_data[class_label], split1_idx))
+        X_split_data2.append(vsaDataView(X_data[class_label], split2_idx))
 
     return X_split_data1, X_split_data2
 
@@ -262,6 +487,7 @@ def split_train_valid_test_set(
     train_test_split: float = 0.6,
     train_valid_split: float = 0.75,
     disable_tqdm: bool = False,
+    seed: int | np.random.Generator | None = None,
 ) -> tuple[list, list, list]:
     """
     Split data into training, validation, and test sets.
@@ -273,40 +499,159 @@ def split_train_valid_test_set(
         training set (rest goes to test set)
         train_valid_split: percentage of training set to
         go into training set (rest goes to validation set)
+        disable_tqdm: whether to disable tqdm progress bars
+        seed: seed or np.random.Generator for the shuffles
     Returns:
         X_train_set: training set
         X_valid_set: validation set
         X_test_set: test set
     """
+    rng = np.random.default_rng(seed)
     X_train_set, X_test_set = split_data(
-        X_data, class_list, split_percent=train_test_split, disable_tqdm=disable_tqdm
+        X_data,
+        class_list,
+        split_percent=train_test_split,
+        disable_tqdm=disable_tqdm,
+        seed=rng,
     )
     X_train_set, X_valid_set = split_data(
         X_train_set,
         class_list,
         split_percent=train_valid_split,
         disable_tqdm=disable_tqdm,
+        seed=rng,
     )
     return X_train_set, X_valid_set, X_test_set
 
 
+# Stratified k-fold splits
+def kfold_split(
+    X_data: list,
+    class_list: list,
+    num_folds: int = 5,
+    seed: int | np.random.Generator | None = None,
+):
+    """
+    Stratified k-fold cross-validation splits.
+
+    The items of each class are shuffled once and dealt into
+    num_folds folds of nearly equal size, so every fold keeps
+    the class balance of X_data.
+
+    Args:
+        X_data: list of NumPy arrays with data for each class label
+        class_list: list of class labels
+        num_folds: number of folds
+        seed: seed or np.random.Generator for the shuffle
+    Yields:
+        X_train_set: training set of the fold
+        X_test_set: test set of the fold
+    """
+    if num_folds < 2:
+        raise ValueError(f"num_folds must be at least 2, got {num_folds}")
+
+    rng = np.random.default_rng(seed)
+    class_folds = [
+        np.array_split(rng.permutation(len(X_data[class_label])), num_folds)
+        for class_label in class_list
+    ]
+
+    for fold in range(num_folds):
+        X_train_set = []
+        X_test_set = []
+        for class_label, folds in zip(class_list, class_folds):
+            train_idx = np.concatenate(folds[:fold] + folds[fold + 1 :])
+            X_train_set.append(vsaDataView(X_data[class_label], train_idx))
+            X_test_set.append(vsaDataView(X_data[class_label], folds[fold]))
+        yield X_train_set, X_test_set
+
+
 # ---------------------------------------------------------------------------
 # Other utility functions
 # ---------------------------------------------------------------------------
 
 
-def convert_levels(dataset: np.ndarray, dst_levels: int) -> np.ndarray:
+# Smallest integer dtype of the levels of a dataset
+def levels_dtype(dataset: np.ndarray, dst_levels: int) -> np.dtype:
+    """
+    Find the dtype that quantize_levels gives for a dataset.
+
+    Args:
+        dataset (np.ndarray): Input array
+        dst_levels (int): Number of output quantization levels
+    Returns:
+        np.dtype: The smallest integer dtype of the levels
+    """
+    if dataset.dtype == np.uint8 or dataset.size == 0:
+        bounds = np.array([0, 255])
+    else:
+        bounds = np.array([dataset.min(), dataset.max()])
+    return vsax_io.smallest_int_dtype(np.round(bounds / 255.0 * (dst_levels - 1)))
+
+
+# Quantize a whole array to levels in one pass
+def quantize_levels(
+    dataset: np.ndarray, dst_levels: int, dtype: np.dtype | None = None
+) -> np.ndarray:
+    """
+    Quantize an array of 0–255 values to dst_levels levels.
+
+    uint8 input goes through a 256-entry lookup table,
+    other input through the same rounding as convert_levels.
+
+    Args:
+        dataset (np.ndarray): Input array of any shape
+        dst_levels (int): Number of output quantization levels
+        dtype (np.dtype): Output dtype, the smallest that fits if None
+    Returns:
+        np.ndarray: Quantized array with values in range [0, dst_levels - 1].
+    """
+    dataset = np.asarray(dataset)
+    if dtype is None:
+        dtype = levels_dtype(dataset, dst_levels)
+    if dataset.dtype == np.uint8:
+        level_table = np.round(np.arange(256) / 255.0 * (dst_levels - 1))
+        return level_table.astype(dtype)[dataset]
+    return np.round(dataset / 255.0 * (dst_levels - 1)).astype(dtype)
+
+
+# Quantize an array to levels in chunks of rows
+def iter_quantize_levels(
+    dataset: np.ndarray,
+    dst_levels: int,
+    chunk_rows: int = vsax_cache_chunk_rows,
+    dtype: np.dtype | None = None,
+):
+    """
+    Quantize an array to levels chunk by chunk,
+    e.g. for memory-mapped data that does not fit in memory.
+
+    Args:
+        dataset (np.ndarray): Input array, possibly memory-mapped
+        dst_levels (int): Number of output quantization levels
+        chunk_rows (int): Number of rows quantized at a time
+        dtype (np.dtype): Output dtype, the smallest that fits if None
+    Yields:
+        np.ndarray: Quantized rows of each chunk
+    """
+    if dtype is None:
+        dtype = levels_dtype(dataset, dst_levels)
+    for start in range(0, len(dataset), chunk_rows):
+        yield quantize_levels(dataset[start : start + chunk_rows], dst_levels, dtype)
+
+
+def convert_levels(dataset: np.ndarray | list, dst_levels: int) -> np.ndarray | list:
     """
     Quantize a uint8 array (0–255) to a specified number of levels (0 to dst_levels-1).
 
     Args:
-        dataset (np.ndarray): Input array with uint8 values in range [0, 255].
+        dataset (np.ndarray | list): Input array with uint8 values in range [0, 255],
+                                     or a list of such arrays (e.g. one per class).
         dst_levels (int): Number of output
                             quantization levels (e.g. 22 gives range 0–21).
     Returns:
-        np.ndarray: Quantized array with values in range [0, dst_levels - 1].
+        np.ndarray | list: Quantized array(s) with values in range [0, dst_levels - 1].
     """
-    for i in range(len(dataset)):
-        dataset[i] = np.round(dataset[i] / 255.0 * (dst_levels - 1)).astype(int)
-
-    return dataset
+    if isinstance(dataset, np.ndarray):
+        return quantize_levels(dataset, dst_levels)
+    return [quantize_levels(data, dst_levels) for data in dataset]